@@ -4,7 +4,10 @@ import logging
 from fastapi import HTTPException
 from pydantic import ValidationError
 
-from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.errors import (
+    EmptyDataError,
+    ServiceBusyError,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +22,9 @@ def api_error_handler(func):
         except EmptyDataError as e:
             logger.error(f"Error processing request: {e}")
             raise HTTPException(status_code=404, detail=str(e))
+        except ServiceBusyError as e:
+            logger.error(f"Error processing request: {e}")
+            raise HTTPException(status_code=503, detail=str(e))
         except ValidationError as e:
             logger.error(f"Error validating request: {e}")
             raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,49 @@
+import time
+
+from backend.src.app.services.instrumentation import (
+    StageTimings,
+    is_metrics_enabled,
+    is_server_timing_enabled,
+    observe_timings,
+    record_timings,
+)
+
+
+class ServerTimingMiddleware:
+    """
+    Record the pipeline stage timings of every request.
+
+    The timings are sent in the Server-Timing header when
+    SERVER_TIMING_ENABLED is set and aggregated into the /metrics
+    histograms when METRICS_ENABLED is set, requests are passed through
+    untouched otherwise. The 'total' stage includes the middlewares run
+    inside this one, such as the gzip compression.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        server_timing = is_server_timing_enabled()
+        metrics = is_metrics_enabled()
+        if scope["type"] != "http" or not (server_timing or metrics):
+            await self.app(scope, receive, send)
+            return
+
+        timings = StageTimings()
+        start = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                timings.add("total", time.perf_counter() - start)
+                if server_timing:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timings.get_header().encode())
+                    ]
+                if metrics:
+                    observe_timings(timings)
+            await send(message)
+
+        with record_timings(timings):
+            await self.app(scope, receive, send_with_timings)
@@ -0,0 +1,159 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import ORJSONResponse, Response
+import numpy as np
+import orjson
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+import pyarrow as pa
+
+from backend.src.app.configs.constants import API_SUCCESS_MESSAGE
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def frame_to_split(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Get the 'split' orientation of a DataFrame, as ``to_dict`` does,
+    with the values left in their arrays for ``orjson`` to write.
+
+    Frames with a single numeric type are written straight from their 2D
+    array, the rows of mixed frames are zipped from the per column lists
+    so that integers are not written as floats.
+    """
+
+    dtypes = set(df.dtypes)
+    if len(dtypes) == 1 and is_numeric_dtype(dtypes.pop()):
+        data = np.ascontiguousarray(df.to_numpy())
+    else:
+        columns = [df.iloc[:, i].tolist() for i in range(df.shape[1])]
+        data = list(zip(*columns))
+    return {
+        "index": df.index.tolist(),
+        "columns": df.columns.tolist(),
+        "data": data,
+    }
+
+
+def frames_to_split(frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+    return {
+        metric_name: frame_to_split(df) for metric_name, df in frames.items()
+    }
+
+
+def frames_to_arrow_ipc(
+    frames: Dict[str, pd.DataFrame],
+    assumptions: Optional[List[str]] = None,
+) -> bytes:
+    """
+    Encode the metric frames as an Arrow IPC stream.
+
+    The stream holds one row per metric, with the metric name and the
+    metric frame encoded as a nested Arrow IPC stream, as the frames do
+    not share a schema. The assumptions, if any, are a JSON list in the
+    ``assumptions`` key of the schema metadata.
+    """
+
+    encoded_frames = []
+    for df in frames.values():
+        table = pa.Table.from_pandas(df)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        encoded_frames.append(sink.getvalue().to_pybytes())
+    table = pa.table(
+        {
+            "metric": pa.array(list(frames), type=pa.string()),
+            "frame": pa.array(encoded_frames, type=pa.binary()),
+        },
+        metadata=(
+            {"assumptions": orjson.dumps(assumptions)} if assumptions else None
+        ),
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def metrics_response(
+    frames: Dict[str, pd.DataFrame],
+    accept: Optional[str] = None,
+    assumptions: Optional[List[str]] = None,
+) -> Response:
+    """
+    Build the response of the metric frames without validating them
+    against the response model.
+
+    Parameters:
+    - frames (Dict[str, pd.DataFrame]): A dictionary where keys are metric
+        names and values are the metric frames.
+    - accept (str): The Accept header of the request, the frames are sent
+        as an Arrow IPC stream when it asks for it and as JSON otherwise.
+    - assumptions (List[str]): The assumptions the frames rest on, if any.
+
+    Returns:
+    - Response: The response, the JSON body matches the ``Response``
+        schema with the frames in 'split' orientation.
+    """
+
+    if accept and ARROW_STREAM_MEDIA_TYPE in accept:
+        return Response(
+            content=frames_to_arrow_ipc(frames, assumptions),
+            media_type=ARROW_STREAM_MEDIA_TYPE,
+        )
+    content = {
+        "status_code": 200,
+        "success": True,
+        "message": API_SUCCESS_MESSAGE,
+        "data": frames_to_split(frames),
+    }
+    if assumptions:
+        content["assumptions"] = assumptions
+    return ORJSONResponse(content)
+
+
+def metric_line(metric_name: str, df: pd.DataFrame) -> bytes:
+    """
+    Encode a metric frame as a line of newline delimited JSON, with the
+    metric name and the frame in 'split' orientation.
+    """
+
+    return (
+        orjson.dumps(
+            {"metric": metric_name, "data": frame_to_split(df)},
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+        + b"\n"
+    )
+
+
+def error_line(message: str) -> bytes:
+    """Encode the error ending a stream of metric lines."""
+    return orjson.dumps({"success": False, "message": message}) + b"\n"
+
+
+def batch_metrics_response(
+    results: Dict[str, Dict[str, pd.DataFrame]], errors: Dict[str, str]
+) -> Response:
+    """
+    Build the JSON response of a batch of scenarios, the body matches the
+    ``BatchResponse`` schema.
+    """
+
+    return ORJSONResponse(
+        {
+            "status_code": 200,
+            "success": True,
+            "message": API_SUCCESS_MESSAGE,
+            "data": {
+                "results": {
+                    name: frames_to_split(frames)
+                    for name, frames in results.items()
+                },
+                "errors": errors,
+            },
+        }
+    )
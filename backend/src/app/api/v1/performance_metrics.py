@@ -1,18 +1,64 @@
+from datetime import date
 import logging
-from fastapi import Query
+from typing import List, Optional
+
+from fastapi import Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
 from backend.src.app.api.api_handlers import api_error_handler
+from backend.src.app.api.responses import (
+    ARROW_STREAM_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    batch_metrics_response,
+    error_line,
+    metric_line,
+    metrics_response,
+)
 from backend.src.app.configs.constants import (
     API_SUCCESS_MESSAGE,
     DataForm,
     PerformanceSection,
     LaneType,
+    TimeResolution,
+)
+from backend.src.app.schemas.base import CommonResponse
+from backend.src.app.schemas.performance_metrics import (
+    BatchParams,
+    BatchResponse,
+    DataVersionResponse,
+    LaneOptimizationParams,
+    Params,
+    Response,
+    SavedModelListResponse,
+    SavedModelParams,
+    SavedModelResponse,
+    SimulationParams,
+    SimulationResponse,
+    TrendParams,
+)
+from backend.src.app.services.business_services.errors import (
+    EmptyDataError,
+    ServiceBusyError,
+)
+from backend.src.app.services.business_services.optimizer import (
+    optimize_lanes,
 )
-from backend.src.app.schemas.performance_metrics import Params, Response
 from backend.src.app.services.business_services.performance_metrics import (
+    compute_batch_metrics,
     compute_metrics,
+    compute_trend,
+    create_saved_model,
+    delete_saved_model,
+    get_data_version,
+    list_saved_models,
+    stream_metrics,
 )
+from backend.src.app.services.business_services.remodel import (
+    get_baseline_lane_counts,
+)
+from backend.src.app.services.business_services.simulation import simulate
+from backend.src.app.services.instrumentation import stage
 
 
 logger = logging.getLogger(__name__)
@@ -20,9 +66,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1/performance", tags=["performance"])
 
 
-@router.get("/metrics")
+def get_assumptions(data_form: DataForm) -> Optional[List[str]]:
+    """Get the assumptions the results of a data form rest on, if any."""
+    if data_form == DataForm.REMODEL:
+        return [get_baseline_lane_counts().assumption]
+    return None
+
+
 @api_error_handler
-async def get_review_kpi(
+async def get_metrics_params(
     type: PerformanceSection = Query(
         PerformanceSection.WAIT_TIME, description="Type of KPI"
     ),
@@ -42,8 +94,40 @@ async def get_review_kpi(
     october_flag: bool = False,
     events_flag: bool = False,
     total_year_flag: bool = False,
-    time_period: int = 0,
-) -> Response:
+    time_period: int = Query(
+        default=0,
+        description="Days of history up to the end date, all when 0",
+        ge=0,
+    ),
+    start_date: Optional[date] = Query(
+        default=None, description="First day of history"
+    ),
+    end_date: Optional[date] = Query(
+        default=None, description="Last day of history"
+    ),
+    lane_counts: Optional[list[int]] = Query(
+        default=None,
+        description=(
+            "Number of lanes of each of the lane_types, in the same order, "
+            "for the remodel data form"
+        ),
+    ),
+    saved_model_id: Optional[str] = Query(
+        default=None, description="Id of the saved model to read"
+    ),
+    approximate: bool = Query(
+        default=False,
+        description=(
+            "Estimate the means of the historical data from a sample, "
+            "with their confidence intervals"
+        ),
+    ),
+):
+    if lane_counts is not None and len(lane_counts) != len(lane_types):
+        raise HTTPException(
+            status_code=400,
+            detail="lane_counts should give one count per lane type",
+        )
     params = {
         "type": type,
         "data_form": data_form,
@@ -56,12 +140,172 @@ async def get_review_kpi(
         "events_flag": events_flag,
         "total_year_flag": total_year_flag,
         "time_period": time_period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "lane_counts": (
+            dict(zip(lane_types, lane_counts))
+            if lane_counts is not None
+            else None
+        ),
+        "saved_model_id": saved_model_id,
+        "approximate": approximate,
     }
-    params = Params(**params)
-    data = await compute_metrics(params)
+    return Params(**params)
+
+
+@router.get(
+    "/metrics",
+    response_model=Response,
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}}},
+)
+@api_error_handler
+async def get_review_kpi(
+    params: Params = Depends(get_metrics_params),
+    accept: Optional[str] = Header(default=None),
+):
+    frames = await compute_metrics(params)
+    # The frames are serialized directly, the response model only
+    # documents the JSON body
+    with stage("serialize"):
+        return metrics_response(
+            frames, accept, get_assumptions(params.data_form)
+        )
+
+
+@router.get(
+    "/metrics/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+@api_error_handler
+async def stream_review_kpi(params: Params = Depends(get_metrics_params)):
+    """
+    Stream the metric frames as newline delimited JSON, one line per
+    metric as soon as it is computed, see ``metric_line``.
+    """
+
+    frames = stream_metrics(params)
+    # Errors before the first frame get an error response, the later ones
+    # end the stream with an error line
+    first_frame = await anext(frames)
+
+    async def lines():
+        yield metric_line(*first_frame)
+        try:
+            async for metric_name, frame in frames:
+                yield metric_line(metric_name, frame)
+        except (EmptyDataError, ServiceBusyError) as e:
+            logger.error(f"Error streaming metrics: {e}")
+            yield error_line(str(e))
+        # The response has started, any other error can only be reported
+        # in the stream
+        except Exception as e:
+            logger.exception(f"Unexpected error streaming metrics: {e}")
+            yield error_line(f"Unexpected error: {e}")
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get(
+    "/trend",
+    response_model=Response,
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}}},
+)
+@api_error_handler
+async def get_trend(
+    resolution: TimeResolution = Query(
+        TimeResolution.DAY, description="Length of the trend periods"
+    ),
+    params: Params = Depends(get_metrics_params),
+    accept: Optional[str] = Header(default=None),
+):
+    params = TrendParams(**params.model_dump(), resolution=resolution)
+    frames = await compute_trend(params)
+    with stage("serialize"):
+        return metrics_response(
+            frames, accept, get_assumptions(params.data_form)
+        )
+
+
+@router.post("/metrics/batch", response_model=BatchResponse)
+@api_error_handler
+async def get_batch_review_kpi(batch: BatchParams):
+    results, errors = await compute_batch_metrics(batch.scenarios)
+    return batch_metrics_response(results, errors)
+
+
+@router.post(
+    "/lane-optimization",
+    response_model=Response,
+    responses={200: {"content": {ARROW_STREAM_MEDIA_TYPE: {}}}},
+)
+@api_error_handler
+async def get_lane_optimization(
+    params: LaneOptimizationParams,
+    accept: Optional[str] = Header(default=None),
+):
+    lanes = await optimize_lanes(params)
+    with stage("serialize"):
+        return metrics_response(
+            {"lanes": lanes},
+            accept,
+            [get_baseline_lane_counts().assumption],
+        )
+
+
+@router.post("/simulation", response_model=SimulationResponse)
+@api_error_handler
+async def get_simulation(params: SimulationParams):
+    frames = await simulate(params)
+    with stage("serialize"):
+        return metrics_response(
+            frames, assumptions=[get_baseline_lane_counts().assumption]
+        )
+
+
+@router.get("/data-version")
+@api_error_handler
+async def get_historical_data_version() -> DataVersionResponse:
+    return {
+        "success": True,
+        "status_code": 200,
+        "message": API_SUCCESS_MESSAGE,
+        "data": get_data_version(),
+    }
+
+
+@router.post("/saved-models")
+@api_error_handler
+async def save_model(params: SavedModelParams) -> SavedModelResponse:
+    return {
+        "success": True,
+        "status_code": 200,
+        "message": API_SUCCESS_MESSAGE,
+        "data": await create_saved_model(params),
+    }
+
+
+@router.get("/saved-models")
+@api_error_handler
+async def get_saved_models(
+    store: Optional[int] = Query(
+        default=None, description="Only the saved models of this store"
+    )
+) -> SavedModelListResponse:
+    return {
+        "success": True,
+        "status_code": 200,
+        "message": API_SUCCESS_MESSAGE,
+        "data": await list_saved_models(store),
+    }
+
+
+@router.delete("/saved-models/{model_id}")
+@api_error_handler
+async def remove_saved_model(model_id: str) -> CommonResponse:
+    await delete_saved_model(model_id)
     return {
         "success": True,
         "status_code": 200,
         "message": API_SUCCESS_MESSAGE,
-        "data": data,
     }
@@ -1,9 +1,11 @@
 from os import getenv
+from typing import List, Optional
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError
 from azure.storage.blob.aio import BlobServiceClient
-import pandas as pd
-from io import StringIO
 
 from backend.src.app.clients.storage.base import StorageClient
+from backend.src.app.clients.storage.ranges import DataVersionChangedError
 
 
 class BlobClientHandler(StorageClient):
@@ -15,43 +17,109 @@ class BlobClientHandler(StorageClient):
         self.connection_string = getenv("AZURE_STORAGE_CONNECTION_STRING")
         self.container_name = getenv("AZURE_STORAGE_CONTAINER_NAME")
         self.blob_name = getenv("AZURE_STORAGE_BLOB_NAME")
+        self.delta_prefix = getenv("HISTORICAL_DELTA_PREFIX", "deltas/")
+        self.service_client = None
         self.blob_client = None
+        self.container_client = None
 
     async def initialize_client(self):
         """
-        Initializes the Azure Blob client.
+        Initializes the Azure Blob client, closing the previous one if any.
         """
+        await self.close()
         try:
-            blob_service_client = BlobServiceClient.from_connection_string(
+            self.service_client = BlobServiceClient.from_connection_string(
                 self.connection_string
             )
-            self.blob_client = blob_service_client.get_blob_client(
+            self.blob_client = self.service_client.get_blob_client(
                 container=self.container_name, blob=self.blob_name
             )
+            self.container_client = self.service_client.get_container_client(
+                self.container_name
+            )
         except Exception as e:
             print(f"Error initializing Azure Blob client: {e}")
             self.blob_client = None
+            self.container_client = None
+
+    async def close(self) -> None:
+        """
+        Closes the Azure Blob client and its HTTP session.
+        """
+        service_client = self.service_client
+        self.service_client = None
+        self.blob_client = None
+        self.container_client = None
+        if service_client is not None:
+            await service_client.close()
+
+    async def get_historical_data_version(self) -> str:
+        """
+        Returns the ETag of the historical data blob.
+        """
+        if not self.blob_client:
+            raise ConnectionError("Blob client is not initialized.")
 
-    async def read_historical_data(self):
+        properties = await self.blob_client.get_blob_properties()
+        return properties.etag
+
+    async def get_historical_data_size(self) -> int:
         """
-        Reads data from Azure Blob Storage asynchronously
-        and returns it as a DataFrame.
+        Returns the size in bytes of the historical data blob.
         """
         if not self.blob_client:
-            print("Blob client is not initialized.")
-            return None
+            raise ConnectionError("Blob client is not initialized.")
+
+        properties = await self.blob_client.get_blob_properties()
+        return properties.size
 
+    async def read_historical_data_range(
+        self, offset: int, length: int, version: Optional[str] = None
+    ) -> bytes:
+        """
+        Downloads a byte range of the historical data blob, at the given
+        ETag if any.
+        """
+        if not self.blob_client:
+            raise ConnectionError("Blob client is not initialized.")
+
+        conditions = (
+            {"etag": version, "match_condition": MatchConditions.IfNotModified}
+            if version is not None
+            else {}
+        )
         try:
-            # Download blob content asynchronously
-            stream = await self.blob_client.download_blob()
-            file_content = await stream.readall()
+            stream = await self.blob_client.download_blob(
+                offset=offset, length=length, **conditions
+            )
+        except ResourceModifiedError as e:
+            raise DataVersionChangedError(
+                f"Blob changed from version {version}"
+            ) from e
+        return await stream.readall()
 
-            # todo: find out if we need to close the blob client
-            # await self.blob_client.close()
+    async def list_historical_deltas(self) -> List[str]:
+        """
+        Returns the names of the csv blobs under HISTORICAL_DELTA_PREFIX,
+        sorted by name.
+        """
+        if not self.container_client:
+            raise ConnectionError("Blob client is not initialized.")
 
-            # Convert content to DataFrame
-            df = pd.read_csv(StringIO(file_content.decode("utf-8")))
-            return df
-        except Exception as e:
-            print(f"Error reading historical data from Azure: {e}")
-            return None
+        names = []
+        async for blob in self.container_client.list_blobs(
+            name_starts_with=self.delta_prefix
+        ):
+            if blob.name.endswith(".csv"):
+                names.append(blob.name)
+        return sorted(names)
+
+    async def read_historical_delta(self, name: str) -> bytes:
+        """
+        Downloads a delta blob.
+        """
+        if not self.container_client:
+            raise ConnectionError("Blob client is not initialized.")
+
+        stream = await self.container_client.download_blob(name)
+        return await stream.readall()
@@ -1,8 +1,19 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import AsyncIterator, List, Optional
+
+from backend.src.app.clients.storage.ranges import (
+    download_ranges,
+    get_download_settings,
+)
 
 
 # Abstract base class
 class StorageClient(ABC):
+    # Size of the downloaded ranges, HISTORICAL_DOWNLOAD_RANGE_SIZE when
+    # not set
+    range_size: Optional[int] = None
+
     @abstractmethod
     async def initialize_client(self, *args, **kwargs):
         """
@@ -11,8 +22,68 @@ class StorageClient(ABC):
         pass
 
     @abstractmethod
-    async def read_historical_data(self, *args, **kwargs):
+    async def get_historical_data_version(self, *args, **kwargs) -> str:
+        """
+        Returns the version (ETag) of the historical data in the storage.
+        """
+        pass
+
+    @abstractmethod
+    async def get_historical_data_size(self, *args, **kwargs) -> int:
         """
-        Reads data from the storage and returns it as a DataFrame.
+        Returns the size in bytes of the historical data in the storage.
         """
         pass
+
+    @abstractmethod
+    async def read_historical_data_range(
+        self, offset: int, length: int, version: Optional[str] = None
+    ) -> bytes:
+        """
+        Reads a byte range of the historical data csv.
+
+        Raises DataVersionChangedError when a version is given and the
+        data in the storage is not at this version anymore.
+        """
+        pass
+
+    async def stream_historical_data(
+        self, version: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams the historical data csv from the storage as byte chunks.
+
+        The byte ranges are downloaded concurrently and retried on
+        failure, see ``download_ranges``, and yielded in order.
+        When a version is given, every range is read at this version.
+        """
+        settings = get_download_settings()
+        if self.range_size:
+            settings["range_size"] = self.range_size
+        size = await self.get_historical_data_size()
+        async for chunk in download_ranges(
+            partial(self.read_historical_data_range, version=version),
+            size,
+            **settings,
+        ):
+            yield chunk
+
+    async def close(self) -> None:
+        """
+        Releases the connections of the storage client, if any.
+        """
+        pass
+
+    async def list_historical_deltas(self) -> List[str]:
+        """
+        Returns the names of the delta csv files of rows appended to the
+        historical data, in the order they are appended. There are no
+        deltas unless the storage holds some.
+        """
+        return []
+
+    async def read_historical_delta(self, name: str) -> bytes:
+        """
+        Reads a delta csv file listed by ``list_historical_deltas``.
+        """
+        raise FileNotFoundError(f"No historical data delta {name}")
@@ -0,0 +1,107 @@
+import asyncio
+from os import getenv
+import os
+from typing import List, Optional
+
+from backend.src.app.clients.storage.base import StorageClient
+from backend.src.app.clients.storage.ranges import DataVersionChangedError
+
+
+class LocalFileClient(StorageClient):
+    def __init__(
+        self, path: Optional[str] = None, range_size: Optional[int] = None
+    ):
+        """
+        Initializes the LocalFileClient with the path of the historical
+        data csv on the local filesystem, HISTORICAL_DATA_PATH by default
+        or the AZURE_STORAGE_BLOB_NAME file of LOCAL_STORAGE_DIR.
+        The deltas are the csv files of HISTORICAL_DELTA_DIR, the deltas
+        directory next to the historical data by default.
+        """
+        self.path = path or getenv("HISTORICAL_DATA_PATH")
+        if not self.path and getenv("LOCAL_STORAGE_DIR"):
+            self.path = os.path.join(
+                getenv("LOCAL_STORAGE_DIR"),
+                getenv("AZURE_STORAGE_BLOB_NAME", "historical_data.csv"),
+            )
+        self.range_size = range_size
+        self.delta_dir = getenv("HISTORICAL_DELTA_DIR")
+        if not self.delta_dir and self.path:
+            self.delta_dir = os.path.join(os.path.dirname(self.path), "deltas")
+
+    async def initialize_client(self):
+        """
+        Checks that the historical data file exists.
+        """
+        if not self.path or not os.path.isfile(self.path):
+            raise FileNotFoundError(f"No historical data at {self.path}")
+
+    @staticmethod
+    def _get_version(stat: os.stat_result) -> str:
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    async def get_historical_data_version(self) -> str:
+        """
+        Returns an ETag like version of the file, built from its
+        modification time and size.
+        """
+        stat = await asyncio.to_thread(os.stat, self.path)
+        return self._get_version(stat)
+
+    async def get_historical_data_size(self) -> int:
+        """
+        Returns the size of the file in bytes.
+        """
+        stat = await asyncio.to_thread(os.stat, self.path)
+        return stat.st_size
+
+    def _read_range(
+        self, offset: int, length: int, version: Optional[str]
+    ) -> bytes:
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if (
+                version is not None
+                and self._get_version(os.fstat(fd)) != version
+            ):
+                raise DataVersionChangedError(
+                    f"{self.path} changed from version {version}"
+                )
+            return os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+
+    async def read_historical_data_range(
+        self, offset: int, length: int, version: Optional[str] = None
+    ) -> bytes:
+        """
+        Reads a byte range of the file, as a ranged blob download does.
+        """
+        return await asyncio.to_thread(
+            self._read_range, offset, length, version
+        )
+
+    def _list_deltas(self) -> List[str]:
+        if not self.delta_dir or not os.path.isdir(self.delta_dir):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.delta_dir)
+            if name.endswith(".csv")
+        )
+
+    async def list_historical_deltas(self) -> List[str]:
+        """
+        Returns the csv files of the deltas directory, sorted by name.
+        """
+        return await asyncio.to_thread(self._list_deltas)
+
+    def _read_delta(self, name: str) -> bytes:
+        with open(os.path.join(self.delta_dir, name), "rb") as file:
+            return file.read()
+
+    async def read_historical_delta(self, name: str) -> bytes:
+        """
+        Reads a delta file of the deltas directory.
+        """
+        return await asyncio.to_thread(self._read_delta, name)
@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+import logging
+from os import getenv
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANGE_SIZE = 8 * 1024 * 1024
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5
+
+
+class DataVersionChangedError(Exception):
+    """The data changed in the storage while it was downloaded."""
+
+    pass
+
+
+def get_download_settings() -> Dict:
+    """Get the ranged download settings, configured from the environment."""
+    return {
+        "range_size": int(
+            getenv("HISTORICAL_DOWNLOAD_RANGE_SIZE", DEFAULT_RANGE_SIZE)
+        ),
+        "concurrency": int(
+            getenv("HISTORICAL_DOWNLOAD_CONCURRENCY", DEFAULT_CONCURRENCY)
+        ),
+        "retries": int(getenv("HISTORICAL_DOWNLOAD_RETRIES", DEFAULT_RETRIES)),
+        "retry_delay": float(
+            getenv("HISTORICAL_DOWNLOAD_RETRY_DELAY", DEFAULT_RETRY_DELAY)
+        ),
+    }
+
+
+def split_ranges(size: int, range_size: int) -> List[Tuple[int, int]]:
+    """Split a size into consecutive (offset, length) ranges."""
+    return [
+        (offset, min(range_size, size - offset))
+        for offset in range(0, size, range_size)
+    ]
+
+
+async def read_range_with_retries(
+    read_range: Callable[[int, int], Awaitable[bytes]],
+    offset: int,
+    length: int,
+    retries: int,
+    retry_delay: float,
+) -> bytes:
+    """
+    Read a byte range, retrying failed and short reads with an
+    exponential backoff.
+
+    Raises:
+    - DataVersionChangedError: If the data changed, it is not retried.
+    - Exception: The error of the last attempt.
+    """
+
+    for attempt in range(retries + 1):
+        try:
+            chunk = await read_range(offset, length)
+            if len(chunk) != length:
+                raise IOError(
+                    f"Short read at offset {offset}: "
+                    f"{len(chunk)} of {length} bytes"
+                )
+            return chunk
+        except DataVersionChangedError:
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logger.warning(
+                f"Retrying range at offset {offset} after error: {e}"
+            )
+            await asyncio.sleep(retry_delay * 2**attempt)
+
+
+async def download_ranges(
+    read_range: Callable[[int, int], Awaitable[bytes]],
+    size: int,
+    range_size: int = DEFAULT_RANGE_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> AsyncIterator[bytes]:
+    """
+    Download the byte ranges of an object concurrently and yield them in
+    order.
+
+    At most ``concurrency`` ranges are in flight, so the memory held is
+    bounded by ``concurrency * range_size`` whatever the object size, and
+    the ranges are handed over as downloaded, never joined into a copy of
+    the whole object.
+
+    Parameters:
+    - read_range (Callable): Reads the bytes at an offset and length.
+    - size (int): The size of the object in bytes.
+    - range_size (int): The size of the ranges in bytes.
+    - concurrency (int): The maximum number of ranges in flight.
+    - retries (int): The number of retries of a failed range.
+    - retry_delay (float): The delay before the first retry in seconds.
+
+    Returns:
+    - AsyncIterator[bytes]: The ranges, in order.
+    """
+
+    ranges = deque(split_ranges(size, range_size))
+    in_flight: deque = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < max(concurrency, 1):
+                offset, length = ranges.popleft()
+                in_flight.append(
+                    asyncio.ensure_future(
+                        read_range_with_retries(
+                            read_range, offset, length, retries, retry_delay
+                        )
+                    )
+                )
+            yield await in_flight.popleft()
+    finally:
+        for task in in_flight:
+            task.cancel()
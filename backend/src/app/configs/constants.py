@@ -25,9 +25,29 @@ class PerformanceSection(Enum):
     WAIT_TIME = "wait_time"
 
 
+class TimeResolution(Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
 class LaneType(Enum):
     MANNED_TRADITIONAL = "Manned Traditional"
     REVERSIBLE_MCO_TRADITIONAL_EXPRESS = "Reversible MCO Traditional Express"
     SCO_BULLPEN = "SCO Bullpen"
     MANNED_EXPRESS = "Manned Express"
     SCO_INDIVIDUAL = "SCO Individual"
+
+
+# Lanes open per lane type when the history was recorded, the queueing
+# model is calibrated against them. The history does not record them, so
+# these are assumed for every store unless BASELINE_LANE_COUNTS_PATH gives
+# the lane counts of the stores, see ``BaselineLaneCounts``
+BASELINE_LANE_COUNTS = {
+    LaneType.MANNED_TRADITIONAL: 6,
+    LaneType.REVERSIBLE_MCO_TRADITIONAL_EXPRESS: 2,
+    LaneType.SCO_BULLPEN: 8,
+    LaneType.MANNED_EXPRESS: 2,
+    LaneType.SCO_INDIVIDUAL: 4,
+}
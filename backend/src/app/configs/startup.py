@@ -1,44 +1,161 @@
+import asyncio
 import logging
 from os import getenv
+from typing import Optional
 from dotenv import load_dotenv
-import pandas as pd
 from backend.src.app.clients.storage.azure_blob import BlobClientHandler
+from backend.src.app.clients.storage.base import StorageClient
+from backend.src.app.clients.storage.local_file import LocalFileClient
 from backend.src.app.configs.constants import CONFIGS
 from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.services.business_services.snapshot import DataSnapshot
 from backend.src.app.services.data_reader import (
     read_csv,
     read_historical_data_from_cloud,
 )
+from backend.src.app.services.executor import reset_executor
 
 
 logger = logging.getLogger(__name__)
 
 
 def initialize_historical_data() -> None:
-    if "HISTORICAL_DATA_FRAME" in CONFIGS and isinstance(
-        CONFIGS["HISTORICAL_DATA_FRAME"], pd.DataFrame
+    if "HISTORICAL_SNAPSHOT" in CONFIGS and isinstance(
+        CONFIGS["HISTORICAL_SNAPSHOT"], DataSnapshot
     ):
         logger.info("Historical data set already initialized")
         return
-    CONFIGS["HISTORICAL_DATA_FRAME"] = read_csv(getenv("HISTORICAL_DATA_PATH"))
+    CONFIGS["HISTORICAL_SNAPSHOT"] = DataSnapshot(
+        read_csv(getenv("HISTORICAL_DATA_PATH"))
+    )
     logger.info("Historical data set successfully")
     return
 
 
+def get_storage_client() -> StorageClient:
+    """
+    Get the storage client of the historical data, HISTORICAL_DATA_SOURCE
+    selects Azure Blob Storage (default) or a local file.
+    """
+    source = getenv("HISTORICAL_DATA_SOURCE", "azure").lower()
+    if source == "azure":
+        return BlobClientHandler()
+    if source == "local":
+        return LocalFileClient()
+    raise ImproperlyConfigured(f"Unknown historical data source: {source}")
+
+
 async def initialize_historical_data_from_cloud() -> None:
-    if "HISTORICAL_DATA_FRAME" in CONFIGS and isinstance(
-        CONFIGS["HISTORICAL_DATA_FRAME"], pd.DataFrame
+    if "HISTORICAL_SNAPSHOT" in CONFIGS and isinstance(
+        CONFIGS["HISTORICAL_SNAPSHOT"], DataSnapshot
     ):
         logger.info("Historical data set already initialized")
         return
-    client = BlobClientHandler()
-    df = await read_historical_data_from_cloud(client)
-    if isinstance(df, pd.DataFrame) and not df.empty:
-        CONFIGS["HISTORICAL_DATA_FRAME"] = df
-        logger.info("Historical data set successfully")
-        return
-    logger.error("Failed to initialize historical data set")
-    return
+    client = get_storage_client()
+    try:
+        await client.initialize_client()
+        try:
+            deltas = await client.list_historical_deltas()
+        except Exception as e:
+            logger.error(f"Error listing historical data deltas: {e}")
+            deltas = []
+        snapshot, _ = await read_historical_data_from_cloud(client, deltas)
+        if snapshot is not None:
+            CONFIGS["HISTORICAL_SNAPSHOT"] = snapshot
+            logger.info("Historical data set successfully")
+            return
+        logger.error("Failed to initialize historical data set")
+    finally:
+        await client.close()
+
+
+async def refresh_historical_data(client: StorageClient) -> bool:
+    """
+    Load a new version of the historical data, or its new deltas, if any,
+    and swap it in.
+
+    When only new deltas were added to the version held, they are
+    appended to the current snapshot, see ``DataSnapshot.append``,
+    otherwise the whole data is loaded again with its deltas. The new
+    snapshot is published to the local cache by the first worker of the
+    node to see it and every worker attaches to the published copy, see
+    ``read_historical_data_from_cloud``, off the event loop. It then
+    replaces the current one in a single assignment. Requests already
+    running keep the snapshot they started with, the old snapshot is
+    released once the last of them finishes.
+
+    Parameters:
+    - client (StorageClient): The initialized storage client.
+
+    Returns:
+    - bool: Whether a new version was loaded.
+    """
+
+    version = await client.get_historical_data_version()
+    names = await client.list_historical_deltas()
+    current = CONFIGS.get("HISTORICAL_SNAPSHOT")
+    if not isinstance(current, DataSnapshot):
+        current = None
+    elif current.base_version == version and tuple(names) == current.deltas:
+        return False
+    snapshot, _ = await read_historical_data_from_cloud(client, names, current)
+    if snapshot is None:
+        logger.error("Failed to refresh historical data set")
+        return False
+    if (
+        current is not None
+        and snapshot.base_version == current.base_version
+        and snapshot.deltas == current.deltas
+    ):
+        # None of the new deltas could be appended
+        return False
+    version = snapshot.version
+    CONFIGS["HISTORICAL_SNAPSHOT"] = snapshot
+    # Process workers hold a copy of the data they were forked with
+    reset_executor()
+    logger.info(f"Historical data set refreshed to version {version}")
+    return True
+
+
+async def poll_historical_data(interval: float) -> None:
+    """
+    Poll the storage for new versions of the historical data until
+    cancelled.
+
+    The storage client is initialized once, on the first poll or the
+    first one after it failed, and closed when polling stops.
+
+    Parameters:
+    - interval (float): The polling interval in seconds.
+    """
+
+    client = get_storage_client()
+    initialized = False
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not initialized:
+                    await client.initialize_client()
+                    initialized = True
+                await refresh_historical_data(client)
+            except Exception as e:
+                logger.error(f"Error refreshing historical data: {e}")
+    finally:
+        await client.close()
+
+
+def start_historical_data_refresh() -> Optional[asyncio.Task]:
+    """
+    Start polling for new historical data every HISTORICAL_REFRESH_INTERVAL
+    seconds, polling is disabled when the interval is not set or 0.
+    """
+
+    interval = float(getenv("HISTORICAL_REFRESH_INTERVAL", 0))
+    if interval <= 0:
+        return None
+    logger.info(f"Polling historical data every {interval} seconds")
+    return asyncio.create_task(poll_historical_data(interval))
 
 
 def load_environment_variables():
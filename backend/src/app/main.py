@@ -6,7 +6,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 
 # from Secweb import SecWeb
@@ -18,12 +18,22 @@ logging.basicConfig(
 
 # flake8: noqa
 # Local Application Imports
+from backend.src.app.api.middlewares import ServerTimingMiddleware
 from backend.src.app.errors import ImproperlyConfigured
 from backend.src.app.configs.startup import (
     initialize_historical_data_from_cloud,
     load_environment_variables,
+    start_historical_data_refresh,
 )
 from backend.src.app.schemas.base import CommonResponse
+from backend.src.app.services.business_services.remodel import (
+    get_baseline_lane_counts,
+)
+from backend.src.app.services.executor import shutdown_executor
+from backend.src.app.services.instrumentation import (
+    is_metrics_enabled,
+    render_metrics,
+)
 from backend.src.app.api.v1.performance_metrics import router
 
 
@@ -34,11 +44,18 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # startup code
     load_environment_variables()
+    # An invalid baseline lane counts file fails the startup rather than
+    # the first remodel request
+    get_baseline_lane_counts()
     await initialize_historical_data_from_cloud()
+    refresh_task = start_historical_data_refresh()
     # 3. establish database connection
     # 4. load basic data into database (create/update)
     yield
     # teardown code
+    if refresh_task is not None:
+        refresh_task.cancel()
+    shutdown_executor()
     # 1. clear model data
     # 2. clear history df to free up space
 
@@ -94,6 +111,8 @@ async def http_exception_handler(request, exc) -> JSONResponse:
 
 
 app.add_middleware(GZipMiddleware)
+# Outermost, so that the total time includes the other middlewares
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(router)
 
@@ -105,3 +124,12 @@ async def root() -> CommonResponse:
         "success": True,
         "message": "application started successfully",
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    if not is_metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,36 +1,41 @@
+from datetime import date, datetime
 import logging
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
 from backend.src.app.configs.constants import (
     DataForm,
     LaneType,
     PerformanceSection,
+    TimeResolution,
 )
 from backend.src.app.schemas.base import CommonResponse
 
 
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_SCENARIOS = 50
+MAX_LANES = 50
+MAX_REPLICATIONS = 256
+MAX_SIMULATED_CUSTOMERS = 10000
+DEFAULT_STORES = [16, 29, 45, 49, 60, 63, 121, 171, 180, 201, 305, 306, 338]
+
+
+def check_lane_counts(
+    lane_counts: Optional[Dict[LaneType, int]]
+) -> Optional[Dict[LaneType, int]]:
+    if lane_counts is not None and any(
+        count < 1 or count > MAX_LANES for count in lane_counts.values()
+    ):
+        logger.error("Invalid lane count")
+        raise ValueError(f"lane counts should be between 1 and {MAX_LANES}")
+    return lane_counts
+
 
 class Params(BaseModel):
     type: PerformanceSection = PerformanceSection.WAIT_TIME
     cluster: int = 1
-    store: List[int] = [
-        16,
-        29,
-        45,
-        49,
-        60,
-        63,
-        121,
-        171,
-        180,
-        201,
-        305,
-        306,
-        338,
-    ]
+    store: List[int] = DEFAULT_STORES
     peak_hour: List[int] = [0, 1]
     lane_types: List[LaneType] = [lane_type for lane_type in LaneType]
     data_form: DataForm = DataForm.HISTORICAL
@@ -38,7 +43,20 @@ class Params(BaseModel):
     october_flag: bool = False
     events_flag: bool = False
     total_year_flag: bool = False
+    # Days of history up to the end date, or the latest date of the data,
+    # all of them when 0
     time_period: int = 0
+    # First and last days of history, both included
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    # Lanes open per lane type for the remodel data form, the lane types
+    # missing keep their baseline lane count
+    lane_counts: Optional[Dict[LaneType, int]] = None
+    # Id of the saved scenario read by the saved model data form
+    saved_model_id: Optional[str] = None
+    # Estimate the means of the historical data from its sample, with
+    # their confidence intervals, instead of computing them exactly
+    approximate: bool = False
 
     @field_validator("cluster", mode="after")
     def validate_cluster(cls, v):
@@ -47,6 +65,39 @@ class Params(BaseModel):
             raise ValueError("cluster should be between 1 and 4")
         return v
 
+    @field_validator("lane_counts", mode="after")
+    def validate_lane_counts(cls, v):
+        return check_lane_counts(v)
+
+    @field_validator("time_period", mode="after")
+    def validate_time_period(cls, v):
+        if v < 0:
+            logger.error("Negative time period")
+            raise ValueError("time_period should not be negative")
+        return v
+
+    @model_validator(mode="after")
+    def validate_date_range(self):
+        if (
+            self.start_date is not None
+            and self.end_date is not None
+            and self.start_date > self.end_date
+        ):
+            logger.error("Start date after end date")
+            raise ValueError("start_date should not be after end_date")
+        return self
+
+    @model_validator(mode="after")
+    def validate_saved_model(self):
+        if self.data_form == DataForm.SAVED_MODEL and not self.saved_model_id:
+            logger.error("Saved model id missing")
+            raise ValueError("saved_model_id is required for saved models")
+        return self
+
+
+class TrendParams(Params):
+    resolution: TimeResolution = TimeResolution.DAY
+
 
 class DFSplitFormat(BaseModel):
     index: List[Union[int, str]]
@@ -56,3 +107,143 @@ class DFSplitFormat(BaseModel):
 
 class Response(CommonResponse):
     data: Dict[str, DFSplitFormat]
+    # Assumptions the results rest on, such as the baseline lane counts
+    # of the queue models
+    assumptions: Optional[List[str]] = None
+
+
+class BatchParams(BaseModel):
+    scenarios: Dict[str, Params]
+
+    @field_validator("scenarios", mode="after")
+    def validate_scenarios(cls, v):
+        if not v or len(v) > MAX_BATCH_SCENARIOS:
+            logger.error("Invalid number of scenarios in batch")
+            raise ValueError(
+                f"scenarios should hold 1 to {MAX_BATCH_SCENARIOS} items"
+            )
+        return v
+
+
+class BatchResult(BaseModel):
+    results: Dict[str, Dict[str, DFSplitFormat]]
+    errors: Dict[str, str]
+
+
+class BatchResponse(CommonResponse):
+    data: BatchResult
+
+
+class DataVersion(BaseModel):
+    version: str
+    rows: int
+    loaded_at: datetime
+    # Bytes held by every column of the data
+    memory_bytes: Dict[str, int]
+
+
+class DataVersionResponse(CommonResponse):
+    data: DataVersion
+
+
+class LaneOptimizationParams(BaseModel):
+    store: List[int] = DEFAULT_STORES
+    lane_types: List[LaneType] = [lane_type for lane_type in LaneType]
+    # Highest average wait time allowed in seconds, the upper limit of the
+    # " 0 - 30 sec" bucket by default
+    target_wait_time: float = 30.0
+
+    @field_validator("store", mode="after")
+    def validate_store(cls, v):
+        if not v:
+            logger.error("No store to optimize")
+            raise ValueError("store should hold at least one store")
+        return v
+
+    @field_validator("target_wait_time", mode="after")
+    def validate_target_wait_time(cls, v):
+        if v <= 0:
+            logger.error("Invalid target wait time")
+            raise ValueError("target_wait_time should be positive")
+        return v
+
+
+class SimulationParams(BaseModel):
+    store: List[int] = DEFAULT_STORES
+    lane_types: List[LaneType] = [lane_type for lane_type in LaneType]
+    # Lanes open per lane type, the lane types missing keep their
+    # baseline lane count
+    lane_counts: Optional[Dict[LaneType, int]] = None
+    replications: int = 16
+    # Customers simulated per replication
+    customers: int = 500
+    seed: int = 0
+
+    @field_validator("store", mode="after")
+    def validate_store(cls, v):
+        if not v:
+            logger.error("No store to simulate")
+            raise ValueError("store should hold at least one store")
+        return v
+
+    @field_validator("lane_counts", mode="after")
+    def validate_lane_counts(cls, v):
+        return check_lane_counts(v)
+
+    @field_validator("replications", mode="after")
+    def validate_replications(cls, v):
+        if v < 1 or v > MAX_REPLICATIONS:
+            logger.error("Invalid number of replications")
+            raise ValueError(
+                f"replications should be between 1 and {MAX_REPLICATIONS}"
+            )
+        return v
+
+    @field_validator("customers", mode="after")
+    def validate_customers(cls, v):
+        if v < 10 or v > MAX_SIMULATED_CUSTOMERS:
+            logger.error("Invalid number of customers")
+            raise ValueError(
+                "customers should be between 10 and "
+                f"{MAX_SIMULATED_CUSTOMERS}"
+            )
+        return v
+
+
+class SimulationResult(BaseModel):
+    queues: DFSplitFormat
+    throughput: DFSplitFormat
+
+
+class SimulationResponse(CommonResponse):
+    data: SimulationResult
+    assumptions: Optional[List[str]] = None
+
+
+class SavedModelParams(BaseModel):
+    name: str
+    lane_counts: Dict[LaneType, int] = {}
+    # Stores kept in the saved scenario, all of them by default
+    store: Optional[List[int]] = None
+
+    @field_validator("lane_counts", mode="after")
+    def validate_lane_counts(cls, v):
+        return check_lane_counts(v)
+
+
+class SavedModel(BaseModel):
+    id: str
+    name: str
+    lane_counts: Dict[str, int]
+    data_version: str
+    created_at: datetime
+    rows: int
+    stores: List[int]
+
+
+class SavedModelResponse(CommonResponse):
+    data: SavedModel
+
+
+class SavedModelListResponse(CommonResponse):
+    data: List[SavedModel]
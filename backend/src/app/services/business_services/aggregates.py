@@ -0,0 +1,329 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.src.app.services.business_services.growable import GrowableFrame
+from backend.src.app.services.business_services.indexes import (
+    DateIndex,
+    PredicateIndex,
+    join_index_columns,
+    split_index_columns,
+)
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+
+
+def get_sum_column(column: str) -> str:
+    return f"{column}__sum"
+
+
+def get_count_column(column: str) -> str:
+    return f"{column}__count"
+
+
+class CellTable:
+    """
+    Cells of sums and counts, keyed by their dimensions, with the
+    ``PredicateIndex`` of the index columns and, for cells keyed by a
+    'period' first, the ``DateIndex`` of the periods.
+
+    Appending cells grows the table and its indexes in place, see
+    ``GrowableFrame``, so several cells may share a key: they add up as
+    any selected cells do. Once the appended cells outnumber the others,
+    the table is regrouped into one cell per key, so the table stays
+    about the size of its keys at an amortized cost proportional to the
+    appended cells.
+    """
+
+    def __init__(
+        self,
+        cells: pd.DataFrame,
+        dimensions: List[str],
+        index_columns: List[str],
+    ):
+        self.dimensions = dimensions
+        self.index_columns = index_columns
+        self._cells = GrowableFrame.wrap(cells)
+        self.index = PredicateIndex(cells, index_columns)
+        self.periods = (
+            DateIndex(cells["period"]) if "period" in cells.columns else None
+        )
+        self.num_compacted = len(cells)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, meta: Dict) -> "CellTable":
+        """
+        Attach a table to the cells and index arrays saved by ``to_frame``,
+        without copying nor regrouping the cells.
+        """
+
+        cells, arrays = split_index_columns(frame)
+        table = cls.__new__(cls)
+        table.dimensions = meta["dimensions"]
+        table.index_columns = meta["index_columns"]
+        table._cells = GrowableFrame.wrap(cells)
+        table.index = PredicateIndex.from_arrays(
+            len(cells), arrays, meta["indexes"]
+        )
+        table.periods = (
+            DateIndex(cells["period"]) if "period" in cells.columns else None
+        )
+        table.num_compacted = meta["num_compacted"]
+        return table
+
+    def to_frame(self) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Get the cells with the arrays of their index as extra columns, and
+        the description of the table, to save them, see ``from_frame``.
+        """
+
+        arrays, indexes = self.index.get_arrays()
+        return join_index_columns(self.cells, arrays), {
+            "dimensions": self.dimensions,
+            "index_columns": self.index_columns,
+            "num_compacted": self.num_compacted,
+            "indexes": indexes,
+        }
+
+    @property
+    def cells(self) -> pd.DataFrame:
+        return self._cells.frame
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def append(self, cells: pd.DataFrame) -> "CellTable":
+        """
+        Append cells with the same columns, keeping this table unchanged.
+
+        Raises:
+        - ValueError: If the cells cannot be appended, see
+            ``GrowableFrame.append`` and ``DateIndex.extend``.
+        """
+
+        start = len(self)
+        table = CellTable.__new__(CellTable)
+        table.dimensions = self.dimensions
+        table.index_columns = self.index_columns
+        table._cells = self._cells.append(cells)
+        table.num_compacted = self.num_compacted
+        if len(table) - table.num_compacted > table.num_compacted:
+            return table.compact()
+        table.index = self.index.extend(table.cells, start)
+        table.periods = (
+            None
+            if self.periods is None
+            else self.periods.extend(table.cells["period"], start)
+        )
+        return table
+
+    def compact(self) -> "CellTable":
+        """Regroup the cells into one cell per key."""
+        cells = self.cells
+        totals = [
+            column for column in cells.columns if column not in self.dimensions
+        ]
+        return CellTable(
+            cells.groupby(
+                self.dimensions, observed=True, dropna=False, sort=True
+            )[totals]
+            .sum()
+            .reset_index(),
+            self.dimensions,
+            self.index_columns,
+        )
+
+
+class AggregateCube:
+    """
+    Sum and count of the metric target columns per cell, built once at
+    load time.
+
+    A cell is a distinct combination of the filter columns and the
+    grouping columns of a metric, so a grouped mean over any filtered
+    subset is the sum of the matching cells divided by their count.
+    The cube size depends on the cardinality of the dimensions only,
+    not on the number of rows, and the cells are selected through their
+    own ``PredicateIndex``. Appended rows are aggregated on their own,
+    see ``extend``.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        filter_columns: List[str],
+        metrics: Iterable[GroupedMean],
+    ):
+        self.filter_columns = [
+            column for column in filter_columns if column in df.columns
+        ]
+        target_cols = {}
+        for metric in metrics:
+            group_by_cols = tuple(metric.group_by_cols)
+            target_cols.setdefault(group_by_cols, set()).update(
+                metric.target_cols.values()
+            )
+        self.target_cols = {
+            group_by_cols: sorted(cols)
+            for group_by_cols, cols in target_cols.items()
+            if all(column in df.columns for column in group_by_cols)
+        }
+        self.tables = {
+            group_by_cols: CellTable(
+                self._build_cells(df, group_by_cols),
+                self._get_dimensions(group_by_cols),
+                self.filter_columns,
+            )
+            for group_by_cols in self.target_cols
+        }
+
+    @classmethod
+    def from_frames(
+        cls, frames: Dict[str, pd.DataFrame], meta: Dict
+    ) -> "AggregateCube":
+        """
+        Attach a cube to the cells saved by ``to_frames``, without
+        aggregating any row.
+        """
+
+        cube = cls.__new__(cls)
+        cube.filter_columns = meta["filter_columns"]
+        cube.target_cols = {}
+        cube.tables = {}
+        for name, table_meta in meta["tables"].items():
+            group_by_cols = tuple(table_meta["group_by_cols"])
+            cube.target_cols[group_by_cols] = table_meta["target_cols"]
+            cube.tables[group_by_cols] = CellTable.from_frame(
+                frames[name], table_meta
+            )
+        return cube
+
+    def to_frames(self) -> Tuple[Dict[str, pd.DataFrame], Dict]:
+        """
+        Get the cells of every grouping, see ``CellTable.to_frame``, and
+        the description of the cube, to save them, see ``from_frames``.
+        """
+
+        frames = {}
+        tables = {}
+        for position, (group_by_cols, table) in enumerate(self.tables.items()):
+            name = str(position)
+            frames[name], table_meta = table.to_frame()
+            tables[name] = {
+                "group_by_cols": list(group_by_cols),
+                "target_cols": self.target_cols[group_by_cols],
+                **table_meta,
+            }
+        return frames, {
+            "filter_columns": self.filter_columns,
+            "tables": tables,
+        }
+
+    @property
+    def cells(self) -> Dict[Tuple[str, ...], pd.DataFrame]:
+        return {
+            group_by_cols: table.cells
+            for group_by_cols, table in self.tables.items()
+        }
+
+    @property
+    def indexes(self) -> Dict[Tuple[str, ...], PredicateIndex]:
+        return {
+            group_by_cols: table.index
+            for group_by_cols, table in self.tables.items()
+        }
+
+    def _get_dimensions(self, group_by_cols: Tuple[str, ...]) -> List[str]:
+        return self.filter_columns + [
+            column
+            for column in group_by_cols
+            if column not in self.filter_columns
+        ]
+
+    def _build_cells(
+        self, df: pd.DataFrame, group_by_cols: Tuple[str, ...]
+    ) -> pd.DataFrame:
+        grouped = df.groupby(
+            self._get_dimensions(group_by_cols), observed=True, dropna=False
+        )
+        aggregations = {}
+        for column in self.target_cols[group_by_cols]:
+            aggregations[get_sum_column(column)] = (column, "sum")
+            aggregations[get_count_column(column)] = (column, "count")
+        return grouped.agg(**aggregations).reset_index()
+
+    def extend(self, df: pd.DataFrame) -> "AggregateCube":
+        """
+        Build the cube of the data with rows appended, from the appended
+        rows only, see ``CellTable.append``.
+
+        Parameters:
+        - df (pd.DataFrame): The appended rows.
+
+        Returns:
+        - AggregateCube: The cube of the whole data, this one is unchanged.
+        """
+
+        cube = AggregateCube.__new__(AggregateCube)
+        cube.filter_columns = self.filter_columns
+        cube.target_cols = self.target_cols
+        cube.tables = {
+            group_by_cols: table.append(self._build_cells(df, group_by_cols))
+            for group_by_cols, table in self.tables.items()
+        }
+        return cube
+
+    def can_answer(self, metrics: Iterable[GroupedMean]) -> bool:
+        """Check whether the cube holds the cells of all the metrics."""
+        return all(
+            isinstance(metric, GroupedMean)
+            and tuple(metric.group_by_cols) in self.tables
+            for metric in metrics
+        )
+
+    def select_cells(
+        self, group_by_cols: Tuple[str, ...], predicates: Dict[str, List]
+    ) -> pd.DataFrame:
+        """Get the cells of a grouping matching all the predicates."""
+        table = self.tables[group_by_cols]
+        cells = table.cells
+        rows = table.index.select(predicates)
+        return cells if rows is None else cells.take(rows)
+
+    def aggregate(
+        self,
+        metric: GroupedMean,
+        predicates: Dict[str, List],
+        cells: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        Calculate the group means of a metric from the matching cells.
+
+        Parameters:
+        - metric (GroupedMean): The metric to calculate.
+        - predicates (Dict[str, List]): The filter predicates.
+        - cells (pd.DataFrame): The already selected cells, if any.
+
+        Returns:
+        - pd.DataFrame: The means indexed by the metric groups, as returned
+            by ``GroupedMean.aggregate``.
+        """
+
+        if cells is None:
+            cells = self.select_cells(tuple(metric.group_by_cols), predicates)
+        totals = cells.groupby(metric.group_by_cols, observed=True)[
+            [
+                aggregation(column)
+                for column in set(metric.target_cols.values())
+                for aggregation in (get_sum_column, get_count_column)
+            ]
+        ].sum()
+        return pd.DataFrame(
+            {
+                name: totals[get_sum_column(column)]
+                / totals[get_count_column(column)]
+                for name, column in metric.target_cols.items()
+            },
+            index=totals.index,
+        )
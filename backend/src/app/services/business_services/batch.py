@@ -0,0 +1,317 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.services.business_services.aggregates import (
+    AggregateCube,
+    get_count_column,
+    get_sum_column,
+)
+from backend.src.app.services.business_services.cache import normalize_value
+from backend.src.app.services.business_services.indexes import PredicateIndex
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+from backend.src.app.services.business_services.metrics.fused import (
+    factorize_column,
+)
+
+
+class ScenarioSelector:
+    """
+    Select the rows of several scenarios from the same indexed table.
+
+    The mask of every distinct predicate is built once and shared by all
+    the scenarios using it, scenarios with the same predicates share
+    their selection.
+    """
+
+    def __init__(self, index: PredicateIndex):
+        self.index = index
+        self._masks: Dict = {}
+        self._selections: Dict = {}
+
+    def get_mask(self, column: str, values: List) -> Optional[np.ndarray]:
+        """Get the mask of a predicate, None when it keeps every row."""
+        key = (column, normalize_value(values))
+        if key not in self._masks:
+            column_index = self.index.columns[column]
+            codes = column_index.get_codes(values)
+            if column_index.counts[codes].sum() == self.index.num_rows:
+                self._masks[key] = None
+            else:
+                self._masks[key] = column_index.get_mask(codes)
+        return self._masks[key]
+
+    def select(
+        self,
+        predicates: Dict[str, List],
+        row_mask: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Get the sorted positions of the rows matching all the predicates
+        and the row mask, if any.
+        """
+
+        key = normalize_value(predicates)
+        if row_mask is None and key in self._selections:
+            return self._selections[key]
+        mask = row_mask
+        for column, values in predicates.items():
+            predicate_mask = self.get_mask(column, values)
+            if predicate_mask is None:
+                continue
+            mask = (
+                predicate_mask
+                if mask is None
+                else np.logical_and(mask, predicate_mask)
+            )
+        rows = (
+            np.arange(self.index.num_rows)
+            if mask is None
+            else np.flatnonzero(mask)
+        )
+        if row_mask is None:
+            self._selections[key] = rows
+        return rows
+
+
+def calculate_scenario_means(
+    table: pd.DataFrame,
+    group_by_cols: Tuple[str, ...],
+    target_totals: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    scenario_rows: List[np.ndarray],
+    derived_cols: Optional[Dict[str, Callable]] = None,
+) -> List[Tuple[pd.MultiIndex, Dict[str, np.ndarray]]]:
+    """
+    Calculate the group means of several scenarios.
+
+    The grouping columns are factorized once for all the scenarios, the
+    rows of every scenario are then grouped on their own with
+    ``np.bincount`` into the shared totals, so no more than the rows of
+    one scenario are gathered at a time.
+
+    Parameters:
+    - table (pd.DataFrame): The rows or cells holding the grouping columns.
+    - group_by_cols (Tuple[str, ...]): The two grouping columns.
+    - target_totals (Dict[str, Tuple[np.ndarray, np.ndarray]]): A
+        dictionary where keys are target columns and values are the sum
+        and the count of the column per row of the table.
+    - scenario_rows (List[np.ndarray]): The selected rows of every
+        scenario.
+    - derived_cols (Dict[str, Callable]): The derivation of the grouping
+        columns missing from the table.
+
+    Returns:
+    - list: The observed groups and the means of every target column,
+        per scenario.
+    """
+
+    derived_cols = derived_cols or {}
+    (outer_codes, outer_labels), (inner_codes, inner_labels) = (
+        factorize_column(
+            table[column]
+            if column in table.columns
+            else pd.Series(derived_cols[column](table))
+        )
+        for column in group_by_cols
+    )
+    num_scenarios = len(scenario_rows)
+    num_inner = len(inner_labels)
+    num_groups = len(outer_labels) * num_inner
+
+    presence = np.zeros((num_scenarios, num_groups), dtype=np.intp)
+    totals = {
+        column: (
+            np.zeros((num_scenarios, num_groups)),
+            np.zeros((num_scenarios, num_groups)),
+        )
+        for column in target_totals
+    }
+    for scenario_id, rows in enumerate(scenario_rows):
+        outer, inner = outer_codes[rows], inner_codes[rows]
+        codes = outer.astype(np.intp) * num_inner + inner
+        valid = (outer >= 0) & (inner >= 0)
+        if not valid.all():
+            rows, codes = rows[valid], codes[valid]
+        presence[scenario_id] = np.bincount(codes, minlength=num_groups)
+        for column, (sums, counts) in target_totals.items():
+            scenario_sums, scenario_counts = totals[column]
+            scenario_sums[scenario_id] = np.bincount(
+                codes, weights=sums[rows], minlength=num_groups
+            )
+            scenario_counts[scenario_id] = np.bincount(
+                codes, weights=counts[rows], minlength=num_groups
+            )
+
+    results = []
+    for scenario_id in range(num_scenarios):
+        observed = np.flatnonzero(presence[scenario_id])
+        index = pd.MultiIndex.from_arrays(
+            [
+                outer_labels.take(observed // num_inner),
+                inner_labels.take(observed % num_inner),
+            ],
+            names=list(group_by_cols),
+        )
+        means = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for column, (sums, counts) in totals.items():
+                means[column] = (
+                    sums[scenario_id, observed] / counts[scenario_id, observed]
+                )
+        results.append((index, means))
+    return results
+
+
+def shape_scenario_means(
+    metric_functions: Dict[str, GroupedMean],
+    grouping_means: Dict[Tuple[str, ...], List],
+    scenario_id: int,
+) -> Dict[str, pd.DataFrame]:
+    """Shape the means of a scenario into the metric results."""
+    metric_results = {}
+    for metric_name, metric in metric_functions.items():
+        index, means = grouping_means[tuple(metric.group_by_cols)][scenario_id]
+        metric_results[metric_name] = metric.shape(
+            pd.DataFrame(
+                {
+                    name: means[column]
+                    for name, column in metric.target_cols.items()
+                },
+                index=index,
+            )
+        )
+    return metric_results
+
+
+def get_groupings(
+    metric_functions: Dict[str, GroupedMean]
+) -> Dict[Tuple[str, ...], Tuple[GroupedMean, set]]:
+    """Get the target columns of every grouping of the metrics."""
+    groupings = {}
+    for metric in metric_functions.values():
+        _, target_cols = groupings.setdefault(
+            tuple(metric.group_by_cols), (metric, set())
+        )
+        target_cols.update(metric.target_cols.values())
+    return groupings
+
+
+def evaluate_scenarios_on_cube(
+    cube: AggregateCube,
+    scenario_predicates: List[Dict[str, List]],
+    metric_functions: Dict[str, GroupedMean],
+) -> List[Optional[Dict[str, pd.DataFrame]]]:
+    """
+    Calculate the metrics of several scenarios from the cells of the cube.
+
+    Parameters:
+    - cube (AggregateCube): The pre-aggregated kpi data.
+    - scenario_predicates (List[Dict[str, List]]): The filter predicates of
+        every scenario.
+    - metric_functions (Dict[str, GroupedMean]): The metrics held by the
+        cube.
+
+    Returns:
+    - list: The metric results of every scenario, None for the scenarios
+        matching no cell.
+    """
+
+    empty = [False] * len(scenario_predicates)
+    grouping_means = {}
+    for group_by_cols, (metric, target_cols) in get_groupings(
+        metric_functions
+    ).items():
+        table = cube.tables[group_by_cols]
+        cells = table.cells
+        selector = ScenarioSelector(table.index)
+        scenario_rows = [
+            selector.select(predicates) for predicates in scenario_predicates
+        ]
+        for scenario_id, rows in enumerate(scenario_rows):
+            empty[scenario_id] = empty[scenario_id] or not len(rows)
+        target_totals = {
+            column: (
+                cells[get_sum_column(column)].to_numpy(dtype=np.float64),
+                cells[get_count_column(column)].to_numpy(dtype=np.float64),
+            )
+            for column in target_cols
+        }
+        grouping_means[group_by_cols] = calculate_scenario_means(
+            cells, group_by_cols, target_totals, scenario_rows
+        )
+
+    return [
+        (
+            None
+            if empty[scenario_id]
+            else shape_scenario_means(
+                metric_functions, grouping_means, scenario_id
+            )
+        )
+        for scenario_id in range(len(scenario_predicates))
+    ]
+
+
+def evaluate_scenarios_on_rows(
+    frame: pd.DataFrame,
+    index: PredicateIndex,
+    scenario_predicates: List[Dict[str, List]],
+    row_masks: List[Optional[np.ndarray]],
+    metric_functions: Dict[str, GroupedMean],
+) -> List[Optional[Dict[str, pd.DataFrame]]]:
+    """
+    Calculate the metrics of several scenarios from the rows of the data.
+
+    Parameters:
+    - frame (pd.DataFrame): The kpi data.
+    - index (PredicateIndex): The predicate index of the kpi data.
+    - scenario_predicates (List[Dict[str, List]]): The filter predicates of
+        every scenario.
+    - row_masks (List[Optional[np.ndarray]]): The additional row filter of
+        every scenario, if any.
+    - metric_functions (Dict[str, GroupedMean]): The metrics.
+
+    Returns:
+    - list: The metric results of every scenario, None for the scenarios
+        matching no row.
+    """
+
+    selector = ScenarioSelector(index)
+    scenario_rows = [
+        selector.select(predicates, row_mask)
+        for predicates, row_mask in zip(scenario_predicates, row_masks)
+    ]
+    target_totals = {}
+    grouping_means = {}
+    for group_by_cols, (metric, target_cols) in get_groupings(
+        metric_functions
+    ).items():
+        for column in target_cols:
+            if column not in target_totals:
+                values = frame[column].to_numpy(dtype=np.float64)
+                missing = np.isnan(values)
+                target_totals[column] = (
+                    np.where(missing, 0.0, values),
+                    (~missing).astype(np.float64),
+                )
+        grouping_means[group_by_cols] = calculate_scenario_means(
+            frame,
+            group_by_cols,
+            {column: target_totals[column] for column in target_cols},
+            scenario_rows,
+            metric.derived_cols,
+        )
+
+    return [
+        (
+            None
+            if not len(rows)
+            else shape_scenario_means(
+                metric_functions, grouping_means, scenario_id
+            )
+        )
+        for scenario_id, rows in enumerate(scenario_rows)
+    ]
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from enum import Enum
+import logging
+from os import getenv
+import sys
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_value(value: Any) -> Hashable:
+    """Normalize a parameter value into a hashable, order free value."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple, set)):
+        return tuple(
+            sorted({normalize_value(item) for item in value}, key=repr)
+        )
+    if isinstance(value, dict):
+        return tuple(
+            sorted(
+                (
+                    (normalize_value(key), normalize_value(item))
+                    for key, item in value.items()
+                ),
+                key=repr,
+            )
+        )
+    return value
+
+
+def get_params_key(params: BaseModel) -> Tuple:
+    """
+    Get the cache key of the request parameters.
+
+    List fields are deduplicated and sorted and enums are replaced by their
+    values, so requests asking for the same data share the same key.
+    """
+
+    return tuple(
+        (field_name, normalize_value(value)) for field_name, value in params
+    )
+
+
+def estimate_size(value: Any) -> int:
+    """Estimate the memory held by a result made of dicts, lists and frames."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(key) + estimate_size(item)
+            for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache of computed results, bounded by entries and bytes.
+
+    Results are stored under the version of the data they were computed
+    on along with their key. Results of several versions, such as the
+    historical data and the saved models, live side by side, and the
+    results of a replaced version are evicted as they age.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, version: Hashable, key: Hashable) -> Optional[Any]:
+        entry_key = (version, key)
+        with self._lock:
+            if entry_key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return self._entries[entry_key][0]
+
+    def put(self, version: Hashable, key: Hashable, value: Any) -> None:
+        size = estimate_size(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        entry_key = (version, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self.current_bytes -= self._entries.pop(entry_key)[1]
+            self._entries[entry_key] = (value, size)
+            self.current_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.current_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+        }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process wide result cache, configured from the environment."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            max_entries=int(
+                getenv("RESULT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+            ),
+            max_bytes=int(getenv("RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+    return _result_cache
@@ -0,0 +1,161 @@
+import logging
+from os import getenv
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import TimeResolution
+from backend.src.app.services.business_services.filters import FILTER_COLUMNS
+from backend.src.app.services.business_services.metrics.trend import (
+    get_trend_metrics,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.optimizer import (
+    OPTIMIZATION_QUEUE_COLUMNS,
+)
+from backend.src.app.services.business_services.remodel import (
+    QUEUE_COLUMNS,
+    QUEUE_TARGET_COLUMNS,
+)
+from backend.src.app.services.business_services.rollups import (
+    ROLLUP_TARGET_COLUMNS,
+)
+from backend.src.app.services.business_services.sampling import (
+    STRATA_COLUMNS,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Narrowest types the numeric columns of the historical data are stored
+# in, when their values fit
+COLUMN_STORAGE_TYPES = {
+    "new_clusters": "int8",
+    "peak_hour": "int8",
+    "Covid_Effect": "int8",
+    "hour": "int8",
+    "avg_waiting_time_Tq": "float32",
+    "avg_num_wait_queue_Nq": "float32",
+}
+# Columns materialized when the data is prepared and the columns of the
+# data they are derived from, see ``prepare_kpi_frame``
+DERIVED_COLUMNS = {
+    "month": ["date"],
+    "Shoppers_BKT": ["avg_num_wait_queue_Nq"],
+}
+# Largest absolute error a value may get from a float column downcast
+DEFAULT_DOWNCAST_FLOAT_TOLERANCE = 1e-3
+
+
+def get_downcast_float_tolerance() -> float:
+    return float(
+        getenv("DOWNCAST_FLOAT_TOLERANCE", DEFAULT_DOWNCAST_FLOAT_TOLERANCE)
+    )
+
+
+def get_column_requirements() -> Dict[str, List[str]]:
+    """
+    Get the columns of the data every filter, metric and prebuilt
+    structure of the snapshot reads.
+
+    Returns:
+    - dict: A dictionary where keys are the names of the consumers and
+        values are the columns they read, derived ones included.
+    """
+
+    requirements = {
+        "filters": FILTER_COLUMNS,
+        "dates": ["date"],
+        "rollups": ["date"] + FILTER_COLUMNS + ROLLUP_TARGET_COLUMNS,
+        "sample": STRATA_COLUMNS,
+        "remodel": QUEUE_COLUMNS + QUEUE_TARGET_COLUMNS,
+        "optimizer": OPTIMIZATION_QUEUE_COLUMNS + QUEUE_TARGET_COLUMNS,
+        "simulation": QUEUE_COLUMNS + QUEUE_TARGET_COLUMNS,
+    }
+    for metric_name, metric in wait_time_metrics.items():
+        requirements[f"metric:{metric_name}"] = metric.columns
+    for resolution in TimeResolution:
+        for metric_name, metric in get_trend_metrics(resolution).items():
+            requirements[
+                f"trend:{resolution.value}:{metric_name}"
+            ] = metric.columns
+    return requirements
+
+
+def get_required_columns() -> List[str]:
+    """
+    Get the columns of the data to load, the union of the columns every
+    consumer reads with the derived columns replaced by their sources,
+    see ``get_column_requirements``.
+    """
+
+    columns = {}
+    for consumer_columns in get_column_requirements().values():
+        for column in consumer_columns:
+            for source in DERIVED_COLUMNS.get(column, [column]):
+                columns[source] = None
+    return list(columns)
+
+
+def downcast_columns(
+    df: pd.DataFrame,
+    storage_types: Optional[Dict[str, str]] = None,
+    float_tolerance: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Narrow the numeric columns of a DataFrame in place to their storage
+    types, see ``COLUMN_STORAGE_TYPES``.
+
+    A column is only narrowed when all its values fit: integers within
+    the range of the narrower type, floats within ``float_tolerance`` of
+    their narrowed value. Other columns keep their type.
+
+    Parameters:
+    - df (pd.DataFrame): The data.
+    - storage_types (Dict[str, str]): The storage types of the columns.
+    - float_tolerance (float): The largest absolute error of a narrowed
+        float, ``DOWNCAST_FLOAT_TOLERANCE`` if None.
+
+    Returns:
+    - pd.DataFrame: The data, with the columns narrowed.
+    """
+
+    storage_types = (
+        COLUMN_STORAGE_TYPES if storage_types is None else storage_types
+    )
+    if float_tolerance is None:
+        float_tolerance = get_downcast_float_tolerance()
+    for column, storage_type in storage_types.items():
+        if column not in df.columns:
+            continue
+        storage_type = np.dtype(storage_type)
+        values = df[column].to_numpy()
+        if (
+            not isinstance(df[column].dtype, np.dtype)
+            or values.dtype == storage_type
+            or values.dtype.itemsize <= storage_type.itemsize
+        ):
+            continue
+        if storage_type.kind in "iu":
+            if values.dtype.kind not in "iu":
+                continue
+            limits = np.iinfo(storage_type)
+            if len(values) and (
+                values.min() < limits.min or values.max() > limits.max
+            ):
+                logger.debug(f"Column {column} does not fit {storage_type}")
+                continue
+            df[column] = values.astype(storage_type)
+        elif storage_type.kind == "f" and values.dtype.kind == "f":
+            narrowed = values.astype(storage_type)
+            with np.errstate(over="ignore", invalid="ignore"):
+                errors = np.abs(narrowed - values)
+            errors = errors[~np.isnan(values)]
+            if len(errors) and not errors.max() <= float_tolerance:
+                logger.debug(f"Column {column} does not fit {storage_type}")
+                continue
+            df[column] = narrowed
+    return df
@@ -4,3 +4,7 @@ class BaseError(Exception):
 
 class EmptyDataError(BaseError):
     pass
+
+
+class ServiceBusyError(BaseError):
+    pass
@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.src.app.configs.constants import EVENTS
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.indexes import DateIndex
+from backend.src.app.services.business_services.utils import get_enum_values
+
+
+# Columns the request parameters filter on
+FILTER_COLUMNS = [
+    "new_clusters",
+    "store_name",
+    "type_of_checkout",
+    "peak_hour",
+    "Covid_Effect",
+    "event",
+    "month",
+]
+
+
+def get_filter_predicates(params: Params) -> Dict[str, List]:
+    """
+    Translate the request parameters into column predicates.
+
+    Every predicate keeps the rows whose column value is one of the
+    allowed values, all predicates are combined with AND.
+
+    Parameters:
+    - params (Params): The request parameters.
+
+    Returns:
+    - dict: A dictionary where keys are column names and values are
+        the lists of allowed values.
+    """
+
+    predicates = {}
+    if params.cluster:
+        # todo: use enum for column names
+        predicates["new_clusters"] = [params.cluster]
+    if params.store:
+        predicates["store_name"] = params.store
+    if params.lane_types:
+        predicates["type_of_checkout"] = get_enum_values(params.lane_types)
+    if params.peak_hour:
+        predicates["peak_hour"] = params.peak_hour
+    if params.covid_flag:
+        predicates["Covid_Effect"] = [1]
+    if params.events_flag:
+        predicates["event"] = EVENTS
+    if params.october_flag:
+        predicates["month"] = [10]
+    return predicates
+
+
+def has_date_window(params: Params) -> bool:
+    """Check whether the request parameters restrict the dates."""
+    return bool(
+        params.start_date
+        or params.end_date
+        or params.time_period
+        or params.total_year_flag
+    )
+
+
+def get_date_window(
+    params: Params, dates: DateIndex
+) -> Optional[Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]]:
+    """
+    Translate the request parameters into a range of dates.
+
+    The range keeps the rows with a date from its start to before its end,
+    an unset bound leaves that side open. ``time_period`` counts back
+    from the end date, or from the latest date of the data, when no start
+    date is given. ``total_year_flag`` alone keeps every dated row.
+
+    Parameters:
+    - params (Params): The request parameters.
+    - dates (DateIndex): The date index of the data.
+
+    Returns:
+    - tuple: The start and the exclusive end of the range, or None when the
+        parameters do not restrict the dates.
+    """
+
+    if not has_date_window(params):
+        return None
+    one_day = pd.Timedelta(days=1)
+    start = (
+        pd.Timestamp(params.start_date)
+        if params.start_date is not None
+        else None
+    )
+    end = (
+        pd.Timestamp(params.end_date) + one_day
+        if params.end_date is not None
+        else None
+    )
+    if start is None and params.time_period:
+        if end is None and dates.last is not None:
+            end = dates.last.normalize() + one_day
+        if end is not None:
+            start = end - params.time_period * one_day
+    return start, end
@@ -0,0 +1,252 @@
+from os import getenv
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Spare capacity allocated when an array outgrows its buffer, as a share
+# of its new size
+DEFAULT_APPEND_CAPACITY_GROWTH = 0.25
+
+
+def get_capacity_growth() -> float:
+    return float(
+        getenv("APPEND_CAPACITY_GROWTH", DEFAULT_APPEND_CAPACITY_GROWTH)
+    )
+
+
+class _Buffer:
+    """Memory of a growable array and the length of its written prefix."""
+
+    def __init__(self, array: np.ndarray, length: int):
+        self.array = array
+        self.length = length
+        self.lock = Lock()
+
+
+class GrowableArray:
+    """
+    Immutable view of the prefix of a buffer with spare capacity.
+
+    Appending writes the new values after the prefix, in place when the
+    buffer has room and nothing was appended after this prefix yet, and
+    returns a view of the longer prefix. Views taken before never see the
+    new values, so readers of an older version are left untouched. When
+    the buffer is full it is reallocated with ``APPEND_CAPACITY_GROWTH``
+    spare capacity, so the cost of appends is proportional to the values
+    appended, amortized.
+    """
+
+    def __init__(self, buffer: _Buffer, size: int):
+        self._buffer = buffer
+        self.size = size
+
+    @classmethod
+    def wrap(cls, array: np.ndarray) -> "GrowableArray":
+        """Wrap an array without copying it, the first append copies it."""
+        return cls(_Buffer(array, len(array)), len(array))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._buffer.array.dtype
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._buffer.array[: self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, values: np.ndarray) -> "GrowableArray":
+        """
+        Append values, cast to the type of the array.
+
+        Raises:
+        - ValueError: If the values cannot be cast safely.
+        """
+
+        values = np.asarray(values)
+        if not np.can_cast(values.dtype, self.dtype, casting="same_kind"):
+            raise ValueError(
+                f"Cannot append {values.dtype} values to {self.dtype}"
+            )
+        if (
+            self.dtype.kind in "iu"
+            and len(values)
+            and not np.can_cast(values.dtype, self.dtype)
+        ):
+            # Narrowed integer columns must hold the values
+            limits = np.iinfo(self.dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                raise ValueError(
+                    f"Cannot append values out of the range of {self.dtype}"
+                )
+        end = self.size + len(values)
+        buffer = self._buffer
+        with buffer.lock:
+            if (
+                buffer.length == self.size
+                and end <= len(buffer.array)
+                and buffer.array.flags.writeable
+            ):
+                buffer.array[self.size : end] = values
+                buffer.length = end
+                return GrowableArray(buffer, end)
+
+        capacity = max(end, int(end * (1 + get_capacity_growth())))
+        array = np.empty(capacity, dtype=self.dtype)
+        array[: self.size] = self.view
+        array[self.size : end] = values
+        return GrowableArray(_Buffer(array, end), end)
+
+
+def merge_categories(
+    categories: pd.Index, values: pd.Series, codes: GrowableArray
+) -> Tuple[pd.Index, GrowableArray]:
+    """
+    Merge new values into the sorted categories of a column, so the
+    groups of the column come in the same order as after a rebuild.
+
+    The codes of the rows already appended keep their meaning when the
+    new values sort after the categories, they are remapped otherwise.
+    Categories of another order get the new values after them.
+
+    Parameters:
+    - categories (pd.Index): The categories of the column.
+    - values (pd.Series): The values missing from the categories.
+    - codes (GrowableArray): The codes of the rows of the column.
+
+    Returns:
+    - tuple: The merged categories and the codes of the rows.
+
+    Raises:
+    - ValueError: If the new values cannot be sorted with the categories.
+    """
+
+    new_categories = pd.Index(pd.unique(np.asarray(values)))
+    try:
+        merged = categories.append(new_categories.sort_values())
+        if (
+            not categories.is_monotonic_increasing
+            or merged.is_monotonic_increasing
+        ):
+            return merged, codes
+        merged = merged.sort_values()
+    except TypeError as e:
+        raise ValueError(f"Cannot sort the categories: {e}")
+    # The trailing slot keeps missing values (-1) missing
+    code_map = np.append(merged.get_indexer(categories), -1)
+    return merged, GrowableArray.wrap(code_map[codes.view].astype(codes.dtype))
+
+
+class GrowableFrame:
+    """
+    Columns of a DataFrame held in growable arrays, the categorical
+    columns as their codes and categories.
+
+    The frame of every version is built on views of the arrays, without
+    copies, see ``GrowableArray``.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, GrowableArray],
+        categories: Dict[str, pd.Index],
+        num_rows: int,
+    ):
+        self.columns = columns
+        self.categories = categories
+        self.num_rows = num_rows
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def wrap(cls, df: pd.DataFrame) -> "GrowableFrame":
+        """
+        Wrap the columns of a DataFrame without copying them.
+
+        Raises:
+        - ValueError: If a column is neither categorical nor of a numpy
+            type.
+        """
+
+        columns = {}
+        categories = {}
+        for column in df.columns:
+            dtype = df[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                columns[column] = GrowableArray.wrap(
+                    df[column].cat.codes.to_numpy()
+                )
+                categories[column] = dtype.categories
+            elif isinstance(dtype, np.dtype):
+                columns[column] = GrowableArray.wrap(df[column].to_numpy())
+            else:
+                raise ValueError(
+                    f"Column {column} of type {dtype} cannot grow"
+                )
+        growable = cls(columns, categories, len(df))
+        growable._frame = df
+        return growable
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = pd.DataFrame(
+                {
+                    column: (
+                        pd.Categorical.from_codes(
+                            array.view,
+                            dtype=pd.CategoricalDtype(self.categories[column]),
+                            validate=False,
+                        )
+                        if column in self.categories
+                        else array.view
+                    )
+                    for column, array in self.columns.items()
+                },
+                copy=False,
+            )
+        return self._frame
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def append(self, df: pd.DataFrame) -> "GrowableFrame":
+        """
+        Append the rows of a DataFrame with the same columns.
+
+        The values missing from the categories of a categorical column
+        are merged into them in sorted order, as the categories of the
+        rebuilt column would be, see ``merge_categories``.
+
+        Raises:
+        - ValueError: If the columns differ or a column cannot hold the
+            new values.
+        """
+
+        if set(df.columns) != set(self.columns):
+            raise ValueError("The appended rows have other columns")
+        columns = {}
+        categories = dict(self.categories)
+        for column, array in self.columns.items():
+            values = df[column]
+            if column in self.categories:
+                column_categories = self.categories[column]
+                codes = column_categories.get_indexer(values)
+                new_values = values[(codes < 0) & values.notna().to_numpy()]
+                if len(new_values):
+                    column_categories, array = merge_categories(
+                        column_categories, new_values, array
+                    )
+                    codes = column_categories.get_indexer(values)
+                if len(column_categories) > np.iinfo(array.dtype).max:
+                    raise ValueError(f"Too many categories in {column}")
+                categories[column] = column_categories
+                columns[column] = array.append(codes.astype(array.dtype))
+            else:
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    raise ValueError(f"Column {column} became categorical")
+                columns[column] = array.append(values.to_numpy())
+        return GrowableFrame(columns, categories, self.num_rows + len(df))
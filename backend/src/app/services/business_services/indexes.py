@@ -0,0 +1,519 @@
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.services.business_services.growable import GrowableArray
+
+
+# Prefixes of the index columns saved along an indexed table
+CODES_PREFIX = "__codes__."
+ORDER_PREFIX = "__order__."
+
+
+class ColumnIndex:
+    """
+    Inverted index of a single column.
+
+    Every row is mapped to the code of its value (-1 for missing values)
+    and every code to the sorted positions of the rows holding it. The
+    postings grow in place as rows are appended, see ``extend``.
+    """
+
+    def __init__(self, series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # The categorical codes are used as they are, without a copy
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+            codes = codes.astype(np.int32, copy=False)
+        row_dtype = (
+            np.int32 if len(series) < np.iinfo(np.int32).max else np.int64
+        )
+
+        valid = codes >= 0
+        order = np.argsort(codes, kind="stable").astype(row_dtype)
+        order = order[len(order) - int(valid.sum()) :]
+        counts = np.bincount(codes[valid], minlength=len(uniques))
+        self._attach(codes, uniques.tolist(), order, counts)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        codes: np.ndarray,
+        values: List,
+        order: np.ndarray,
+        counts: np.ndarray,
+    ) -> "ColumnIndex":
+        """
+        Rebuild a column index from its arrays, as saved from ``codes``,
+        ``values``, ``order`` and ``counts``, without sorting the rows.
+        """
+
+        column_index = cls.__new__(cls)
+        column_index._attach(codes, values, order, counts)
+        return column_index
+
+    def _attach(
+        self,
+        codes: Union[np.ndarray, GrowableArray],
+        values: List,
+        order: Optional[np.ndarray],
+        counts: np.ndarray,
+        postings: Optional[List[GrowableArray]] = None,
+    ) -> None:
+        if not isinstance(codes, GrowableArray):
+            codes = GrowableArray.wrap(codes)
+        self._codes = codes
+        self.codes = codes.view
+        self.values = values
+        self.code_map = {value: code for code, value in enumerate(values)}
+        # The rows sorted by code, the postings are views of it until
+        # rows are appended
+        self._order = order
+        if postings is None:
+            postings = [
+                GrowableArray.wrap(posting)
+                for posting in np.split(order, np.cumsum(counts)[:-1])
+            ]
+        self._postings = postings
+        self.postings = [posting.view for posting in postings]
+        self.counts = counts
+
+    @property
+    def order(self) -> np.ndarray:
+        """The positions of the rows sorted by code, without missing values."""
+        if self._order is None:
+            self._order = np.concatenate(self.postings[: len(self.counts)])
+        return self._order
+
+    def extend(self, series: pd.Series, start: int) -> "ColumnIndex":
+        """
+        Index the rows appended to a column.
+
+        Only the appended rows are read: their codes are appended to the
+        codes of the column, or read from the grown categorical, and their
+        positions to the postings of their codes.
+
+        Parameters:
+        - series (pd.Series): The whole column, with the appended rows.
+        - start (int): The position of the first appended row.
+
+        Returns:
+        - ColumnIndex: The index of the whole column.
+
+        Raises:
+        - ValueError: If the column outgrows the type of the positions.
+        """
+
+        row_dtype = self.postings[0].dtype if self.postings else np.int64
+        if len(series) >= np.iinfo(row_dtype).max:
+            raise ValueError("Too many rows for the index positions")
+
+        # The codes of the values already indexed
+        value_codes = np.arange(len(self.counts))
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # The codes grow with the categorical column
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories.tolist()
+            new_codes = codes[start:]
+            if values[: len(self.values)] != self.values:
+                # New values were merged before the categories, see
+                # ``merge_categories``
+                value_codes = pd.Index(values).get_indexer(self.values)
+        else:
+            new_series = series.iloc[start:]
+            values = self.values + [
+                value
+                for value in pd.unique(new_series.dropna())
+                if value not in self.code_map
+            ]
+            new_codes = (
+                pd.Index(values).get_indexer(new_series).astype(np.int32)
+            )
+            codes = self._codes.append(new_codes)
+
+        valid = new_codes >= 0
+        new_counts = np.bincount(new_codes[valid], minlength=len(values))
+        counts = new_counts.copy()
+        counts[value_codes] += self.counts
+        order = np.argsort(new_codes, kind="stable")
+        order = (order[len(order) - int(valid.sum()) :] + start).astype(
+            row_dtype
+        )
+        postings = [
+            GrowableArray.wrap(np.empty(0, dtype=row_dtype))
+            for _ in range(len(values))
+        ]
+        for code, posting in zip(value_codes, self._postings):
+            postings[code] = posting
+        for code, rows in zip(
+            np.flatnonzero(new_counts),
+            np.split(order, np.cumsum(new_counts[new_counts > 0])[:-1]),
+        ):
+            postings[code] = postings[code].append(rows)
+
+        column_index = ColumnIndex.__new__(ColumnIndex)
+        column_index._attach(codes, values, None, counts, postings)
+        return column_index
+
+    def get_codes(self, values: List) -> np.ndarray:
+        """Get the codes of the values present in the column."""
+        codes = [
+            self.code_map[value] for value in values if value in self.code_map
+        ]
+        return np.unique(np.array(codes, dtype=np.int32))
+
+    def get_rows(self, codes: np.ndarray) -> np.ndarray:
+        """Get the sorted positions of the rows holding any of the codes."""
+        if len(codes) == 1:
+            return self.postings[codes[0]]
+        # Postings of different codes are disjoint, so their union is
+        # their sorted concatenation
+        return np.sort(np.concatenate([self.postings[code] for code in codes]))
+
+    def contains(self, rows: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Check which of the rows hold any of the codes."""
+        return self._get_allowed(codes)[self.codes[rows]]
+
+    def get_mask(self, codes: np.ndarray) -> np.ndarray:
+        """Get the mask of all the rows holding any of the codes."""
+        return self._get_allowed(codes)[self.codes]
+
+    def _get_allowed(self, codes: np.ndarray) -> np.ndarray:
+        # The extra trailing slot keeps missing values (-1) out of the selection
+        allowed = np.zeros(len(self.counts) + 1, dtype=bool)
+        allowed[codes] = True
+        return allowed
+
+
+class PredicateIndex:
+    """
+    Inverted indexes of the filter columns, built once at load time.
+
+    Selecting rows costs about the size of the most selective predicate,
+    not the size of the whole table.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: List[str]):
+        self.num_rows = len(df)
+        self.columns = {
+            column: ColumnIndex(df[column])
+            for column in columns
+            if column in df.columns
+        }
+
+    @classmethod
+    def from_columns(
+        cls, num_rows: int, columns: Dict[str, ColumnIndex]
+    ) -> "PredicateIndex":
+        """Build a predicate index from the indexes of its columns."""
+        index = cls.__new__(cls)
+        index.num_rows = num_rows
+        index.columns = columns
+        return index
+
+    @classmethod
+    def from_arrays(
+        cls,
+        num_rows: int,
+        arrays: Mapping[str, np.ndarray],
+        columns: Dict[str, Dict],
+    ) -> "PredicateIndex":
+        """
+        Rebuild a predicate index from the arrays and the values and
+        counts of its columns, as returned by ``get_arrays``, without
+        sorting the rows.
+        """
+
+        return cls.from_columns(
+            num_rows,
+            {
+                column: ColumnIndex.from_arrays(
+                    np.asarray(arrays[f"{CODES_PREFIX}{column}"]),
+                    meta["values"],
+                    np.asarray(arrays[f"{ORDER_PREFIX}{column}"]),
+                    np.array(meta["counts"], dtype=np.int64),
+                )
+                for column, meta in columns.items()
+            },
+        )
+
+    def get_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict]]:
+        """
+        Get the arrays of the index, to save as columns of the indexed
+        table, and the values and counts of every column, see
+        ``from_arrays``.
+        """
+
+        arrays = {}
+        columns = {}
+        for column, column_index in self.columns.items():
+            arrays[f"{CODES_PREFIX}{column}"] = column_index.codes
+            arrays[f"{ORDER_PREFIX}{column}"] = column_index.order
+            columns[column] = {
+                "values": column_index.values,
+                "counts": column_index.counts.tolist(),
+            }
+        return arrays, columns
+
+    def extend(self, df: pd.DataFrame, start: int) -> "PredicateIndex":
+        """
+        Index the rows appended to a table from position ``start``, see
+        ``ColumnIndex.extend``.
+        """
+
+        return PredicateIndex.from_columns(
+            len(df),
+            {
+                column: column_index.extend(df[column], start)
+                for column, column_index in self.columns.items()
+            },
+        )
+
+    def select(self, predicates: Dict[str, List]) -> Optional[np.ndarray]:
+        """
+        Get the rows matching all the predicates.
+
+        Parameters:
+        - predicates (Dict[str, List]): A dictionary where keys are column
+            names and values are the lists of allowed values.
+
+        Returns:
+        - np.ndarray: The sorted positions of the matching rows, or None
+            when the predicates keep every row.
+
+        Raises:
+        - KeyError: If a predicate column is not indexed.
+        """
+
+        candidates = []
+        for column, values in predicates.items():
+            column_index = self.columns[column]
+            codes = column_index.get_codes(values)
+            count = int(column_index.counts[codes].sum())
+            if count == 0:
+                return np.array([], dtype=np.int64)
+            # Predicates that keep every row do not narrow the selection
+            if count < self.num_rows:
+                candidates.append((count, column_index, codes))
+
+        if not candidates:
+            return None
+
+        # Start from the most selective predicate and probe the others
+        # only for the rows still selected
+        candidates.sort(key=lambda candidate: candidate[0])
+        _, column_index, codes = candidates[0]
+        rows = column_index.get_rows(codes)
+        for _, column_index, codes in candidates[1:]:
+            rows = rows[column_index.contains(rows, codes)]
+        return rows
+
+
+class DateIndex:
+    """
+    Index of the dates of a table, answering date ranges by binary search.
+
+    The dated rows of a table sorted by date, with the rows without a date
+    last, are selected as a slice of the table. The rows of other tables
+    are reached through ``order``, the dated rows sorted by date.
+    """
+
+    def __init__(self, dates: pd.Series):
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        num_dated = int(np.count_nonzero(~np.isnat(dates)))
+        dated = dates[:num_dated]
+        if np.isnat(dated).any() or (dated[1:] < dated[:-1]).any():
+            # NaT sorts last
+            order = np.argsort(dates, kind="stable")[:num_dated]
+        else:
+            order = None
+        self._attach(dates, order, num_dated)
+
+    @classmethod
+    def from_arrays(
+        cls, dates: np.ndarray, order: Optional[np.ndarray]
+    ) -> "DateIndex":
+        """
+        Rebuild a date index from the dates and the saved ``order``, None
+        for a table sorted by date, without sorting the rows.
+        """
+
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        num_dated = (
+            int(np.count_nonzero(~np.isnat(dates)))
+            if order is None
+            else len(order)
+        )
+        date_index = cls.__new__(cls)
+        date_index._attach(dates, order, num_dated)
+        return date_index
+
+    def _attach(
+        self, dates: np.ndarray, order: Optional[np.ndarray], num_dated: int
+    ) -> None:
+        self.order = order
+        self.num_dated = num_dated
+        self.sorted_dates = (
+            dates[:num_dated] if order is None else dates[order]
+        )
+
+    @property
+    def is_sorted(self) -> bool:
+        return self.order is None
+
+    def extend(self, dates: pd.Series, start: int) -> "DateIndex":
+        """
+        Index the rows appended to a table sorted by date, reading only
+        the appended dates.
+
+        Parameters:
+        - dates (pd.Series): The whole date column, with the appended rows.
+        - start (int): The position of the first appended row.
+
+        Returns:
+        - DateIndex: The index of the whole column.
+
+        Raises:
+        - ValueError: If the table is not sorted by date anymore, the rows
+            without a date must stay last.
+        """
+
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        new_dates = dates[start:]
+        if (
+            not self.is_sorted
+            or self.num_dated < start
+            or np.isnat(new_dates).any()
+            or (new_dates[1:] < new_dates[:-1]).any()
+            or (
+                self.num_dated
+                and len(new_dates)
+                and new_dates[0] < self.sorted_dates[-1]
+            )
+        ):
+            raise ValueError("The appended rows are not sorted by date")
+        date_index = DateIndex.__new__(DateIndex)
+        date_index._attach(dates, None, len(dates))
+        return date_index
+
+    @property
+    def first(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self.sorted_dates[0]) if self.num_dated else None
+
+    @property
+    def last(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self.sorted_dates[-1]) if self.num_dated else None
+
+    def get_bounds(
+        self,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> Tuple[int, int]:
+        """
+        Get the positions in the sorted dates of the dates from ``start``
+        to before ``end``, all of them for a missing bound.
+        """
+
+        return (
+            (
+                0
+                if start is None
+                else int(
+                    np.searchsorted(
+                        self.sorted_dates, np.datetime64(start, "ns")
+                    )
+                )
+            ),
+            (
+                self.num_dated
+                if end is None
+                else int(
+                    np.searchsorted(
+                        self.sorted_dates, np.datetime64(end, "ns")
+                    )
+                )
+            ),
+        )
+
+    def select(
+        self,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> Union[slice, np.ndarray]:
+        """
+        Get the dated rows from ``start`` to before ``end``.
+
+        Returns:
+        - slice | np.ndarray: The slice of the rows of a table sorted by
+            date, the sorted positions of the rows otherwise.
+        """
+
+        low, high = self.get_bounds(start, end)
+        if self.order is None:
+            return slice(low, high)
+        return np.sort(self.order[low:high])
+
+
+def split_index_columns(
+    df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Split the index columns saved along a table from the columns of the
+    table, without copies, see ``PredicateIndex.get_arrays``.
+    """
+
+    is_index = [
+        column.startswith((CODES_PREFIX, ORDER_PREFIX))
+        for column in df.columns
+    ]
+    arrays = {
+        column: df[column].to_numpy()
+        for column, index_column in zip(df.columns, is_index)
+        if index_column
+    }
+    data = pd.DataFrame(
+        {
+            column: df[column]
+            for column, index_column in zip(df.columns, is_index)
+            if not index_column
+        },
+        index=df.index,
+        copy=False,
+    )
+    return data, arrays
+
+
+def join_index_columns(
+    df: pd.DataFrame, arrays: Dict[str, np.ndarray]
+) -> pd.DataFrame:
+    """Add the arrays of an index to the columns of a table, without copies."""
+    return pd.DataFrame(
+        {**{column: df[column] for column in df.columns}, **arrays},
+        index=df.index,
+        copy=False,
+    )
+
+
+def intersect_rows(
+    rows: Optional[np.ndarray], selected: Union[slice, np.ndarray]
+) -> np.ndarray:
+    """
+    Intersect the sorted positions of the rows selected by a predicate
+    index, None for every row, with the rows of a ``DateIndex`` selection.
+    """
+
+    if isinstance(selected, slice):
+        if rows is None:
+            return np.arange(selected.start, selected.stop)
+        # Both are sorted, the slice bounds are found by binary search
+        return rows[
+            np.searchsorted(rows, selected.start) : np.searchsorted(
+                rows, selected.stop
+            )
+        ]
+    if rows is None:
+        return selected
+    return np.intersect1d(rows, selected, assume_unique=True)
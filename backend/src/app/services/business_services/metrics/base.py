@@ -1,11 +1,139 @@
+from typing import Callable, Dict, List, Optional
+
 import numpy as np
+import pandas as pd
+
+
+def calculate_grouped_mean(
+    data: pd.DataFrame, group_by_cols: List, target_cols: Dict[str, str]
+) -> pd.DataFrame:
+    """
+    Calculate the mean of the target columns per group.
+
+    Parameters:
+    - data (pd.DataFrame): The DataFrame containing the filtered data.
+    - group_by_cols (List): The columns (or series) to group by.
+    - target_cols (Dict[str, str]): A dictionary where keys are the names
+        of the result columns and values are the columns to average.
+
+    Returns:
+    - pd.DataFrame: The means indexed by the groups.
+    """
+
+    return data.groupby(group_by_cols, observed=True).agg(
+        **{name: (column, "mean") for name, column in target_cols.items()}
+    )
+
+
+def reindex_pivot(
+    means: pd.DataFrame,
+    index_labels: List,
+    fill_nan: bool = True,
+    fill_value: float = 0,
+) -> pd.DataFrame:
+    """
+    Pivot the group means and reindex them on the given labels, the
+    missing groups are filled with ``fill_value``.
+    """
+    pivot_data = means.iloc[:, 0].unstack()
+    pivot_data.reset_index(inplace=True)
+    pivot_data = pivot_data.set_index(means.index.names[0])
+    pivot_data = pivot_data.reindex(
+        index_labels, fill_value=fill_value
+    ).reset_index()
+    if fill_nan:
+        return pivot_data.replace(np.nan, fill_value)
+    return pivot_data
+
+
+def pivot(means: pd.DataFrame, fill_value: float = 0) -> pd.DataFrame:
+    """
+    Pivot the group means, keeping one column level per target, the
+    missing groups are filled with ``fill_value``.
+    """
+    if len(means.columns) > 1:
+        pivot_data = means.unstack()
+    else:
+        pivot_data = means.iloc[:, 0].unstack()
+    pivot_data.reset_index(inplace=True)
+    return pivot_data.fillna(fill_value)
+
+
+class GroupedMean:
+    """
+    Metric computed as the mean of target columns grouped by two columns,
+    then shaped for the graph.
+
+    The grouping and the shaping are declared separately so that the means
+    can also be answered from pre-aggregated data (see ``AggregateCube``).
+    Grouping columns missing from the data are derived from the columns
+    listed in ``derived_from``, so the metric declares every column it
+    reads, see ``columns``. The shape takes the value of the missing
+    groups as a ``fill_value`` keyword, see ``shape_margins``.
+    """
+
+    def __init__(
+        self,
+        group_by_cols: List[str],
+        target_cols: Dict[str, str],
+        shape: Callable[[pd.DataFrame], pd.DataFrame],
+        derived_cols: Optional[
+            Dict[str, Callable[[pd.DataFrame], pd.Series]]
+        ] = None,
+        derived_from: Optional[List[str]] = None,
+    ):
+        self.group_by_cols = group_by_cols
+        self.target_cols = target_cols
+        self.shape = shape
+        self.derived_cols = derived_cols or {}
+        self.derived_from = derived_from or []
+
+    @property
+    def columns(self) -> List[str]:
+        """The columns of the data the metric reads."""
+        return list(
+            dict.fromkeys(
+                [
+                    column
+                    for column in self.group_by_cols
+                    if column not in self.derived_cols
+                ]
+                + list(self.target_cols.values())
+                + self.derived_from
+            )
+        )
+
+    def aggregate(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Calculate the group means on the filtered data."""
+        group_by_cols = [
+            (
+                column
+                if column in data.columns
+                else pd.Series(
+                    self.derived_cols[column](data),
+                    index=data.index,
+                    name=column,
+                )
+            )
+            for column in self.group_by_cols
+        ]
+        return calculate_grouped_mean(data, group_by_cols, self.target_cols)
+
+    def shape_margins(self, margins: pd.DataFrame) -> pd.DataFrame:
+        """
+        Shape the margins of error of the group means as the means are
+        shaped, the unknown margins and the missing groups are left
+        missing rather than filled as the means are.
+        """
+        return self.shape(margins, fill_value=np.nan)
+
+    def __call__(self, data: pd.DataFrame) -> pd.DataFrame:
+        return self.shape(self.aggregate(data))
 
 
 def calculate_average(data, group_by_cols, target_col, index_labels):
     """Helper function to calculate the average and reindex."""
-    pivot_data = data.groupby(group_by_cols)[[target_col]].mean().unstack()
-    pivot_data.columns = pivot_data.columns.get_level_values(1)
-    pivot_data.reset_index(inplace=True)
-    pivot_data = pivot_data.set_index(group_by_cols[0])
-    pivot_data = pivot_data.reindex(index_labels, fill_value=0).reset_index()
-    return pivot_data.replace(np.nan, 0)
+    means = calculate_grouped_mean(
+        data, group_by_cols, {target_col: target_col}
+    )
+    return reindex_pivot(means, index_labels)
@@ -0,0 +1,126 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+
+
+def factorize_column(series: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Get the group codes and the sorted group labels of a column, the
+    codes of missing values are -1 as they are dropped by ``groupby``.
+    """
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), pd.CategoricalIndex(
+            series.cat.categories, dtype=series.dtype
+        )
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, pd.Index(uniques)
+
+
+def calculate_fused_means(
+    data: pd.DataFrame, metric_functions: Dict[str, GroupedMean]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Calculate the group means of several metrics in one plan.
+
+    Every grouping column is factorized once, the metrics sharing a
+    grouping share its group codes, and every target column of a grouping
+    is aggregated once with ``np.bincount``.
+
+    Parameters:
+    - data (pd.DataFrame): The DataFrame containing the filtered data.
+    - metric_functions (Dict[str, GroupedMean]): A dictionary where keys
+        are metric names and values are grouped mean metrics.
+
+    Returns:
+    - dict: A dictionary where keys are metric names and values are
+        the means as returned by ``GroupedMean.aggregate``.
+    """
+
+    factorized = {}
+    for metric in metric_functions.values():
+        for column in metric.group_by_cols:
+            if column not in factorized:
+                series = (
+                    data[column]
+                    if column in data.columns
+                    else pd.Series(metric.derived_cols[column](data))
+                )
+                factorized[column] = factorize_column(series)
+
+    groupings = {}
+    for metric in metric_functions.values():
+        group_by_cols = tuple(metric.group_by_cols)
+        groupings.setdefault(group_by_cols, set()).update(
+            metric.target_cols.values()
+        )
+
+    # Target values and their missing values are read once for all the
+    # groupings, masks are skipped when nothing is missing
+    targets = {}
+    for target_cols in groupings.values():
+        for column in target_cols:
+            if column not in targets:
+                values = data[column].to_numpy(dtype=np.float64)
+                missing = np.isnan(values)
+                targets[column] = (values, missing if missing.any() else None)
+
+    target_means = {}
+    group_indexes = {}
+    for group_by_cols, target_cols in groupings.items():
+        (outer_codes, outer_labels), (inner_codes, inner_labels) = (
+            factorized[group_by_cols[0]],
+            factorized[group_by_cols[1]],
+        )
+        num_groups = len(outer_labels) * len(inner_labels)
+        codes = outer_codes.astype(np.intp) * len(inner_labels) + inner_codes
+        valid = (outer_codes >= 0) & (inner_codes >= 0)
+        if valid.all():
+            valid = None
+        group_codes = codes if valid is None else codes[valid]
+        observed = np.flatnonzero(
+            np.bincount(group_codes, minlength=num_groups)
+        )
+        group_indexes[group_by_cols] = pd.MultiIndex.from_arrays(
+            [
+                outer_labels.take(observed // len(inner_labels)),
+                inner_labels.take(observed % len(inner_labels)),
+            ],
+            names=list(group_by_cols),
+        )
+        for column in target_cols:
+            values, missing = targets[column]
+            if missing is None:
+                keep = valid
+            elif valid is None:
+                keep = ~missing
+            else:
+                keep = valid & ~missing
+            if keep is not None:
+                values, target_codes = values[keep], codes[keep]
+            else:
+                target_codes = codes
+            sums = np.bincount(
+                target_codes, weights=values, minlength=num_groups
+            )
+            counts = np.bincount(target_codes, minlength=num_groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                target_means[(group_by_cols, column)] = (
+                    sums[observed] / counts[observed]
+                )
+
+    return {
+        metric_name: pd.DataFrame(
+            {
+                name: target_means[(tuple(metric.group_by_cols), column)]
+                for name, column in metric.target_cols.items()
+            },
+            index=group_indexes[tuple(metric.group_by_cols)],
+        )
+        for metric_name, metric in metric_functions.items()
+    }
@@ -0,0 +1,67 @@
+from functools import partial
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import TimeResolution
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+    pivot,
+)
+from backend.src.app.services.business_services.rollups import floor_period
+
+
+# Labels of the periods of every resolution
+PERIOD_FORMATS = {
+    TimeResolution.HOUR: "%Y-%m-%d %H:00",
+    TimeResolution.DAY: "%Y-%m-%d",
+    TimeResolution.WEEK: "%Y-%m-%d",
+    TimeResolution.MONTH: "%Y-%m",
+}
+
+
+def get_row_periods(
+    data: pd.DataFrame, resolution: TimeResolution
+) -> np.ndarray:
+    """Get the start of the period of every row, from its date and hour."""
+    dates = data["date"].to_numpy(dtype="datetime64[ns]")
+    if resolution == TimeResolution.HOUR:
+        dates = dates + data["hour"].to_numpy(dtype=np.int64).astype(
+            "timedelta64[h]"
+        )
+    return floor_period(dates, resolution)
+
+
+def shape_trend(
+    means: pd.DataFrame, resolution: TimeResolution, fill_value: float = 0
+) -> pd.DataFrame:
+    """Pivot the means per period and lane type, labeling the periods."""
+    pivot_data = pivot(means, fill_value)
+    pivot_data["period"] = pivot_data["period"].dt.strftime(
+        PERIOD_FORMATS[resolution]
+    )
+    return pivot_data
+
+
+def get_trend_metrics(resolution: TimeResolution) -> Dict[str, GroupedMean]:
+    """
+    Get the trend metrics of a resolution, the means per period and lane
+    type of the wait time and of the number of people in line.
+    """
+
+    return {
+        name: GroupedMean(
+            group_by_cols=["period", "type_of_checkout"],
+            target_cols={column: column},
+            shape=partial(shape_trend, resolution=resolution),
+            derived_cols={
+                "period": lambda data: get_row_periods(data, resolution)
+            },
+            derived_from=["date", "hour"],
+        )
+        for name, column in (
+            ("avg_wait_time_trend", "avg_waiting_time_Tq"),
+            ("avg_people_in_line_trend", "avg_num_wait_queue_Nq"),
+        )
+    }
@@ -1,148 +1,109 @@
+from functools import partial
+
 import numpy as np
 import pandas as pd
 from backend.src.app.services.business_services.metrics.base import (
-    calculate_average,
+    GroupedMean,
+    pivot,
+    reindex_pivot,
 )
 
 
-def calculate_average_wait_time_by_bucket(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    week_days = [
-        " 0 - 30 sec",
-        "30 sec - 1 min",
-        "1min - 1min 30 sec",
-        "1min 30 sec - 2min",
-        "2min - 2min 30sec",
-        "2min 30sec - 3min",
-        "> 3min",
-    ]
-
-    avg_wait_time_data = calculate_average(
-        filtered_df,
-        ["Wait_Time_BKT", "type_of_checkout"],
-        "avg_waiting_time_Tq",
-        week_days,
-    )
-    return avg_wait_time_data
-
-
-def calculate_average_wait_time_by_weekday(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    week_days = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    avg_wait_time_weekday_data = calculate_average(
-        filtered_df,
-        ["weekday_name", "type_of_checkout"],
-        "avg_waiting_time_Tq",
-        week_days,
-    )
-    return avg_wait_time_weekday_data
-
-
-def calculate_average_people_in_line_by_bucket(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    # Define the buckets for categorizing the number of people in line
-    buckets = ["1", "3", "5", "7", "9", "11", "> 11"]
-
-    # Create a new column 'Shoppers_BKT' based on
-    # the 'avg_num_wait_queue_Nq' values
-    filtered_df["Shoppers_BKT"] = np.select(
-        [
-            filtered_df["avg_num_wait_queue_Nq"] <= 1,
-            filtered_df["avg_num_wait_queue_Nq"] <= 3,
-            filtered_df["avg_num_wait_queue_Nq"] <= 5,
-            filtered_df["avg_num_wait_queue_Nq"] <= 7,
-            filtered_df["avg_num_wait_queue_Nq"] <= 9,
-            filtered_df["avg_num_wait_queue_Nq"] <= 11,
-        ],
-        ["1", "3", "5", "7", "9", "11"],
-        default="> 11",
+WAIT_TIME_BUCKETS = [
+    " 0 - 30 sec",
+    "30 sec - 1 min",
+    "1min - 1min 30 sec",
+    "1min 30 sec - 2min",
+    "2min - 2min 30sec",
+    "2min 30sec - 3min",
+    "> 3min",
+]
+# Upper limits of the wait time buckets, in seconds
+WAIT_TIME_BUCKET_LIMITS = [30, 60, 90, 120, 150, 180]
+WEEK_DAYS = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+# Buckets for categorizing the number of people in line
+SHOPPERS_BUCKETS = ["1", "3", "5", "7", "9", "11", "> 11"]
+SHOPPERS_BUCKET_LIMITS = [1, 3, 5, 7, 9, 11]
+
+
+def assign_wait_time_bucket(wait_time: pd.Series) -> pd.Categorical:
+    """Categorize the wait times in seconds into the wait time buckets."""
+    wait_time = np.asarray(wait_time, dtype=np.float64)
+    codes = np.searchsorted(WAIT_TIME_BUCKET_LIMITS, wait_time, side="right")
+    codes[np.isnan(wait_time)] = -1
+    return pd.Categorical.from_codes(codes, categories=WAIT_TIME_BUCKETS)
+
+
+def assign_shoppers_bucket(queue_length: pd.Series) -> pd.Categorical:
+    """Categorize the number of people in line into the shopper buckets."""
+    return pd.Categorical(
+        np.select(
+            [queue_length <= limit for limit in SHOPPERS_BUCKET_LIMITS],
+            SHOPPERS_BUCKETS[:-1],
+            default=SHOPPERS_BUCKETS[-1],
+        ),
+        categories=SHOPPERS_BUCKETS,
     )
 
-    # Use 'avg_num_wait_queue_Nq' for calculating the average, which is numeric
-    avg_people_line_data = (
-        filtered_df.groupby(["Shoppers_BKT", "type_of_checkout"])[
-            "avg_num_wait_queue_Nq"
-        ]
-        .mean()
-        .unstack()
-    )
 
-    # Reset the index and reindex to ensure all buckets are present
-    avg_people_line_data.reset_index(inplace=True)
-    avg_people_line_data = avg_people_line_data.set_index("Shoppers_BKT")
-    avg_people_line_data = avg_people_line_data.reindex(
-        buckets, fill_value=0
-    ).reset_index()
-
-    return avg_people_line_data
-
-
-def calculate_average_wait_time_by_hour(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    """Calculate and prepare data for the average wait time by hour graph."""
-    # Group by hour and type_of_checkout, then calculate the average wait time
-    avg_wait_time_hourly_data = (
-        filtered_df.groupby(["hour", "type_of_checkout"])[
-            "avg_waiting_time_Tq"
-        ]
-        .mean()
-        .unstack()
-    )
-    avg_wait_time_hourly_data.reset_index(inplace=True)
-    avg_wait_time_hourly_data = avg_wait_time_hourly_data.fillna(0)
-    return avg_wait_time_hourly_data
-
-
-def calculate_wait_time_vs_queue_length(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    """Calculate and prepare data for the wait time vs. queue length graph."""
-    # Group by hour and type_of_checkout, then calculate the average wait time
-    # and queue length
-    wait_time_vs_queue_data = (
-        filtered_df.groupby(["hour", "type_of_checkout"])
-        .agg(
-            avg_wait_time=("avg_waiting_time_Tq", "mean"),
-            avg_queue_length=("avg_num_wait_queue_Nq", "mean"),
+calculate_average_wait_time_by_bucket = GroupedMean(
+    group_by_cols=["Wait_Time_BKT", "type_of_checkout"],
+    target_cols={"avg_waiting_time_Tq": "avg_waiting_time_Tq"},
+    shape=partial(reindex_pivot, index_labels=WAIT_TIME_BUCKETS),
+)
+
+calculate_average_wait_time_by_weekday = GroupedMean(
+    group_by_cols=["weekday_name", "type_of_checkout"],
+    target_cols={"avg_waiting_time_Tq": "avg_waiting_time_Tq"},
+    shape=partial(reindex_pivot, index_labels=WEEK_DAYS),
+)
+
+# The snapshot materializes 'Shoppers_BKT' at load time, frames built
+# elsewhere get it from 'avg_num_wait_queue_Nq'
+calculate_average_people_in_line_by_bucket = GroupedMean(
+    group_by_cols=["Shoppers_BKT", "type_of_checkout"],
+    target_cols={"avg_num_wait_queue_Nq": "avg_num_wait_queue_Nq"},
+    shape=partial(
+        reindex_pivot, index_labels=SHOPPERS_BUCKETS, fill_nan=False
+    ),
+    derived_cols={
+        "Shoppers_BKT": lambda data: assign_shoppers_bucket(
+            data["avg_num_wait_queue_Nq"]
         )
-        .unstack()
-    )
-    wait_time_vs_queue_data.reset_index(inplace=True)
-    wait_time_vs_queue_data = wait_time_vs_queue_data.fillna(0)
-    return wait_time_vs_queue_data
-
-
-def calculate_average_people_in_line_by_weekday(
-    filtered_df: pd.DataFrame,
-) -> pd.DataFrame:
-    week_days = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-    avg_people_weekday_data = calculate_average(
-        filtered_df,
-        ["weekday_name", "type_of_checkout"],
-        "avg_num_wait_queue_Nq",
-        week_days,
-    )
-    return avg_people_weekday_data
+    },
+    derived_from=["avg_num_wait_queue_Nq"],
+)
+
+# Average wait time by hour graph
+calculate_average_wait_time_by_hour = GroupedMean(
+    group_by_cols=["hour", "type_of_checkout"],
+    target_cols={"avg_waiting_time_Tq": "avg_waiting_time_Tq"},
+    shape=pivot,
+)
+
+# Wait time vs. queue length graph
+calculate_wait_time_vs_queue_length = GroupedMean(
+    group_by_cols=["hour", "type_of_checkout"],
+    target_cols={
+        "avg_wait_time": "avg_waiting_time_Tq",
+        "avg_queue_length": "avg_num_wait_queue_Nq",
+    },
+    shape=pivot,
+)
+
+calculate_average_people_in_line_by_weekday = GroupedMean(
+    group_by_cols=["weekday_name", "type_of_checkout"],
+    target_cols={"avg_num_wait_queue_Nq": "avg_num_wait_queue_Nq"},
+    shape=partial(reindex_pivot, index_labels=WEEK_DAYS),
+)
 
 
 wait_time_metrics = {
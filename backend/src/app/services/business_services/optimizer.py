@@ -0,0 +1,154 @@
+import asyncio
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.schemas.performance_metrics import (
+    MAX_LANES,
+    LaneOptimizationParams,
+)
+from backend.src.app.services.business_services.cache import (
+    get_params_key,
+    get_result_cache,
+)
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.performance_metrics import (
+    get_history_df,
+    run_compute_timed,
+)
+from backend.src.app.services.business_services.remodel import QueueModel
+from backend.src.app.services.business_services.utils import get_enum_values
+from backend.src.app.services.executor import get_max_workers
+from backend.src.app.services.instrumentation import stage
+
+
+# Queues optimized, every hour of the week of a store and lane type
+OPTIMIZATION_QUEUE_COLUMNS = [
+    "store_name",
+    "weekday_name",
+    "hour",
+    "type_of_checkout",
+]
+
+
+def search_min_lanes(
+    model: QueueModel, target_wait_time: float, max_lanes: int = MAX_LANES
+) -> np.ndarray:
+    """
+    Find the fewest lanes keeping the modeled wait time of every queue
+    within the target.
+
+    The wait time decreases as lanes open, so the lane count of all the
+    queues is found at once by a binary search over the lane counts,
+    each step evaluating the model for every queue.
+
+    Parameters:
+    - model (QueueModel): The queue model.
+    - target_wait_time (float): The highest average wait time allowed, in
+        seconds.
+    - max_lanes (int): The most lanes a queue may open.
+
+    Returns:
+    - np.ndarray: The lane count of every queue, ``max_lanes`` for the
+        queues missing the target even with all lanes open.
+    """
+
+    low = np.ones(len(model), dtype=np.int64)
+    high = np.full(len(model), max_lanes, dtype=np.int64)
+    while (low < high).any():
+        middle = (low + high) // 2
+        wait_time, _ = model.evaluate(middle)
+        within = wait_time <= target_wait_time
+        high = np.where(within, middle, high)
+        low = np.where(within, low, middle + 1)
+    return low
+
+
+def optimize_store_lanes(
+    params: LaneOptimizationParams, stores: List[int]
+) -> pd.DataFrame:
+    """
+    Find the fewest lanes of every lane type per hour of the week keeping
+    the modeled wait time within the target, for some stores.
+
+    This is the CPU bound part of ``optimize_lanes``, it runs on the
+    compute executor for a share of the stores.
+
+    Parameters:
+    - params (LaneOptimizationParams): The optimization parameters.
+    - stores (List[int]): The stores to optimize.
+
+    Returns:
+    - pd.DataFrame: The lanes, modeled wait time and baseline of every
+        store, weekday, hour and lane type.
+    """
+
+    kpi_data = get_history_df()
+    predicates = {"store_name": stores}
+    if params.lane_types:
+        predicates["type_of_checkout"] = get_enum_values(params.lane_types)
+    rows = kpi_data.index.select(predicates)
+    frame = kpi_data.frame if rows is None else kpi_data.frame.take(rows)
+    if frame.empty:
+        return pd.DataFrame()
+
+    model = QueueModel(frame, OPTIMIZATION_QUEUE_COLUMNS)
+    lanes = search_min_lanes(model, params.target_wait_time)
+    wait_time, queue_length = model.evaluate(lanes)
+
+    result = model.queues.copy()
+    result["lanes"] = lanes
+    result["avg_waiting_time_Tq"] = wait_time
+    result["avg_num_wait_queue_Nq"] = queue_length
+    result["meets_target"] = wait_time <= params.target_wait_time
+    result["baseline_lanes"] = model.baseline_lanes
+    result["baseline_waiting_time_Tq"] = model.baseline_wait_time
+    return result
+
+
+async def optimize_lanes(params: LaneOptimizationParams) -> pd.DataFrame:
+    """
+    Process a lane optimization request.
+
+    The stores are independent, they are split into as many shares as
+    compute workers and optimized concurrently on the compute executor.
+    Results are cached per data version like the metrics.
+
+    Parameters:
+    - params (LaneOptimizationParams): The optimization parameters.
+
+    Returns:
+    - pd.DataFrame: The lanes of every store, weekday, hour and lane type.
+
+    Raises:
+    - EmptyDataError: If no data is found for the stores.
+    """
+
+    kpi_data = get_history_df()
+    result_cache = get_result_cache()
+    params_key = ("lane_optimization", get_params_key(params))
+    result = result_cache.get(kpi_data.version, params_key)
+    if result is not None:
+        return result
+
+    stores = sorted(set(params.store))
+    shares = [
+        share.tolist()
+        for share in np.array_split(
+            stores, min(len(stores), get_max_workers())
+        )
+    ]
+    with stage("compute"):
+        results = await asyncio.gather(
+            *(
+                run_compute_timed(optimize_store_lanes, params, share)
+                for share in shares
+            )
+        )
+    results = [result for result in results if not result.empty]
+    if not results:
+        raise EmptyDataError("No data found for the given stores")
+    result = pd.concat(results, ignore_index=True)
+    result_cache.put(kpi_data.version, params_key, result)
+    return result
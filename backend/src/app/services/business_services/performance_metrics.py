@@ -1,44 +1,257 @@
-from typing import Callable, Dict
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
 import numpy as np
 import pandas as pd
 
 from backend.src.app.configs.constants import (
-    EVENTS,
     CONFIGS,
     DataForm,
     PerformanceSection,
+    TimeResolution,
+)
+from backend.src.app.services.business_services.aggregates import (
+    AggregateCube,
+)
+from backend.src.app.services.business_services.batch import (
+    evaluate_scenarios_on_cube,
+    evaluate_scenarios_on_rows,
+)
+from backend.src.app.services.business_services.cache import (
+    get_params_key,
+    get_result_cache,
+    normalize_value,
 )
 from backend.src.app.services.business_services.errors import EmptyDataError
-from backend.src.app.services.business_services.utils import get_enum_values
-from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.query_backends import (
+    get_query_backend,
+    select_rows,
+)
+from backend.src.app.services.business_services.remodel import (
+    RemodelSnapshot,
+)
+from backend.src.app.services.business_services.sampling import (
+    estimate_fused_means,
+    get_confidence_level,
+)
+from backend.src.app.services.business_services.saved_models import (
+    SavedModelSnapshot,
+    get_saved_model_cache,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.app.services.business_services.filters import (
+    get_date_window,
+    get_filter_predicates,
+    has_date_window,
+)
+from backend.src.app.services.business_services.indexes import intersect_rows
+from backend.src.app.schemas.performance_metrics import (
+    Params,
+    SavedModelParams,
+    TrendParams,
+)
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+from backend.src.app.services.business_services.metrics.fused import (
+    calculate_fused_means,
+)
+from backend.src.app.services.business_services.metrics.trend import (
+    get_trend_metrics,
+)
 from backend.src.app.services.business_services.metrics.wait_time import (
     wait_time_metrics,
 )
+from backend.src.app.services.executor import run_compute
+from backend.src.app.services.instrumentation import (
+    get_current_timings,
+    record_rows,
+    run_timed,
+    stage,
+)
 
 
-async def get_history_df():
+def get_history_df(params: Optional[Params] = None) -> DataSnapshot:
     """
-    Get the historical data DataFrame.
+    Get the historical data snapshot.
+
+    The loaded snapshot is returned as is, without copying, and must not
+    be modified by the caller.
+
+    Parameters:
+    - params (Params): The request parameters, not used.
 
     Returns:
-    - pd.DataFrame: The historical data DataFrame.
+    - DataSnapshot: The historical data snapshot.
 
     Raises:
     - EmptyDataError: If the historical data is not found or invalid format
     """
 
-    if "HISTORICAL_DATA_FRAME" not in CONFIGS:
+    if "HISTORICAL_SNAPSHOT" not in CONFIGS:
         raise EmptyDataError("No data found")
-    if not isinstance(CONFIGS["HISTORICAL_DATA_FRAME"], pd.DataFrame):
+    if not isinstance(CONFIGS["HISTORICAL_SNAPSHOT"], DataSnapshot):
         raise EmptyDataError("Invalid data format")
-    return CONFIGS["HISTORICAL_DATA_FRAME"].copy(deep=True)
+    return CONFIGS["HISTORICAL_SNAPSHOT"]
+
+
+def get_remodel_df(params: Params) -> RemodelSnapshot:
+    """
+    Get the historical data remodeled for the lane counts of the request,
+    see ``RemodelSnapshot``.
+
+    Parameters:
+    - params (Params): The request parameters.
+
+    Returns:
+    - RemodelSnapshot: The remodeled data snapshot.
+
+    Raises:
+    - EmptyDataError: If the historical data is not found or invalid format
+    """
+
+    return RemodelSnapshot(get_history_df(), params.lane_counts)
+
+
+def get_saved_model_df(params: Params) -> SavedModelSnapshot:
+    """
+    Get the data of the saved scenario of the request, opened once per
+    process, see ``SavedModelStore.open``.
 
+    Parameters:
+    - params (Params): The request parameters.
+
+    Returns:
+    - SavedModelSnapshot: The saved scenario data snapshot.
+
+    Raises:
+    - EmptyDataError: If the saved scenario is not found.
+    """
+
+    return get_saved_model_cache().get(params.saved_model_id)
+
+
+def get_saved_model_info(entry: Dict) -> Dict:
+    """Shape the catalog entry of a saved scenario for the API."""
+    return {
+        "id": entry["id"],
+        "name": entry["name"],
+        "lane_counts": entry["lane_counts"],
+        "data_version": entry["data_version"],
+        "created_at": entry["created_at"],
+        "rows": entry["rows"],
+        "stores": [int(store) for store in entry["stores"]],
+    }
+
+
+def build_saved_model(params: SavedModelParams) -> Dict:
+    """
+    Remodel the historical data for the lane counts of a scenario and save
+    it, see ``SavedModelStore.save``.
+
+    This is the CPU bound part of ``create_saved_model``, it runs on the
+    compute executor.
+
+    Parameters:
+    - params (SavedModelParams): The scenario to save.
+
+    Returns:
+    - dict: The saved scenario.
+
+    Raises:
+    - EmptyDataError: If the historical data is not found or no row is
+        left for the stores of the scenario.
+    """
+
+    kpi_data = get_history_df()
+    frame = RemodelSnapshot(kpi_data, params.lane_counts).frame
+    if params.store is not None:
+        rows = kpi_data.index.select({"store_name": params.store})
+        if rows is not None:
+            frame = frame.take(rows)
+    if frame.empty:
+        raise EmptyDataError("No data found for the given stores")
+    entry = get_saved_model_cache().store.save(
+        params.name, params.lane_counts, frame, kpi_data.version
+    )
+    return get_saved_model_info(entry)
+
+
+async def create_saved_model(params: SavedModelParams) -> Dict:
+    """Remodel and save a scenario on the compute executor."""
+    with stage("compute"):
+        return await run_compute_timed(build_saved_model, params)
+
+
+async def list_saved_models(store: Optional[int] = None) -> List[Dict]:
+    """List the saved scenarios, only those holding a store if given."""
+    entries = await asyncio.to_thread(
+        get_saved_model_cache().store.list, store
+    )
+    return [get_saved_model_info(entry) for entry in entries]
+
+
+async def delete_saved_model(model_id: str) -> None:
+    """
+    Delete a saved scenario.
 
-async def calculate_and_format_metrics(
+    Raises:
+    - EmptyDataError: If the saved scenario is not found.
+    """
+
+    saved_model_cache = get_saved_model_cache()
+    await asyncio.to_thread(saved_model_cache.store.delete, model_id)
+    saved_model_cache.discard(model_id)
+
+
+def get_data_version() -> Dict:
+    """
+    Get the version of the historical data currently served.
+
+    Returns:
+    - dict: The version, number of rows, load time and memory footprint
+        per column of the snapshot.
+
+    Raises:
+    - EmptyDataError: If the historical data is not found or invalid format
+    """
+
+    kpi_data = get_history_df()
+    return {
+        "version": kpi_data.version,
+        "rows": len(kpi_data),
+        "loaded_at": kpi_data.created_at,
+        "memory_bytes": kpi_data.memory_usage,
+    }
+
+
+def shape_metrics(
+    metric_means: Dict[str, pd.DataFrame],
+    metric_functions: Dict[str, GroupedMean],
+) -> Dict[str, pd.DataFrame]:
+    """Shape the group means of the grouped mean metrics for the graphs."""
+    metric_results = {}
+    for metric_name, means in metric_means.items():
+        with stage(f"metric.{metric_name}"):
+            metric_results[metric_name] = metric_functions[metric_name].shape(
+                means
+            )
+    return metric_results
+
+
+def calculate_and_format_metrics(
     data: pd.DataFrame, metric_functions: Dict[str, Callable]
-) -> dict:
+) -> Dict[str, pd.DataFrame]:
     """
-    Calculate specified metrics on a filtered DataFrame and format the results.
+    Calculate specified metrics on a filtered DataFrame and shape the results.
 
     Parameters:
     - data (pd.DataFrame): The DataFrame containing the filtered data.
@@ -48,8 +261,8 @@ async def calculate_and_format_metrics(
 
     Returns:
     - dict: A dictionary where keys are metric names
-        and values are the results of the metric calculations
-        formatted as dictionaries with 'split' orientation.
+        and values are the results of the metric calculations,
+        they are serialized with 'split' orientation by the API.
 
     Raises:
     - EmptyDataError: If the input DataFrame is empty.
@@ -57,25 +270,81 @@ async def calculate_and_format_metrics(
 
     if data.empty:
         raise EmptyDataError("No data found for the given filters")
+    record_rows("rows", len(data), filtered=len(data))
 
-    # Calculate metrics and format them as dictionaries
-    metric_results = {
-        metric_name: func(data).to_dict(orient="split")
-        for metric_name, func in metric_functions.items()
-    }
+    # Grouped mean metrics are planned together, see calculate_fused_means
+    if all(
+        isinstance(func, GroupedMean) for func in metric_functions.values()
+    ):
+        with stage("fused_means"):
+            metric_means = calculate_fused_means(data, metric_functions)
+        return shape_metrics(metric_means, metric_functions)
+
+    # Calculate metrics
+    metric_results = {}
+    for metric_name, func in metric_functions.items():
+        with stage(f"metric.{metric_name}"):
+            metric_results[metric_name] = func(data)
+    return metric_results
+
+
+def calculate_and_format_metrics_from_cube(
+    params: Params, cube: AggregateCube, metric_functions: Dict[str, Callable]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Calculate specified metrics from the pre-aggregated cells of the cube
+    and shape the results.
+
+    The results are the same as filtering the data with ``filter_df`` and
+    calling ``calculate_and_format_metrics``, without scanning any row.
+
+    Parameters:
+    - params (Params): The request parameters.
+    - cube (AggregateCube): The pre-aggregated kpi data.
+    - metric_functions (Dict[str, Callable]): A dictionary
+        where keys are metric names and values are grouped mean metrics
+        held by the cube.
+
+    Returns:
+    - dict: A dictionary where keys are metric names
+        and values are the results of the metric calculations.
+
+    Raises:
+    - EmptyDataError: If no cell matches the filters.
+    """
+
+    predicates = get_filter_predicates(params)
+    # Metrics sharing a grouping share its selected cells
+    selected_cells = {}
+    metric_results = {}
+    for metric_name, metric in metric_functions.items():
+        group_by_cols = tuple(metric.group_by_cols)
+        if group_by_cols not in selected_cells:
+            with stage("select_cells"):
+                cells = cube.select_cells(group_by_cols, predicates)
+            if cells.empty:
+                raise EmptyDataError("No data found for the given filters")
+            record_rows("cells", len(cells))
+            selected_cells[group_by_cols] = cells
+        with stage(f"metric.{metric_name}"):
+            means = cube.aggregate(
+                metric, predicates, cells=selected_cells[group_by_cols]
+            )
+            metric_results[metric_name] = metric.shape(means)
     return metric_results
 
 
-async def filter_df(
+def filter_df(
     params: Params,
-    kpi_data: pd.DataFrame,
+    kpi_data: DataSnapshot,
 ) -> pd.DataFrame:
     """
-    Filter the DataFrame based on the request parameters.
+    Filter the data snapshot based on the request parameters, see
+    ``select_rows``.
 
     Parameters:
     - params (Params): The request parameters.
-    - kpi_data (pd.DataFrame): The kpi data DataFrame.
+    - kpi_data (DataSnapshot): The kpi data snapshot.
 
     Returns:
     - pd.DataFrame: The filtered DataFrame.
@@ -84,58 +353,602 @@ async def filter_df(
     - EmptyDataError: If no data is found after filtering.
     """
 
-    if kpi_data.empty:
+    if not len(kpi_data):
         raise EmptyDataError("No data found")
+    return select_rows(
+        kpi_data,
+        get_filter_predicates(params),
+        get_date_window(params, kpi_data.dates),
+    )
+
+
+def filter_sample(params: Params, kpi_data: DataSnapshot) -> pd.DataFrame:
+    """
+    Filter the sample of the data snapshot based on the request
+    parameters, as ``filter_df`` filters the data.
+
+    The range of dates is resolved on the dates of the whole data, the
+    sample may miss the last days.
+
+    Parameters:
+    - params (Params): The request parameters.
+    - kpi_data (DataSnapshot): The kpi data snapshot.
+
+    Returns:
+    - pd.DataFrame: The filtered rows of the sample.
+    """
 
-    filter_mask = True
-    if params.cluster:
-        # todo: use enum for column names
-        filter_mask &= kpi_data["new_clusters"] == params.cluster
-    if params.store:
-        filter_mask &= kpi_data["store_name"].isin(params.store)
-    if params.lane_types:
-        filter_mask &= kpi_data["type_of_checkout"].isin(
-            get_enum_values(params.lane_types)
+    sample = kpi_data.sample
+    rows = sample.index.select(get_filter_predicates(params))
+    date_window = get_date_window(params, kpi_data.dates)
+    if date_window is not None:
+        rows = intersect_rows(rows, sample.dates.select(*date_window))
+    return sample.frame if rows is None else sample.frame.take(rows)
+
+
+def calculate_and_format_metrics_from_sample(
+    data: pd.DataFrame, metric_functions: Dict[str, GroupedMean]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Estimate specified metrics on the filtered rows of a sample and shape
+    the estimates and the margins of error of their confidence intervals,
+    the intervals run from the estimate less its margin to the estimate
+    plus its margin.
+
+    Parameters:
+    - data (pd.DataFrame): The filtered rows of the sample.
+    - metric_functions (Dict[str, GroupedMean]): A dictionary where keys
+        are metric names and values are grouped mean metrics.
+
+    Returns:
+    - dict: A dictionary where keys are metric names, and the metric
+        names suffixed with '_margin' for the margins, and values are the
+        shaped frames, and 'approximation' holds the confidence level and
+        the sampled rows used. The margins of groups with a single
+        sampled row or stratum, and of the groups missing, are unknown
+        and left missing, see ``GroupedMean.shape_margins``.
+
+    Raises:
+    - EmptyDataError: If no sampled row matches the filters.
+    """
+
+    if data.empty:
+        raise EmptyDataError("No data found for the given filters")
+    record_rows("sample", len(data), filtered=len(data))
+
+    confidence_level = get_confidence_level()
+    with stage("estimate_means"):
+        metric_estimates = estimate_fused_means(
+            data, metric_functions, confidence_level
         )
-    if params.peak_hour:
-        filter_mask &= kpi_data["peak_hour"].isin(params.peak_hour)
-    if params.covid_flag:
-        filter_mask &= kpi_data["Covid_Effect"] == 1
-    if params.events_flag:
-        filter_mask &= kpi_data["event"].isin(EVENTS)
-    if params.total_year_flag:
-        filter_mask &= kpi_data["date"]
-    if params.october_flag:
-        # todo: typecast while reading the data
-        kpi_data["date"] = kpi_data["date"].astype(np.datetime64)
-        filter_mask &= kpi_data["date"].dt.month == 10
-
-    filtered_df = kpi_data[filter_mask]
-    return filtered_df
+    metric_results = {}
+    for metric_name, (means, half_widths) in metric_estimates.items():
+        with stage(f"metric.{metric_name}"):
+            metric = metric_functions[metric_name]
+            metric_results[metric_name] = metric.shape(means)
+            metric_results[f"{metric_name}_margin"] = metric.shape_margins(
+                half_widths
+            )
+    metric_results["approximation"] = pd.DataFrame(
+        {
+            "confidence_level": [confidence_level],
+            "sampled_rows": [len(data)],
+        }
+    )
+    return metric_results
 
 
 # Dictionary to map the data form to the function that retrieves the data
-data_form_and_df_map = {DataForm.HISTORICAL: get_history_df}
+data_form_and_df_map = {
+    DataForm.HISTORICAL: get_history_df,
+    DataForm.REMODEL: get_remodel_df,
+    DataForm.SAVED_MODEL: get_saved_model_df,
+}
 # Dictionary to hold the calculated metrics
 metric_calculations = {PerformanceSection.WAIT_TIME: wait_time_metrics}
 
 
-async def compute_metrics(params: Params) -> Dict:
+def get_metric_parts(metric_functions: Dict[str, Callable]) -> List[List[str]]:
     """
-    Process the performance metrics request and return the performance data.
+    Split the metrics of a section into parts evaluated independently,
+    the grouped mean metrics sharing a grouping share a part as they
+    share its group codes, see ``calculate_fused_means``.
+
+    Parameters:
+    - metric_functions (Dict[str, Callable]): A dictionary where keys
+        are metric names and values are the metric functions.
+
+    Returns:
+    - list: The metric names of every part, in the order of the metrics.
+    """
+
+    parts = {}
+    for metric_name, func in metric_functions.items():
+        key = (
+            tuple(func.group_by_cols)
+            if isinstance(func, GroupedMean)
+            else metric_name
+        )
+        parts.setdefault(key, []).append(metric_name)
+    return list(parts.values())
+
+
+def is_approximated(
+    params: Params, kpi_data: DataSnapshot, metric_functions: Dict
+) -> bool:
+    """
+    Check whether a request is answered from the sample of the data, see
+    ``calculate_and_format_metrics_from_sample``.
+    """
+    return (
+        params.approximate
+        and kpi_data.sample is not None
+        and all(
+            isinstance(metric, GroupedMean)
+            for metric in metric_functions.values()
+        )
+    )
+
+
+def get_result_key(params: Params, approximated: bool = False) -> Tuple:
+    """
+    Get the result cache key of a request.
+
+    ``approximate`` is set to whether the results are approximated, the
+    requests asking for an approximation answered exactly, by paths
+    ignoring the flag, share the key of the exact results.
+    """
+
+    if params.approximate != approximated:
+        params = params.model_copy(update={"approximate": approximated})
+    return get_params_key(params)
+
+
+def evaluate_metrics(
+    params: Params, metric_names: Optional[List[str]] = None
+) -> Tuple[str, Dict]:
+    """
+    Compute the performance data of a request.
+
+    This is the CPU bound part of ``compute_metrics``, it runs on the
+    compute executor and reads the data of the process it runs in.
 
     Parameters:
     - params (Params): The request parameters.
+    - metric_names (List[str]): The metrics of the section to compute,
+        all when None.
 
     Returns:
-    - dict: A dictionary containing the performance data.
+    - tuple: The version of the data used and a dictionary containing the
+        metric frames.
     """
 
     get_df_func = data_form_and_df_map[params.data_form]
     required_metric_calculations = metric_calculations[params.type]
-    kpi_data = await get_df_func()
-    filtered_df = await filter_df(kpi_data=kpi_data, params=params)
-    performance_data = await calculate_and_format_metrics(
-        filtered_df=filtered_df, metric_functions=required_metric_calculations
+    if metric_names is not None:
+        required_metric_calculations = {
+            metric_name: required_metric_calculations[metric_name]
+            for metric_name in metric_names
+        }
+    kpi_data = get_df_func(params)
+    if not len(kpi_data):
+        raise EmptyDataError("No data found")
+
+    if is_approximated(params, kpi_data, required_metric_calculations):
+        with stage("filter_sample"):
+            sampled_df = filter_sample(params=params, kpi_data=kpi_data)
+        performance_data = calculate_and_format_metrics_from_sample(
+            data=sampled_df, metric_functions=required_metric_calculations
+        )
+    elif (
+        not has_date_window(params)
+        and kpi_data.cube is not None
+        and kpi_data.cube.can_answer(required_metric_calculations.values())
+    ):
+        performance_data = calculate_and_format_metrics_from_cube(
+            params=params,
+            cube=kpi_data.cube,
+            metric_functions=required_metric_calculations,
+        )
+    elif all(
+        isinstance(metric, GroupedMean)
+        for metric in required_metric_calculations.values()
+    ):
+        # The filters and the means are pushed down to the query backend
+        metric_means = get_query_backend().calculate_means(
+            kpi_data,
+            get_filter_predicates(params),
+            get_date_window(params, kpi_data.dates),
+            required_metric_calculations,
+        )
+        performance_data = shape_metrics(
+            metric_means, required_metric_calculations
+        )
+    else:
+        with stage("filter_df"):
+            filtered_df = filter_df(kpi_data=kpi_data, params=params)
+        performance_data = calculate_and_format_metrics(
+            data=filtered_df, metric_functions=required_metric_calculations
+        )
+    return kpi_data.version, performance_data
+
+
+async def run_compute_timed(func: Callable, *args: Any) -> Any:
+    """
+    Run a function on the compute executor, see ``run_compute``, and
+    merge the timings of the stages it runs into the current timings.
+    """
+
+    timings = get_current_timings()
+    if timings is None:
+        return await run_compute(func, *args)
+    # The stages run on the executor are timed there and sent back
+    result, compute_timings = await run_compute(run_timed, func, *args)
+    timings.merge(compute_timings)
+    return result
+
+
+async def compute_metrics(params: Params) -> Dict[str, pd.DataFrame]:
+    """
+    Process the performance metrics request and return the performance data.
+
+    Cached results are returned directly, the others are computed on the
+    compute executor so the event loop keeps serving other requests.
+    The cached frames are shared between requests and must not be
+    modified.
+
+    Parameters:
+    - params (Params): The request parameters.
+
+    Returns:
+    - dict: A dictionary where keys are metric names and values are the
+        metric frames.
+    """
+
+    with stage("get_history_df"):
+        kpi_data = data_form_and_df_map[params.data_form](params)
+
+    # Results are cached per data version, loading a new snapshot
+    # invalidates them
+    result_cache = get_result_cache()
+    with stage("cache"):
+        params_key = get_result_key(
+            params,
+            is_approximated(
+                params, kpi_data, metric_calculations[params.type]
+            ),
+        )
+        performance_data = result_cache.get(kpi_data.version, params_key)
+    if performance_data is not None:
+        return performance_data
+
+    with stage("compute"):
+        version, performance_data = await run_compute_timed(
+            evaluate_metrics, params
+        )
+    result_cache.put(version, params_key, performance_data)
+    return performance_data
+
+
+async def stream_metrics(
+    params: Params,
+) -> AsyncIterator[Tuple[str, pd.DataFrame]]:
+    """
+    Process the performance metrics request and yield every metric frame
+    as soon as it is computed.
+
+    The independent parts of the metrics, see ``get_metric_parts``, are
+    computed concurrently on the compute executor, so the first frames
+    wait for the cheapest part only. The whole result is cached as
+    ``compute_metrics`` caches it, and cached results are yielded at
+    once.
+
+    Parameters:
+    - params (Params): The request parameters.
+
+    Returns:
+    - AsyncIterator: The metric names and frames, in the order they are
+        computed.
+
+    Raises:
+    - EmptyDataError: If no data is found for the filters.
+    """
+
+    kpi_data = data_form_and_df_map[params.data_form](params)
+    result_cache = get_result_cache()
+    params_key = get_result_key(
+        params,
+        is_approximated(params, kpi_data, metric_calculations[params.type]),
     )
+    performance_data = result_cache.get(kpi_data.version, params_key)
+    if performance_data is not None:
+        for metric_name, frame in performance_data.items():
+            yield metric_name, frame
+        return
+
+    tasks = [
+        asyncio.ensure_future(
+            run_compute_timed(evaluate_metrics, params, metric_names)
+        )
+        for metric_names in get_metric_parts(metric_calculations[params.type])
+    ]
+    sent = set()
+    try:
+        for next_task in asyncio.as_completed(tasks):
+            _, part_data = await next_task
+            for metric_name, frame in part_data.items():
+                # Frames shared by the parts, as the approximation, are
+                # sent once
+                if metric_name not in sent:
+                    sent.add(metric_name)
+                    yield metric_name, frame
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    # The result is cached in the order of the parts, whatever the order
+    # they completed in, unless the data was reloaded in between
+    results = [task.result() for task in tasks]
+    if len({version for version, _ in results}) == 1:
+        performance_data = {}
+        for _, part_data in results:
+            for metric_name, frame in part_data.items():
+                performance_data.setdefault(metric_name, frame)
+        result_cache.put(results[0][0], params_key, performance_data)
+
+
+def evaluate_trend(params: TrendParams) -> Tuple[str, Dict]:
+    """
+    Compute the trends of a request, the means per period and lane type.
+
+    This is the CPU bound part of ``compute_trend``. The days, weeks and
+    months of the historical data are answered from its rollups, see
+    ``TimeRollups``, the hours and the other data forms from the rows.
+
+    Parameters:
+    - params (TrendParams): The request parameters.
+
+    Returns:
+    - tuple: The version of the data used and a dictionary containing the
+        trend frames.
+
+    Raises:
+    - EmptyDataError: If no data is found for the filters.
+    """
+
+    kpi_data = data_form_and_df_map[params.data_form](params)
+    if not len(kpi_data):
+        raise EmptyDataError("No data found")
+    metric_functions = get_trend_metrics(params.resolution)
+
+    if kpi_data.rollups is None or params.resolution == TimeResolution.HOUR:
+        with stage("filter_df"):
+            filtered_df = filter_df(kpi_data=kpi_data, params=params)
+        filtered_df = filtered_df[filtered_df["date"].notna()]
+        return kpi_data.version, calculate_and_format_metrics(
+            data=filtered_df, metric_functions=metric_functions
+        )
+
+    predicates = get_filter_predicates(params)
+    start, end = get_date_window(params, kpi_data.dates) or (None, None)
+    with stage("select_cells"):
+        cells = kpi_data.rollups.select_cells(
+            params.resolution, predicates, start, end
+        )
+    if cells.empty:
+        raise EmptyDataError("No data found for the given filters")
+    record_rows("cells", len(cells))
+    performance_data = {}
+    for metric_name, metric in metric_functions.items():
+        with stage(f"metric.{metric_name}"):
+            means = kpi_data.rollups.aggregate(
+                params.resolution,
+                metric.group_by_cols,
+                metric.target_cols,
+                predicates,
+                cells=cells,
+            )
+            performance_data[metric_name] = metric.shape(means)
+    return kpi_data.version, performance_data
+
+
+async def compute_trend(params: TrendParams) -> Dict[str, pd.DataFrame]:
+    """
+    Process a trend request and return the trend frames, cached per data
+    version like the metrics.
+
+    Parameters:
+    - params (TrendParams): The request parameters.
+
+    Returns:
+    - dict: A dictionary where keys are metric names and values are the
+        trend frames.
+    """
+
+    kpi_data = data_form_and_df_map[params.data_form](params)
+    result_cache = get_result_cache()
+    # The trends are never approximated
+    params_key = get_result_key(params)
+    performance_data = result_cache.get(kpi_data.version, params_key)
+    if performance_data is not None:
+        return performance_data
+
+    with stage("compute"):
+        version, performance_data = await run_compute_timed(
+            evaluate_trend, params
+        )
+    result_cache.put(version, params_key, performance_data)
     return performance_data
+
+
+def evaluate_batch_metrics(
+    scenarios: Dict[Hashable, Params]
+) -> Tuple[Dict[Hashable, Tuple[str, Dict]], Dict[Hashable, str]]:
+    """
+    Compute the performance data of several scenarios together.
+
+    The scenarios reading the same data and metrics share its snapshot,
+    their predicate masks are built once and their group aggregates are
+    computed in one grouped pass per grouping, with the scenario as an
+    extra grouping dimension.
+
+    Parameters:
+    - scenarios (Dict[Hashable, Params]): The request parameters of every
+        scenario.
+
+    Returns:
+    - tuple: A dictionary where keys are the scenarios computed and values
+        are the version of the data used and the metric frames, and a
+        dictionary of the error message of every scenario matching no data.
+
+    Raises:
+    - EmptyDataError: If the data of a scenario is not found.
+    """
+
+    # Scenarios reading the same data are batched together
+    batches = {}
+    for name, params in scenarios.items():
+        batches.setdefault(
+            (
+                params.data_form,
+                params.type,
+                normalize_value(params.lane_counts),
+                params.saved_model_id,
+            ),
+            {},
+        )[name] = params
+
+    results = {}
+    errors = {}
+    for (data_form, section, *_), batch in batches.items():
+        kpi_data = data_form_and_df_map[data_form](next(iter(batch.values())))
+        metric_functions = metric_calculations[section]
+        if not len(kpi_data):
+            raise EmptyDataError("No data found")
+
+        on_cube = {}
+        on_rows = {}
+        for name, params in batch.items():
+            if (
+                not has_date_window(params)
+                and kpi_data.cube is not None
+                and kpi_data.cube.can_answer(metric_functions.values())
+            ):
+                on_cube[name] = params
+            else:
+                on_rows[name] = params
+
+        evaluated = {}
+        if on_cube:
+            evaluated.update(
+                zip(
+                    on_cube,
+                    evaluate_scenarios_on_cube(
+                        kpi_data.cube,
+                        [get_filter_predicates(p) for p in on_cube.values()],
+                        metric_functions,
+                    ),
+                )
+            )
+        if on_rows and all(
+            isinstance(func, GroupedMean) for func in metric_functions.values()
+        ):
+            # Scenarios sharing a range of dates share its mask
+            date_masks = {}
+            row_masks = []
+            for params in on_rows.values():
+                date_window = get_date_window(params, kpi_data.dates)
+                if date_window is not None and date_window not in date_masks:
+                    date_mask = np.zeros(len(kpi_data), dtype=bool)
+                    date_mask[kpi_data.dates.select(*date_window)] = True
+                    date_masks[date_window] = date_mask
+                row_masks.append(date_masks.get(date_window))
+            evaluated.update(
+                zip(
+                    on_rows,
+                    evaluate_scenarios_on_rows(
+                        kpi_data.frame,
+                        kpi_data.index,
+                        [get_filter_predicates(p) for p in on_rows.values()],
+                        row_masks,
+                        metric_functions,
+                    ),
+                )
+            )
+        else:
+            for name, params in on_rows.items():
+                try:
+                    evaluated[name] = calculate_and_format_metrics(
+                        data=filter_df(params=params, kpi_data=kpi_data),
+                        metric_functions=metric_functions,
+                    )
+                except EmptyDataError:
+                    evaluated[name] = None
+
+        for name, performance_data in evaluated.items():
+            if performance_data is None:
+                errors[name] = "No data found for the given filters"
+            else:
+                results[name] = (kpi_data.version, performance_data)
+    return results, errors
+
+
+async def compute_batch_metrics(
+    scenarios: Dict[str, Params]
+) -> Tuple[Dict[str, Dict[str, pd.DataFrame]], Dict[str, str]]:
+    """
+    Process a batch of performance metrics requests.
+
+    Every scenario is looked up in the result cache first, the distinct
+    scenarios left are computed together on the compute executor, see
+    ``evaluate_batch_metrics``.
+
+    Parameters:
+    - scenarios (Dict[str, Params]): The request parameters of every
+        scenario, by scenario name.
+
+    Returns:
+    - tuple: A dictionary where keys are scenario names and values are
+        the metric frames, and a dictionary of the error message of every
+        scenario matching no data.
+    """
+
+    result_cache = get_result_cache()
+    scenario_keys = {}
+    performance_data = {}
+    pending = {}
+    for name, params in scenarios.items():
+        kpi_data = data_form_and_df_map[params.data_form](params)
+        # The scenarios of a batch are never approximated
+        params_key = get_result_key(params)
+        scenario_keys[name] = params_key
+        if params_key in performance_data or params_key in pending:
+            continue
+        cached = result_cache.get(kpi_data.version, params_key)
+        if cached is not None:
+            performance_data[params_key] = cached
+        else:
+            pending[params_key] = params
+
+    errors = {}
+    if pending:
+        with stage("compute"):
+            evaluated, errors = await run_compute_timed(
+                evaluate_batch_metrics, pending
+            )
+        for params_key, (version, metric_results) in evaluated.items():
+            result_cache.put(version, params_key, metric_results)
+            performance_data[params_key] = metric_results
+
+    return (
+        {
+            name: performance_data[params_key]
+            for name, params_key in scenario_keys.items()
+            if params_key in performance_data
+        },
+        {
+            name: errors[params_key]
+            for name, params_key in scenario_keys.items()
+            if params_key in errors
+        },
+    )
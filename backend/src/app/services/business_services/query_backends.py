@@ -0,0 +1,372 @@
+from abc import ABC, abstractmethod
+import logging
+from os import getenv
+from threading import local
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.indexes import intersect_rows
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+from backend.src.app.services.business_services.metrics.fused import (
+    calculate_fused_means,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.app.services.instrumentation import record_rows, stage
+
+
+logger = logging.getLogger(__name__)
+
+PANDAS_BACKEND = "pandas"
+DUCKDB_BACKEND = "duckdb"
+DEFAULT_QUERY_BACKEND = PANDAS_BACKEND
+# Name of the data in the queries of the DuckDB backend
+DUCKDB_TABLE = "kpi"
+GROUPING_COLUMN = "__grouping"
+ROWS_COLUMN = "__rows"
+
+DateWindow = Optional[Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]]
+
+
+def get_query_backend_name() -> str:
+    return getenv("QUERY_BACKEND", DEFAULT_QUERY_BACKEND).lower()
+
+
+def get_duckdb_threads() -> Optional[int]:
+    threads = getenv("DUCKDB_THREADS")
+    return int(threads) if threads else None
+
+
+def quote(column: str) -> str:
+    """Quote a column name for a SQL query."""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def select_rows(
+    kpi_data: DataSnapshot,
+    predicates: Dict[str, List],
+    date_window: DateWindow,
+) -> pd.DataFrame:
+    """
+    Select the rows of a data snapshot matching all the predicates, dated
+    within the range of dates if any.
+
+    The rows are selected through the snapshot's predicate index, the
+    allowed values of a predicate are unioned and the predicates are
+    intersected, so no column of the full table is scanned. A range of
+    dates is selected through the snapshot's date index and intersected
+    with them.
+
+    Parameters:
+    - kpi_data (DataSnapshot): The kpi data snapshot.
+    - predicates (Dict[str, List]): The filter predicates.
+    - date_window (tuple): The start and the exclusive end of the range
+        of dates, or None.
+
+    Returns:
+    - pd.DataFrame: The selected rows.
+    """
+
+    rows = kpi_data.index.select(predicates)
+    if date_window is not None:
+        date_rows = kpi_data.dates.select(*date_window)
+        if rows is None and isinstance(date_rows, slice):
+            return kpi_data.frame.iloc[date_rows]
+        rows = intersect_rows(rows, date_rows)
+    return kpi_data.frame if rows is None else kpi_data.frame.take(rows)
+
+
+class QueryBackend(ABC):
+    """
+    Engine filtering the rows of a data snapshot and calculating the
+    group means of the grouped mean metrics on them.
+    """
+
+    name: str
+
+    @abstractmethod
+    def calculate_means(
+        self,
+        kpi_data: DataSnapshot,
+        predicates: Dict[str, List],
+        date_window: DateWindow,
+        metric_functions: Dict[str, GroupedMean],
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Calculate the group means of several metrics on the rows matching
+        the filters, see ``select_rows``.
+
+        Parameters:
+        - kpi_data (DataSnapshot): The kpi data snapshot.
+        - predicates (Dict[str, List]): The filter predicates.
+        - date_window (tuple): The start and the exclusive end of the
+            range of dates, or None.
+        - metric_functions (Dict[str, GroupedMean]): A dictionary where
+            keys are metric names and values are grouped mean metrics.
+
+        Returns:
+        - dict: A dictionary where keys are metric names and values are
+            the means as returned by ``GroupedMean.aggregate``.
+
+        Raises:
+        - EmptyDataError: If no row matches the filters.
+        """
+        pass
+
+
+class PandasBackend(QueryBackend):
+    """
+    Backend selecting the rows through the snapshot's indexes and
+    aggregating them with ``calculate_fused_means``, in the process.
+    """
+
+    name = PANDAS_BACKEND
+
+    def calculate_means(
+        self,
+        kpi_data: DataSnapshot,
+        predicates: Dict[str, List],
+        date_window: DateWindow,
+        metric_functions: Dict[str, GroupedMean],
+    ) -> Dict[str, pd.DataFrame]:
+        with stage("filter_df"):
+            data = select_rows(kpi_data, predicates, date_window)
+        if data.empty:
+            raise EmptyDataError("No data found for the given filters")
+        record_rows("rows", len(data), filtered=len(data))
+        with stage("fused_means"):
+            return calculate_fused_means(data, metric_functions)
+
+
+class DuckDBBackend(QueryBackend):
+    """
+    Backend pushing the filters and the group means down to DuckDB, an
+    embedded columnar engine running them as multi-threaded vectorized
+    queries over the snapshot's frame, without copying it nor
+    materializing the filtered rows.
+
+    All the groupings are aggregated in one scan, as grouping sets. The
+    metrics grouping on a column the frame does not hold are calculated
+    by the pandas backend.
+    """
+
+    name = DUCKDB_BACKEND
+
+    def __init__(self, threads: Optional[int] = None):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImproperlyConfigured(
+                "The duckdb query backend needs the duckdb package"
+            )
+        self._duckdb = duckdb
+        self.threads = threads
+        # DuckDB connections are not shared between threads
+        self._local = local()
+
+    @property
+    def connection(self) -> Any:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            config = {} if self.threads is None else {"threads": self.threads}
+            connection = self._duckdb.connect(config=config)
+            self._local.connection = connection
+        return connection
+
+    def _build_query(
+        self,
+        predicates: Dict[str, List],
+        date_window: DateWindow,
+        groupings: List[Tuple[str, ...]],
+        group_columns: List[str],
+        target_columns: List[str],
+    ) -> Tuple[str, List]:
+        conditions = []
+        parameters = []
+        for column, values in predicates.items():
+            if not values:
+                conditions.append("FALSE")
+                continue
+            conditions.append(
+                f"{quote(column)} IN ({', '.join('?' for _ in values)})"
+            )
+            parameters.extend(values)
+        if date_window is not None:
+            start, end = date_window
+            if start is not None:
+                conditions.append('"date" >= ?')
+                parameters.append(start.to_pydatetime())
+            if end is not None:
+                conditions.append('"date" < ?')
+                parameters.append(end.to_pydatetime())
+
+        quoted_group_columns = ", ".join(map(quote, group_columns))
+        grouping_sets = ", ".join(
+            f"({', '.join(map(quote, grouping))})" for grouping in groupings
+        )
+        aggregations = ", ".join(
+            f"AVG({quote(column)}) AS {quote(column)}"
+            for column in target_columns
+        )
+        query = (
+            f"SELECT {quoted_group_columns}, "
+            f"GROUPING({quoted_group_columns}) AS {GROUPING_COLUMN}, "
+            f"COUNT(*) AS {ROWS_COLUMN}, {aggregations} "
+            f"FROM {DUCKDB_TABLE} "
+            f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+            f"GROUP BY GROUPING SETS ({grouping_sets})"
+        )
+        return query, parameters
+
+    def calculate_means(
+        self,
+        kpi_data: DataSnapshot,
+        predicates: Dict[str, List],
+        date_window: DateWindow,
+        metric_functions: Dict[str, GroupedMean],
+    ) -> Dict[str, pd.DataFrame]:
+        frame = kpi_data.frame
+        groupings = []
+        for metric in metric_functions.values():
+            grouping = tuple(metric.group_by_cols)
+            if grouping not in groupings:
+                groupings.append(grouping)
+        group_columns = list(dict.fromkeys(sum(groupings, ())))
+        target_columns = list(
+            dict.fromkeys(
+                column
+                for metric in metric_functions.values()
+                for column in metric.target_cols.values()
+            )
+        )
+        if any(column not in frame.columns for column in group_columns):
+            logger.debug("Derived grouping columns, using the pandas backend")
+            return PandasBackend().calculate_means(
+                kpi_data, predicates, date_window, metric_functions
+            )
+
+        if date_window is not None:
+            date_rows = kpi_data.dates.select(*date_window)
+            if isinstance(date_rows, slice):
+                # The rows are sorted by date, only the rows of the range
+                # are scanned
+                frame = frame.iloc[date_rows]
+                date_window = None
+        # Only the columns of the query are registered, without copies
+        frame = pd.DataFrame(
+            {
+                column: frame[column]
+                for column in dict.fromkeys(
+                    [*predicates, *group_columns, *target_columns]
+                    + (["date"] if date_window is not None else [])
+                )
+            },
+            copy=False,
+        )
+
+        query, parameters = self._build_query(
+            predicates, date_window, groupings, group_columns, target_columns
+        )
+        connection = self.connection
+        with stage("query"):
+            connection.register(DUCKDB_TABLE, frame)
+            try:
+                result = connection.execute(query, parameters).df()
+            finally:
+                connection.unregister(DUCKDB_TABLE)
+
+        # Every filtered row is in one group of every grouping set
+        grouping_ids = {
+            grouping: sum(
+                1 << (len(group_columns) - 1 - position)
+                for position, column in enumerate(group_columns)
+                if column not in grouping
+            )
+            for grouping in groupings
+        }
+        filtered_rows = int(
+            result.loc[
+                result[GROUPING_COLUMN] == grouping_ids[groupings[0]],
+                ROWS_COLUMN,
+            ].sum()
+        )
+        if not filtered_rows:
+            raise EmptyDataError("No data found for the given filters")
+        record_rows("duckdb", len(frame), filtered=filtered_rows)
+
+        with stage("shape_means"):
+            group_means = {
+                grouping: self._get_group_means(
+                    result[result[GROUPING_COLUMN] == grouping_ids[grouping]],
+                    grouping,
+                    target_columns,
+                    frame,
+                )
+                for grouping in groupings
+            }
+        return {
+            metric_name: pd.DataFrame(
+                {
+                    name: group_means[tuple(metric.group_by_cols)][column]
+                    for name, column in metric.target_cols.items()
+                },
+                index=group_means[tuple(metric.group_by_cols)].index,
+            )
+            for metric_name, metric in metric_functions.items()
+        }
+
+    @staticmethod
+    def _get_group_means(
+        result: pd.DataFrame,
+        grouping: Tuple[str, ...],
+        target_columns: List[str],
+        frame: pd.DataFrame,
+    ) -> pd.DataFrame:
+        # Groups of missing values are dropped and the groups are sorted by
+        # their labels, with the types of the frame, as
+        # ``calculate_fused_means`` returns them
+        result = result.dropna(subset=list(grouping))
+        index = pd.MultiIndex.from_arrays(
+            [
+                (
+                    pd.Categorical(result[column], dtype=frame[column].dtype)
+                    if isinstance(frame[column].dtype, pd.CategoricalDtype)
+                    else result[column].to_numpy(dtype=frame[column].dtype)
+                )
+                for column in grouping
+            ],
+            names=list(grouping),
+        )
+        means = pd.DataFrame(
+            {column: result[column].to_numpy() for column in target_columns},
+            index=index,
+        )
+        return means.sort_index()
+
+
+_backends: Dict[str, QueryBackend] = {}
+
+
+def get_query_backend() -> QueryBackend:
+    """
+    Get the query backend of the process, selected by ``QUERY_BACKEND``.
+
+    Raises:
+    - ImproperlyConfigured: If the backend is unknown or its engine is
+        not installed.
+    """
+
+    name = get_query_backend_name()
+    if name not in _backends:
+        if name == PANDAS_BACKEND:
+            _backends[name] = PandasBackend()
+        elif name == DUCKDB_BACKEND:
+            _backends[name] = DuckDBBackend(get_duckdb_threads())
+        else:
+            raise ImproperlyConfigured(f"Unknown query backend: {name}")
+        logger.info(f"Query backend started: {name}")
+    return _backends[name]
@@ -0,0 +1,115 @@
+from typing import Tuple
+
+import numpy as np
+
+
+# Bisection steps when solving for the utilization, enough for float64
+SOLVE_ITERATIONS = 60
+
+
+def calculate_erlang_c(
+    servers: np.ndarray, offered_load: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the probability that a customer waits in an M/M/c queue.
+
+    The Erlang B recursion is run for every cell at once, up to the
+    largest number of servers, and turned into Erlang C. The arrays are
+    broadcast against each other.
+
+    Parameters:
+    - servers (np.ndarray): The number of servers c.
+    - offered_load (np.ndarray): The offered load λ/μ in erlangs.
+
+    Returns:
+    - np.ndarray: The probability of waiting, 1 for unstable queues.
+    """
+
+    servers, offered_load = np.broadcast_arrays(
+        np.asarray(servers, dtype=np.int64),
+        np.asarray(offered_load, dtype=np.float64),
+    )
+    blocking = np.ones(servers.shape)
+    step = np.empty(servers.shape)
+    for k in range(1, int(servers.max(initial=0)) + 1):
+        np.multiply(offered_load, blocking, out=step)
+        np.divide(step, step + k, out=step)
+        np.copyto(blocking, step, where=servers >= k)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        utilization = offered_load / servers
+        probability = blocking / (1 - utilization * (1 - blocking))
+    return np.where(utilization < 1, probability, 1.0)
+
+
+def calculate_queue_length(
+    servers: np.ndarray, utilization: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the average number of customers waiting in an M/M/c queue
+    (Lq) at the given utilization ρ = λ/(cμ), inf for unstable queues.
+    """
+
+    servers, utilization = np.broadcast_arrays(servers, utilization)
+    probability = calculate_erlang_c(servers, servers * utilization)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        queue_length = probability * utilization / (1 - utilization)
+    return np.where(utilization < 1, queue_length, np.inf)
+
+
+def solve_utilization(
+    servers: np.ndarray, queue_length: np.ndarray
+) -> np.ndarray:
+    """
+    Find the utilization of M/M/c queues from their average number of
+    customers waiting, which grows with the utilization, by bisection.
+
+    Parameters:
+    - servers (np.ndarray): The number of servers c.
+    - queue_length (np.ndarray): The average number of customers waiting.
+
+    Returns:
+    - np.ndarray: The utilization ρ, in [0, 1).
+    """
+
+    servers, queue_length = np.broadcast_arrays(servers, queue_length)
+    low = np.zeros(servers.shape)
+    high = np.ones(servers.shape)
+    for _ in range(SOLVE_ITERATIONS):
+        middle = (low + high) / 2
+        below = calculate_queue_length(servers, middle) < queue_length
+        low = np.where(below, middle, low)
+        high = np.where(below, high, middle)
+    return low
+
+
+def calculate_wait(
+    arrival_rate: np.ndarray, service_rate: np.ndarray, servers: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate the average wait time (Wq) and number of customers waiting
+    (Lq) of M/M/c queues.
+
+    Parameters:
+    - arrival_rate (np.ndarray): The arrival rate λ.
+    - service_rate (np.ndarray): The service rate μ of a server.
+    - servers (np.ndarray): The number of servers c.
+
+    Returns:
+    - tuple: The wait time, in the time unit of the rates, and the number
+        of customers waiting, both inf for unstable queues and 0 when no
+        customer arrives.
+    """
+
+    arrival_rate, service_rate, servers = np.broadcast_arrays(
+        arrival_rate, service_rate, servers
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        utilization = np.where(
+            arrival_rate > 0, arrival_rate / (servers * service_rate), 0.0
+        )
+        queue_length = calculate_queue_length(servers, utilization)
+        wait_time = np.where(
+            arrival_rate > 0, queue_length / arrival_rate, 0.0
+        )
+    return wait_time, queue_length
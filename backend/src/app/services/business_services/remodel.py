@@ -0,0 +1,474 @@
+from collections import OrderedDict
+from datetime import datetime
+import json
+import logging
+from os import getenv
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import BASELINE_LANE_COUNTS, LaneType
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.schemas.performance_metrics import MAX_LANES
+from backend.src.app.services.business_services.cache import normalize_value
+from backend.src.app.services.business_services.indexes import (
+    DateIndex,
+    PredicateIndex,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    assign_shoppers_bucket,
+    assign_wait_time_bucket,
+)
+from backend.src.app.services.business_services.queueing import (
+    calculate_wait,
+    solve_utilization,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+# Columns a queue is modeled for
+QUEUE_COLUMNS = ["store_name", "hour", "type_of_checkout"]
+# Historical averages the queues are calibrated on
+QUEUE_TARGET_COLUMNS = ["avg_waiting_time_Tq", "avg_num_wait_queue_Nq"]
+LANE_TYPES = list(LaneType)
+# Wait time in seconds reported for queues that grow without bound
+UNSTABLE_WAIT_TIME = 3600.0
+DEFAULT_REMODEL_CACHE_SIZE = 4
+# Key of the lane counts of every store in the baseline lane counts file
+DEFAULT_STORE_KEY = "default"
+
+
+def get_baseline_lane_counts_path() -> Optional[str]:
+    return getenv("BASELINE_LANE_COUNTS_PATH")
+
+
+class BaselineLaneCounts:
+    """
+    Lanes open per lane type in every store when the history was
+    recorded, the queue models are calibrated against them.
+
+    The lane counts are not part of the historical data, they are an
+    assumption: ``BASELINE_LANE_COUNTS`` for every store unless the file
+    at ``BASELINE_LANE_COUNTS_PATH`` overrides them, see ``from_file``.
+    The lane types a store does not override keep the default count.
+    """
+
+    def __init__(
+        self,
+        stores: Optional[Dict[int, Dict[LaneType, int]]] = None,
+        default: Optional[Dict[LaneType, int]] = None,
+        source: Optional[str] = None,
+    ):
+        self.default = {**BASELINE_LANE_COUNTS, **(default or {})}
+        self.stores = {
+            store: {**self.default, **lane_counts}
+            for store, lane_counts in (stores or {}).items()
+        }
+        self.source = source
+
+    @classmethod
+    def from_file(cls, path: str) -> "BaselineLaneCounts":
+        """
+        Load the baseline lane counts from a JSON file mapping the store
+        numbers, or ``DEFAULT_STORE_KEY`` for every store, to the lanes
+        open per lane type, e.g.
+        ``{"default": {"SCO Bullpen": 10}, "16": {"Manned Express": 3}}``.
+
+        Raises:
+        - ImproperlyConfigured: If the file cannot be read, or holds an
+            unknown store or lane type or an invalid lane count.
+        """
+
+        try:
+            with open(path) as file:
+                content = json.load(file)
+            default = None
+            stores = {}
+            for key, lane_counts in content.items():
+                lane_counts = {
+                    LaneType(lane_type): int(count)
+                    for lane_type, count in lane_counts.items()
+                }
+                if any(
+                    count < 1 or count > MAX_LANES
+                    for count in lane_counts.values()
+                ):
+                    raise ValueError(
+                        f"lane counts should be between 1 and {MAX_LANES}"
+                    )
+                if key == DEFAULT_STORE_KEY:
+                    default = lane_counts
+                else:
+                    stores[int(key)] = lane_counts
+        except (OSError, AttributeError, TypeError, ValueError) as e:
+            raise ImproperlyConfigured(
+                f"Invalid baseline lane counts in {path}: {e}"
+            )
+        logger.info(
+            f"Loaded the baseline lane counts of {len(stores)} stores "
+            f"from {path}"
+        )
+        return cls(stores, default, path)
+
+    def get(self, store: Optional[int] = None) -> Dict[LaneType, int]:
+        """Get the baseline lane counts of a store."""
+        return self.stores.get(store, self.default)
+
+    @property
+    def assumption(self) -> str:
+        """Describe the lane counts the queue models are calibrated on."""
+        if self.source is None:
+            return (
+                "The queues are modeled assuming the same baseline lanes in "
+                "every store when the history was recorded: "
+                + ", ".join(
+                    f"{count} {lane_type.value}"
+                    for lane_type, count in self.default.items()
+                )
+            )
+        return (
+            "The queues are modeled assuming the baseline lanes of the "
+            f"stores when the history was recorded given in {self.source}"
+        )
+
+
+_baseline_lane_counts: Optional[BaselineLaneCounts] = None
+
+
+def get_baseline_lane_counts() -> BaselineLaneCounts:
+    """
+    Get the baseline lane counts of the process, loaded once from
+    ``BASELINE_LANE_COUNTS_PATH`` if set.
+    """
+
+    global _baseline_lane_counts
+    if _baseline_lane_counts is None:
+        path = get_baseline_lane_counts_path()
+        _baseline_lane_counts = (
+            BaselineLaneCounts.from_file(path)
+            if path
+            else BaselineLaneCounts()
+        )
+    return _baseline_lane_counts
+
+
+class QueueModel:
+    """
+    M/M/c model of the checkout queues of every store, hour and lane type,
+    or of other queue columns ending with the lane type, calibrated on the
+    historical averages.
+
+    The arrival rate of a queue follows from its average wait time and
+    number of customers waiting by Little's law (λ = Nq / Tq). The service
+    rate is the one at which an M/M/c queue with the baseline lane count
+    of the store and lane type, see ``BaselineLaneCounts``, has the
+    historical number of customers waiting.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        queue_columns: List[str] = QUEUE_COLUMNS,
+        baseline: Optional[BaselineLaneCounts] = None,
+    ):
+        groups = df.groupby(queue_columns, observed=True, sort=True)
+        means = groups[QUEUE_TARGET_COLUMNS].mean()
+        # Queue of every row of the data
+        self.row_queues = groups.ngroup().to_numpy()
+        self.queues = means.index.to_frame(index=False)
+
+        lane_type_codes = {
+            lane_type.value: code for code, lane_type in enumerate(LANE_TYPES)
+        }
+        self.lane_type_codes = np.array(
+            [
+                lane_type_codes.get(value, -1)
+                for value in self.queues["type_of_checkout"]
+            ]
+        )
+        if (self.lane_type_codes < 0).any():
+            raise ValueError("Unknown lane type in the historical data")
+        self.baseline_lanes = self._get_baseline_lanes(
+            baseline or get_baseline_lane_counts()
+        )
+
+        wait_time = means["avg_waiting_time_Tq"].to_numpy(dtype=np.float64)
+        queue_length = means["avg_num_wait_queue_Nq"].to_numpy(
+            dtype=np.float64
+        )
+        observed = (wait_time > 0) & (queue_length > 0)
+        utilization = solve_utilization(
+            self.baseline_lanes, np.where(observed, queue_length, 0.0)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.arrival_rate = np.where(
+                observed, queue_length / wait_time, 0.0
+            )
+            self.service_rate = np.where(
+                observed,
+                self.arrival_rate / (self.baseline_lanes * utilization),
+                np.inf,
+            )
+        self._wait_table = None
+        self._queue_table = None
+        self.baseline_wait_time, _ = self.evaluate(self.baseline_lanes)
+
+    def __len__(self) -> int:
+        return len(self.queues)
+
+    def _get_baseline_lanes(self, baseline: BaselineLaneCounts) -> np.ndarray:
+        if "store_name" in self.queues.columns:
+            stores, store_codes = np.unique(
+                self.queues["store_name"].to_numpy(), return_inverse=True
+            )
+        else:
+            stores, store_codes = [None], np.zeros(len(self), dtype=np.intp)
+        lanes = np.array(
+            [
+                [baseline.get(store)[lane_type] for lane_type in LANE_TYPES]
+                for store in stores
+            ],
+            dtype=np.int64,
+        ).reshape(len(stores), len(LANE_TYPES))
+        return lanes[store_codes, self.lane_type_codes]
+
+    def get_lanes(self, lane_counts: Dict[LaneType, int]) -> np.ndarray:
+        """
+        Get the lanes of every queue for the lane counts of the lane
+        types, the baseline lane count of the store for the lane types
+        missing.
+        """
+
+        lanes = np.array(
+            [lane_counts.get(lane_type, 0) for lane_type in LANE_TYPES]
+        )[self.lane_type_codes]
+        return np.where(lanes > 0, lanes, self.baseline_lanes)
+
+    def get_configuration_lanes(
+        self, configurations: np.ndarray
+    ) -> np.ndarray:
+        """
+        Get the lanes of every queue for several lane configurations.
+
+        Parameters:
+        - configurations (np.ndarray): The lane count of every lane type,
+            in the order of ``LaneType``, one configuration per row.
+
+        Returns:
+        - np.ndarray: The lanes of every queue, one configuration per row.
+        """
+
+        return np.asarray(configurations)[..., self.lane_type_codes]
+
+    def _build_tables(self, max_lanes: int) -> None:
+        lanes = np.arange(max_lanes + 1)
+        self._wait_table, self._queue_table = calculate_wait(
+            self.arrival_rate[:, None], self.service_rate[:, None], lanes
+        )
+        self._wait_table[:, 0] = self._queue_table[:, 0] = np.inf
+
+    def evaluate(self, lanes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the average wait time and number of customers waiting of
+        the queues for the given lanes.
+
+        The queues are solved once for every lane count up to the largest
+        one asked, so evaluating lane configurations only gathers their
+        cells from these tables.
+
+        Parameters:
+        - lanes (np.ndarray): The lanes of every queue, with any number of
+            leading dimensions, e.g. one per lane configuration.
+
+        Returns:
+        - tuple: The wait times in seconds and the numbers of customers
+            waiting, shaped as the lanes, inf for unstable queues.
+        """
+
+        lanes = np.asarray(lanes)
+        max_lanes = int(lanes.max(initial=0))
+        if self._wait_table is None or max_lanes >= self._wait_table.shape[1]:
+            self._build_tables(max(max_lanes, MAX_LANES))
+        queues = np.arange(len(self))
+        return (
+            self._wait_table[queues, lanes],
+            self._queue_table[queues, lanes],
+        )
+
+
+def remodel_frame(
+    df: pd.DataFrame, model: QueueModel, lane_counts: Dict[LaneType, int]
+) -> pd.DataFrame:
+    """
+    Remodel the kpi data for other lane counts.
+
+    The wait time and number of customers waiting of every row are scaled
+    by the ratio of the modeled wait time of its queue to the baseline
+    one, so the day to day variations of the history are kept. The
+    wait time and shopper buckets follow the remodeled values.
+    Queues without enough lanes for their arrivals are reported with
+    ``UNSTABLE_WAIT_TIME``.
+
+    Parameters:
+    - df (pd.DataFrame): The kpi data the model was calibrated on.
+    - model (QueueModel): The queue model of the data.
+    - lane_counts (Dict[LaneType, int]): The lanes open per lane type.
+
+    Returns:
+    - pd.DataFrame: The remodeled kpi data, sharing the unchanged
+        columns with the kpi data.
+    """
+
+    wait_time, _ = model.evaluate(model.get_lanes(lane_counts))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(
+            model.baseline_wait_time > 0,
+            wait_time / model.baseline_wait_time,
+            1.0,
+        )
+    stable = np.isfinite(ratio)
+    # Rows with a missing queue column are in no queue (-1) and are kept,
+    # through the last item appended to the queue arrays
+    row_ratio = np.append(np.where(stable, ratio, 0.0), 1.0)[model.row_queues]
+    row_unstable = np.append(~stable, False)[model.row_queues]
+
+    remodeled = df.copy(deep=False)
+    row_wait_time = np.where(
+        row_unstable,
+        UNSTABLE_WAIT_TIME,
+        df["avg_waiting_time_Tq"].to_numpy(dtype=np.float64) * row_ratio,
+    )
+    row_queue_length = np.where(
+        row_unstable,
+        np.append(model.arrival_rate, 0.0)[model.row_queues]
+        * UNSTABLE_WAIT_TIME,
+        df["avg_num_wait_queue_Nq"].to_numpy(dtype=np.float64) * row_ratio,
+    )
+    remodeled["avg_waiting_time_Tq"] = row_wait_time
+    remodeled["avg_num_wait_queue_Nq"] = row_queue_length
+    remodeled["Wait_Time_BKT"] = assign_wait_time_bucket(row_wait_time)
+    remodeled["Shoppers_BKT"] = assign_shoppers_bucket(
+        remodeled["avg_num_wait_queue_Nq"]
+    )
+    return remodeled
+
+
+class RemodelCache:
+    """
+    Queue model of the current data version and the last remodeled
+    frames, remodeled frames of another version are dropped.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.version = None
+        self.model: Optional[QueueModel] = None
+        self._frames: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get_model(self, kpi_data: DataSnapshot) -> QueueModel:
+        with self._lock:
+            if self.version == kpi_data.version:
+                return self.model
+        model = QueueModel(kpi_data.frame)
+        with self._lock:
+            if self.version != kpi_data.version:
+                self.version = kpi_data.version
+                self.model = model
+                self._frames.clear()
+            return self.model
+
+    def get_frame(
+        self, kpi_data: DataSnapshot, lane_counts: Dict[LaneType, int]
+    ) -> pd.DataFrame:
+        model = self.get_model(kpi_data)
+        key = normalize_value(lane_counts)
+        with self._lock:
+            if key in self._frames and self.version == kpi_data.version:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+        frame = remodel_frame(kpi_data.frame, model, lane_counts)
+        with self._lock:
+            if self.version == kpi_data.version:
+                self._frames[key] = frame
+                while len(self._frames) > self.max_entries:
+                    self._frames.popitem(last=False)
+        return frame
+
+
+_remodel_cache: Optional[RemodelCache] = None
+
+
+def get_remodel_cache() -> RemodelCache:
+    global _remodel_cache
+    if _remodel_cache is None:
+        _remodel_cache = RemodelCache(
+            int(getenv("REMODEL_CACHE_SIZE", DEFAULT_REMODEL_CACHE_SIZE))
+        )
+    return _remodel_cache
+
+
+class RemodelSnapshot:
+    """
+    Kpi data remodeled for other lane counts, see ``remodel_frame``.
+
+    Only the queue columns change, so the snapshot shares the version and
+    the predicate and date indexes of the historical snapshot. It has no
+    aggregate cube, rollups nor sample, the remodeled frame is built on
+    first access.
+    """
+
+    def __init__(
+        self,
+        kpi_data: DataSnapshot,
+        lane_counts: Optional[Dict[LaneType, int]] = None,
+    ):
+        self._kpi_data = kpi_data
+        self._lane_counts = lane_counts or {}
+
+    @property
+    def version(self) -> str:
+        return self._kpi_data.version
+
+    @property
+    def created_at(self) -> datetime:
+        return self._kpi_data.created_at
+
+    @property
+    def lane_counts(self) -> Dict[LaneType, int]:
+        return self._lane_counts
+
+    @property
+    def model(self) -> QueueModel:
+        return get_remodel_cache().get_model(self._kpi_data)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return get_remodel_cache().get_frame(self._kpi_data, self._lane_counts)
+
+    @property
+    def index(self) -> PredicateIndex:
+        return self._kpi_data.index
+
+    @property
+    def dates(self) -> Optional[DateIndex]:
+        return self._kpi_data.dates
+
+    @property
+    def cube(self) -> None:
+        return None
+
+    @property
+    def rollups(self) -> None:
+        return None
+
+    @property
+    def sample(self) -> None:
+        return None
+
+    def __len__(self) -> int:
+        return len(self._kpi_data)
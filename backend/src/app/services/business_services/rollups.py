@@ -0,0 +1,338 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import TimeResolution
+from backend.src.app.services.business_services.aggregates import (
+    CellTable,
+    get_count_column,
+    get_sum_column,
+)
+from backend.src.app.services.business_services.indexes import (
+    DateIndex,
+    PredicateIndex,
+    intersect_rows,
+)
+
+
+# Columns summed up in the rollups
+ROLLUP_TARGET_COLUMNS = ["avg_waiting_time_Tq", "avg_num_wait_queue_Nq"]
+# Resolutions rolled up, each from the previous one
+ROLLUP_RESOLUTIONS = [
+    TimeResolution.DAY,
+    TimeResolution.WEEK,
+    TimeResolution.MONTH,
+]
+
+
+def floor_period(dates: np.ndarray, resolution: TimeResolution) -> np.ndarray:
+    """
+    Get the start of the period of every date, weeks start on Monday.
+    """
+
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    if resolution == TimeResolution.HOUR:
+        return dates.astype("datetime64[h]").astype("datetime64[ns]")
+    days = dates.astype("datetime64[D]")
+    if resolution == TimeResolution.WEEK:
+        # The epoch was a Thursday
+        days = days - (days.astype(np.int64) + 3) % 7
+    elif resolution == TimeResolution.MONTH:
+        days = days.astype("datetime64[M]")
+    return days.astype("datetime64[ns]")
+
+
+def floor_date(date: pd.Timestamp, resolution: TimeResolution) -> pd.Timestamp:
+    """Get the start of the period of a date."""
+    return pd.Timestamp(
+        floor_period(np.array([date.to_datetime64()]), resolution)[0]
+    )
+
+
+def ceil_date(date: pd.Timestamp, resolution: TimeResolution) -> pd.Timestamp:
+    """Get the start of the first period starting on or after a date."""
+    start = floor_date(date, resolution)
+    if start == date:
+        return start
+    if resolution == TimeResolution.MONTH:
+        return start + pd.DateOffset(months=1)
+    if resolution == TimeResolution.WEEK:
+        return start + pd.Timedelta(days=7)
+    return start + pd.Timedelta(days=1)
+
+
+class TimeRollups:
+    """
+    Sums and counts of the queue columns per day, week and month and per
+    value of the filter columns, built once at load time.
+
+    The days are summed from the rows, the weeks and months from the days.
+    A range of dates is answered from the whole periods of the coarsest
+    rollup it holds, and from the days of the periods it only partly
+    covers, so trends over long ranges read few cells whatever the rows.
+    Appended rows are rolled up on their own, see ``extend``.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        filter_columns: List[str],
+        target_cols: List[str] = ROLLUP_TARGET_COLUMNS,
+    ):
+        self.dimensions = [
+            column for column in filter_columns if column in df.columns
+        ]
+        self.target_cols = [
+            column for column in target_cols if column in df.columns
+        ]
+        self.total_columns = [
+            aggregation(column)
+            for column in self.target_cols
+            for aggregation in (get_sum_column, get_count_column)
+        ]
+        self.tables = {
+            resolution: CellTable(
+                cells, ["period"] + self.dimensions, self.dimensions
+            )
+            for resolution, cells in self._build_cells(df).items()
+        }
+
+    @classmethod
+    def from_frames(
+        cls, frames: Dict[str, pd.DataFrame], meta: Dict
+    ) -> "TimeRollups":
+        """
+        Attach rollups to the cells saved by ``to_frames``, without
+        rolling up any row.
+        """
+
+        rollups = cls.__new__(cls)
+        rollups.dimensions = meta["dimensions"]
+        rollups.target_cols = meta["target_cols"]
+        rollups.total_columns = meta["total_columns"]
+        rollups.tables = {
+            TimeResolution(name): CellTable.from_frame(
+                frames[name], table_meta
+            )
+            for name, table_meta in meta["tables"].items()
+        }
+        return rollups
+
+    def to_frames(self) -> Tuple[Dict[str, pd.DataFrame], Dict]:
+        """
+        Get the cells of every resolution, see ``CellTable.to_frame``, and
+        the description of the rollups, to save them, see ``from_frames``.
+        """
+
+        frames = {}
+        tables = {}
+        for resolution, table in self.tables.items():
+            (
+                frames[resolution.value],
+                tables[resolution.value],
+            ) = table.to_frame()
+        return frames, {
+            "dimensions": self.dimensions,
+            "target_cols": self.target_cols,
+            "total_columns": self.total_columns,
+            "tables": tables,
+        }
+
+    @property
+    def cells(self) -> Dict[TimeResolution, pd.DataFrame]:
+        return {
+            resolution: table.cells
+            for resolution, table in self.tables.items()
+        }
+
+    @property
+    def periods(self) -> Dict[TimeResolution, DateIndex]:
+        return {
+            resolution: table.periods
+            for resolution, table in self.tables.items()
+        }
+
+    @property
+    def indexes(self) -> Dict[TimeResolution, PredicateIndex]:
+        return {
+            resolution: table.index
+            for resolution, table in self.tables.items()
+        }
+
+    def _build_cells(
+        self, df: pd.DataFrame
+    ) -> Dict[TimeResolution, pd.DataFrame]:
+        aggregations = {}
+        for column in self.target_cols:
+            aggregations[get_sum_column(column)] = (column, "sum")
+            aggregations[get_count_column(column)] = (column, "count")
+        days = (
+            df.groupby(
+                ["date"] + self.dimensions,
+                observed=True,
+                dropna=False,
+                sort=True,
+            )
+            .agg(**aggregations)
+            .reset_index()
+            .rename(columns={"date": "period"})
+        )
+        days = days[days["period"].notna()].reset_index(drop=True)
+        cells = {TimeResolution.DAY: days}
+        for resolution in ROLLUP_RESOLUTIONS[1:]:
+            cells[resolution] = (
+                days.assign(period=floor_period(days["period"], resolution))
+                .groupby(
+                    ["period"] + self.dimensions,
+                    observed=True,
+                    dropna=False,
+                    sort=True,
+                )[self.total_columns]
+                .sum()
+                .reset_index()
+            )
+        return cells
+
+    def extend(self, df: pd.DataFrame) -> "TimeRollups":
+        """
+        Build the rollups of the data with rows appended, from the
+        appended rows only, see ``CellTable.append``.
+
+        Parameters:
+        - df (pd.DataFrame): The appended rows, dated on or after the last
+            rolled up day.
+
+        Returns:
+        - TimeRollups: The rollups of the whole data, these ones are
+            unchanged.
+
+        Raises:
+        - ValueError: If the rows are dated before the last rolled up day.
+        """
+
+        rollups = TimeRollups.__new__(TimeRollups)
+        rollups.dimensions = self.dimensions
+        rollups.target_cols = self.target_cols
+        rollups.total_columns = self.total_columns
+        rollups.tables = {
+            resolution: self.tables[resolution].append(cells)
+            for resolution, cells in self._build_cells(df).items()
+        }
+        return rollups
+
+    def _select(
+        self,
+        resolution: TimeResolution,
+        predicates: Dict[str, List],
+        start: Optional[pd.Timestamp],
+        end: Optional[pd.Timestamp],
+    ) -> pd.DataFrame:
+        table = self.tables[resolution]
+        rows = intersect_rows(
+            table.index.select(predicates), table.periods.select(start, end)
+        )
+        return table.cells.take(rows)
+
+    def select_cells(
+        self,
+        resolution: TimeResolution,
+        predicates: Dict[str, List],
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        """
+        Get the cells of the periods of a resolution matching all the
+        predicates, from ``start`` to before ``end``.
+
+        The days of the periods cut by the range are read from the day
+        rollup and assigned to their period.
+
+        Parameters:
+        - resolution (TimeResolution): The day, week or month resolution.
+        - predicates (Dict[str, List]): The filter predicates.
+        - start (pd.Timestamp): The first day, unbounded if None.
+        - end (pd.Timestamp): The day after the last one, unbounded if
+            None.
+
+        Returns:
+        - pd.DataFrame: The cells, with the start of their period.
+        """
+
+        if resolution == TimeResolution.DAY:
+            return self._select(resolution, predicates, start, end)
+
+        whole_start = None if start is None else ceil_date(start, resolution)
+        whole_end = None if end is None else floor_date(end, resolution)
+        if (
+            whole_start is not None
+            and whole_end is not None
+            and whole_start >= whole_end
+        ):
+            # The range holds no whole period
+            edges = [(start, end)]
+            parts = []
+        else:
+            edges = []
+            if start is not None and start < whole_start:
+                edges.append((start, whole_start))
+            if end is not None and whole_end < end:
+                edges.append((whole_end, end))
+            parts = [
+                self._select(resolution, predicates, whole_start, whole_end)
+            ]
+
+        for edge_start, edge_end in edges:
+            days = self._select(
+                TimeResolution.DAY, predicates, edge_start, edge_end
+            )
+            parts.append(
+                days.assign(period=floor_period(days["period"], resolution))
+            )
+        return pd.concat(parts, ignore_index=True)
+
+    def aggregate(
+        self,
+        resolution: TimeResolution,
+        group_by_cols: List[str],
+        target_cols: Dict[str, str],
+        predicates: Dict[str, List],
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        cells: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        Calculate the means of the target columns per period and group of
+        the other grouping columns, see ``select_cells``.
+
+        Parameters:
+        - resolution (TimeResolution): The day, week or month resolution.
+        - group_by_cols (List[str]): The grouping columns, 'period' for the
+            start of the periods.
+        - target_cols (Dict[str, str]): A dictionary where keys are the
+            names of the result columns and values are the columns to
+            average.
+        - predicates (Dict[str, List]): The filter predicates.
+        - start (pd.Timestamp): The first day, unbounded if None.
+        - end (pd.Timestamp): The day after the last one, unbounded if
+            None.
+        - cells (pd.DataFrame): The already selected cells, if any.
+
+        Returns:
+        - pd.DataFrame: The means indexed by the groups, as returned by
+            ``GroupedMean.aggregate``.
+        """
+
+        if cells is None:
+            cells = self.select_cells(resolution, predicates, start, end)
+        totals = cells.groupby(group_by_cols, observed=True)[
+            self.total_columns
+        ].sum()
+        return pd.DataFrame(
+            {
+                name: totals[get_sum_column(column)]
+                / totals[get_count_column(column)]
+                for name, column in target_cols.items()
+            },
+            index=totals.index,
+        )
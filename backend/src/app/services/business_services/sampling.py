@@ -0,0 +1,405 @@
+from os import getenv
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.services.business_services.filters import FILTER_COLUMNS
+from backend.src.app.services.business_services.indexes import (
+    DateIndex,
+    PredicateIndex,
+)
+from backend.src.app.services.business_services.metrics.base import (
+    GroupedMean,
+)
+from backend.src.app.services.business_services.metrics.fused import (
+    factorize_column,
+)
+
+
+# Columns whose combinations are the strata of the sample
+STRATA_COLUMNS = ["store_name", "type_of_checkout", "hour"]
+# Rows sampled per stratum
+DEFAULT_SAMPLE_STRATUM_SIZE = 30
+DEFAULT_SAMPLE_CONFIDENCE_LEVEL = 0.95
+DEFAULT_SAMPLE_SEED = 0
+# Columns of the sampled rows, with the rows of their stratum in the data
+# and in the sample
+STRATUM_COLUMN = "__stratum"
+POPULATION_COLUMN = "__population"
+SAMPLED_COLUMN = "__sampled"
+
+
+def get_stratum_size() -> int:
+    return int(getenv("SAMPLE_STRATUM_SIZE", DEFAULT_SAMPLE_STRATUM_SIZE))
+
+
+def get_confidence_level() -> float:
+    return float(
+        getenv("SAMPLE_CONFIDENCE_LEVEL", DEFAULT_SAMPLE_CONFIDENCE_LEVEL)
+    )
+
+
+def get_sample_seed() -> int:
+    return int(getenv("SAMPLE_SEED", DEFAULT_SAMPLE_SEED))
+
+
+def get_strata(df: pd.DataFrame) -> np.ndarray:
+    """
+    Get the stratum code of every row, numbered from 0, from the codes of
+    the strata columns without sorting the rows.
+    """
+
+    keys = np.zeros(len(df), dtype=np.int64)
+    for column in STRATA_COLUMNS:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            num_codes = len(series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series)
+            num_codes = len(uniques)
+        # Missing values (-1) are a stratum of their own
+        keys = keys * (num_codes + 1) + codes + 1
+    present = np.bincount(keys) > 0
+    return (np.cumsum(present) - 1)[keys]
+
+
+def get_t_quantile(z_score: float, dof: np.ndarray) -> np.ndarray:
+    """
+    Get the quantiles of Student's t distributions matching a quantile
+    of the normal distribution, from the series of Abramowitz and Stegun
+    26.7.5, within 1% from 2 degrees of freedom.
+    """
+
+    z = z_score
+    terms = [
+        (z**3 + z) / 4,
+        (5 * z**5 + 16 * z**3 + 3 * z) / 96,
+        (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384,
+        (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z)
+        / 92160,
+    ]
+    dof = np.asarray(dof, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return z + sum(
+            term / dof ** (power + 1) for power, term in enumerate(terms)
+        )
+
+
+def rank_within(codes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Rank the rows of every code in a random order, from 0."""
+    permutation = rng.permutation(len(codes))
+    permuted_codes = codes[permutation]
+    # Stable sorts of 16 bit integers are radix sorts
+    order = np.argsort(
+        (
+            permuted_codes.astype(np.uint16)
+            if len(codes) and permuted_codes.max() < 2**16
+            else permuted_codes
+        ),
+        kind="stable",
+    )
+    sorted_codes = permuted_codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ranks = np.empty(len(codes), dtype=np.int64)
+    ranks[permutation[order]] = np.arange(len(codes)) - np.repeat(
+        starts, np.diff(np.r_[starts, len(codes)])
+    )
+    return ranks
+
+
+class StratifiedSample:
+    """
+    Uniform sample of ``SAMPLE_STRATUM_SIZE`` rows of every store, lane
+    type and hour of the data, built once at load time.
+
+    Every sampled row knows the rows of its stratum in the data and in
+    the sample, so a mean over any filtered subset is estimated from the
+    sampled rows of the subset with its confidence interval, see
+    ``estimate_fused_means``. The sample size depends on the number of strata
+    only, not on the number of rows.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        stratum_size: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        self.stratum_size = stratum_size or get_stratum_size()
+        self.seed = get_sample_seed() if seed is None else seed
+        rng = np.random.default_rng(self.seed)
+        strata = get_strata(df)
+        keep = rank_within(strata, rng) < self.stratum_size
+        populations = np.bincount(strata)[strata]
+        self._attach(df, np.flatnonzero(keep), populations[keep])
+
+    @classmethod
+    def from_frame(
+        cls, df: pd.DataFrame, frame: pd.DataFrame, meta: Dict
+    ) -> "StratifiedSample":
+        """
+        Attach the sample of the data saved by ``to_frame``, without
+        drawing it again.
+
+        Parameters:
+        - df (pd.DataFrame): The sampled data.
+        - frame (pd.DataFrame): The sampled rows and their populations.
+        - meta (Dict): The size of the strata and the seed of the sample.
+
+        Returns:
+        - StratifiedSample: The sample of the data.
+        """
+
+        sample = cls.__new__(cls)
+        sample.stratum_size = meta["stratum_size"]
+        sample.seed = meta["seed"]
+        sample._attach(
+            df, frame["rows"].to_numpy(), frame["populations"].to_numpy()
+        )
+        return sample
+
+    def to_frame(self) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Get the sampled rows with their populations, and the size of the
+        strata and the seed, to save them, see ``from_frame``.
+        """
+
+        return pd.DataFrame(
+            {"rows": self.rows, "populations": self.populations}
+        ), {"stratum_size": self.stratum_size, "seed": self.seed}
+
+    def _attach(
+        self, df: pd.DataFrame, rows: np.ndarray, populations: np.ndarray
+    ) -> None:
+        # The rows keep their order, the sample of a table sorted by date
+        # is sorted by date
+        self.rows = rows
+        self.populations = populations
+        frame = df.take(rows).reset_index(drop=True)
+        strata = get_strata(frame)
+        frame[STRATUM_COLUMN] = strata
+        frame[POPULATION_COLUMN] = populations
+        frame[SAMPLED_COLUMN] = np.bincount(strata)[strata]
+        self.frame = frame
+        self.index = PredicateIndex(frame, FILTER_COLUMNS)
+        self.dates = (
+            DateIndex(frame["date"]) if "date" in frame.columns else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def extend(self, df: pd.DataFrame, start: int) -> "StratifiedSample":
+        """
+        Sample the data with rows appended, from the sample and the
+        appended rows only.
+
+        The rows of a stratum kept from the sample are drawn from a
+        hypergeometric distribution of the rows of the stratum before and
+        after ``start``, so the sample stays uniform within every stratum.
+
+        Parameters:
+        - df (pd.DataFrame): The whole data, with the appended rows.
+        - start (int): The position of the first appended row.
+
+        Returns:
+        - StratifiedSample: The sample of the whole data, this one is
+            unchanged.
+        """
+
+        rng = np.random.default_rng([self.seed, start])
+        new_strata = get_strata(df.iloc[start:])
+        keep = rank_within(new_strata, rng) < self.stratum_size
+        new_rows = np.flatnonzero(keep) + start
+        new_populations = np.bincount(new_strata)[new_strata][keep]
+
+        rows = np.concatenate([self.rows, new_rows])
+        is_new = np.repeat([False, True], [len(self.rows), len(new_rows)])
+        strata = get_strata(df.take(rows))
+        num_strata = strata.max() + 1 if len(strata) else 0
+        old_population = np.zeros(num_strata, dtype=np.int64)
+        old_population[strata[~is_new]] = self.populations
+        new_population = np.zeros(num_strata, dtype=np.int64)
+        new_population[strata[is_new]] = new_populations
+        population = old_population + new_population
+        sample_size = np.minimum(population, self.stratum_size)
+        from_old = rng.hypergeometric(
+            old_population, new_population, sample_size
+        )
+        quota = np.where(
+            is_new,
+            sample_size[strata] - from_old[strata],
+            from_old[strata],
+        )
+        keep = rank_within(strata * 2 + is_new, rng) < quota
+        order = np.argsort(rows[keep], kind="stable")
+
+        sample = StratifiedSample.__new__(StratifiedSample)
+        sample.stratum_size = self.stratum_size
+        sample.seed = self.seed
+        sample._attach(
+            df,
+            rows[keep][order],
+            population[strata[keep]][order],
+        )
+        return sample
+
+
+def estimate_fused_means(
+    data: pd.DataFrame,
+    metric_functions: Dict[str, GroupedMean],
+    confidence_level: Optional[float] = None,
+) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Estimate the group means of several metrics from the sampled rows of
+    a filtered subset, with their confidence intervals, in one plan as
+    ``calculate_fused_means`` calculates them.
+
+    Every group is a domain of the stratified sample: its mean is the
+    ratio of the weighted sum of the target to the weighted count of the
+    rows, the weight of a row being the rows of its stratum per sampled
+    row. The variance of the ratio is linearized and summed over the
+    strata, with the finite population correction, and the interval is
+    Student's one, with the sampled rows of the group less one degrees of
+    freedom, as most groups of a filtered subset hold few sampled rows.
+    The interval of a group with a single sampled row is unknown.
+
+    Parameters:
+    - data (pd.DataFrame): The filtered rows of a ``StratifiedSample``.
+    - metric_functions (Dict[str, GroupedMean]): A dictionary where keys
+        are metric names and values are grouped mean metrics.
+    - confidence_level (float): The confidence level of the intervals,
+        SAMPLE_CONFIDENCE_LEVEL when not set.
+
+    Returns:
+    - dict: A dictionary where keys are metric names and values are the
+        estimated means, as returned by ``GroupedMean.aggregate``, and
+        the half widths of their confidence intervals.
+    """
+
+    z_score = NormalDist().inv_cdf(
+        (1 + (confidence_level or get_confidence_level())) / 2
+    )
+    strata = data[STRATUM_COLUMN].to_numpy()
+    num_strata = int(strata.max()) + 1 if len(strata) else 0
+    # The rows of every stratum in the data and in the whole sample
+    stratum_population = np.ones(num_strata)
+    stratum_population[strata] = data[POPULATION_COLUMN].to_numpy()
+    stratum_sampled = np.ones(num_strata)
+    stratum_sampled[strata] = data[SAMPLED_COLUMN].to_numpy()
+    weights = stratum_population[strata] / stratum_sampled[strata]
+
+    factorized = {}
+    groupings = {}
+    for metric in metric_functions.values():
+        for column in metric.group_by_cols:
+            if column not in factorized:
+                series = (
+                    data[column]
+                    if column in data.columns
+                    else pd.Series(metric.derived_cols[column](data))
+                )
+                factorized[column] = factorize_column(series)
+        groupings.setdefault(tuple(metric.group_by_cols), set()).update(
+            metric.target_cols.values()
+        )
+
+    estimates = {}
+    group_indexes = {}
+    for group_by_cols, target_cols in groupings.items():
+        (outer_codes, outer_labels), (inner_codes, inner_labels) = (
+            factorized[group_by_cols[0]],
+            factorized[group_by_cols[1]],
+        )
+        num_groups = len(outer_labels) * len(inner_labels)
+        codes = outer_codes.astype(np.intp) * len(inner_labels) + inner_codes
+        valid = (outer_codes >= 0) & (inner_codes >= 0)
+        observed = np.flatnonzero(
+            np.bincount(codes[valid], minlength=num_groups)
+        )
+        group_indexes[group_by_cols] = pd.MultiIndex.from_arrays(
+            [
+                outer_labels.take(observed // len(inner_labels)),
+                inner_labels.take(observed % len(inner_labels)),
+            ],
+            names=list(group_by_cols),
+        )
+        for column in target_cols:
+            values = data[column].to_numpy(dtype=np.float64)
+            keep = valid & ~np.isnan(values)
+            values, row_codes = values[keep], codes[keep]
+            row_weights = weights[keep]
+            group_weights = np.bincount(
+                row_codes, weights=row_weights, minlength=num_groups
+            )
+            group_rows = np.bincount(row_codes, minlength=num_groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ratio = (
+                    np.bincount(
+                        row_codes,
+                        weights=row_weights * values,
+                        minlength=num_groups,
+                    )
+                    / group_weights
+                )
+
+            # Linearized residuals of the rows of every group and stratum,
+            # the other rows of the stratum count as 0
+            residuals = values - ratio[row_codes]
+            cell_codes = row_codes * num_strata + strata[keep]
+            cells = np.flatnonzero(
+                np.bincount(cell_codes, minlength=num_groups * num_strata)
+            )
+            cell_sums = np.bincount(
+                cell_codes,
+                weights=residuals,
+                minlength=num_groups * num_strata,
+            )[cells]
+            cell_squares = np.bincount(
+                cell_codes,
+                weights=residuals**2,
+                minlength=num_groups * num_strata,
+            )[cells]
+            population = stratum_population[cells % num_strata]
+            sampled = stratum_sampled[cells % num_strata]
+            stratum_variance = np.maximum(
+                cell_squares - cell_sums**2 / sampled, 0.0
+            ) / np.maximum(sampled - 1, 1)
+            variance = np.bincount(
+                cells // num_strata,
+                weights=population**2
+                * (1 - sampled / population)
+                * stratum_variance
+                / sampled,
+                minlength=num_groups,
+            )
+            with np.errstate(invalid="ignore", divide="ignore"):
+                half_widths = np.where(
+                    group_rows > 1,
+                    get_t_quantile(z_score, group_rows - 1)
+                    * np.sqrt(variance)
+                    / group_weights,
+                    np.nan,
+                )
+            estimates[(group_by_cols, column)] = (
+                ratio[observed],
+                half_widths[observed],
+            )
+
+    results = {}
+    for metric_name, metric in metric_functions.items():
+        group_by_cols = tuple(metric.group_by_cols)
+        results[metric_name] = tuple(
+            pd.DataFrame(
+                {
+                    name: estimates[(group_by_cols, column)][position]
+                    for name, column in metric.target_cols.items()
+                },
+                index=group_indexes[group_by_cols],
+            )
+            for position in (0, 1)
+        )
+    return results
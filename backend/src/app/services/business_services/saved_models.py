@@ -0,0 +1,366 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from os import getenv
+from threading import Lock
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.filters import FILTER_COLUMNS
+from backend.src.app.services.business_services.indexes import (
+    CODES_PREFIX,
+    ORDER_PREFIX,
+    DateIndex,
+    PredicateIndex,
+)
+from backend.src.app.services.snapshot_cache import CacheLock
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAVED_MODELS_DIR = "backend/data/saved_models"
+CATALOG_FILE_NAME = "catalog.json"
+DEFAULT_SAVED_MODEL_CACHE_SIZE = 8
+
+
+def get_saved_models_dir() -> str:
+    return getenv("SAVED_MODELS_DIR", DEFAULT_SAVED_MODELS_DIR)
+
+
+class SavedModelSnapshot:
+    """
+    Kpi data of a saved scenario, attached to its memory-mapped file.
+
+    The predicate and date indexes are rebuilt from the arrays saved with
+    the data, so opening a saved scenario neither remodels nor sorts any
+    row. The snapshot has no aggregate cube, rollups nor sample.
+    """
+
+    def __init__(
+        self,
+        entry: Dict,
+        frame: pd.DataFrame,
+        index: PredicateIndex,
+        dates: Optional[DateIndex] = None,
+    ):
+        self._entry = entry
+        self._frame = frame
+        self._index = index
+        self._dates = dates
+
+    @property
+    def id(self) -> str:
+        return self._entry["id"]
+
+    @property
+    def version(self) -> str:
+        """The version of the historical data the scenario was built on."""
+        return self._entry["data_version"]
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromisoformat(self._entry["created_at"])
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._frame
+
+    @property
+    def index(self) -> PredicateIndex:
+        return self._index
+
+    @property
+    def dates(self) -> Optional[DateIndex]:
+        return self._dates
+
+    @property
+    def cube(self) -> None:
+        return None
+
+    @property
+    def rollups(self) -> None:
+        return None
+
+    @property
+    def sample(self) -> None:
+        return None
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+
+class SavedModelStore:
+    """
+    Saved scenarios, each an uncompressed Arrow file of its kpi data and
+    predicate index, listed in a JSON catalog with their lane counts and
+    the row range of every store.
+
+    The rows of a scenario are sorted by store, so the rows of a store
+    are contiguous in the file, their order by date is saved along. The
+    catalog is updated under the lock of
+    the directory, the workers of a node share it.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or get_saved_models_dir()
+
+    def _get_path(self, model_id: str) -> str:
+        return os.path.join(self.directory, f"{model_id}.arrow")
+
+    def _read_catalog(self) -> Dict[str, Dict]:
+        try:
+            with open(
+                os.path.join(self.directory, CATALOG_FILE_NAME)
+            ) as catalog_file:
+                return json.load(catalog_file)
+        except FileNotFoundError:
+            return {}
+
+    def _write_catalog(self, catalog: Dict[str, Dict]) -> None:
+        path = os.path.join(self.directory, CATALOG_FILE_NAME)
+        with open(f"{path}.tmp", "w") as catalog_file:
+            json.dump(catalog, catalog_file)
+        os.replace(f"{path}.tmp", path)
+
+    def list(self, store: Optional[int] = None) -> List[Dict]:
+        """List the saved scenarios, only those holding a store if given."""
+        return [
+            entry
+            for entry in self._read_catalog().values()
+            if store is None or str(store) in entry["stores"]
+        ]
+
+    def get(self, model_id: str) -> Dict:
+        """
+        Get the catalog entry of a saved scenario.
+
+        Raises:
+        - EmptyDataError: If the scenario is not found.
+        """
+
+        entry = self._read_catalog().get(model_id)
+        if entry is None:
+            raise EmptyDataError(f"Saved model {model_id} not found")
+        return entry
+
+    def save(
+        self,
+        name: str,
+        lane_counts: Dict[LaneType, int],
+        df: pd.DataFrame,
+        data_version: str,
+    ) -> Dict:
+        """
+        Save the kpi data of a scenario.
+
+        Parameters:
+        - name (str): The name of the scenario.
+        - lane_counts (Dict[LaneType, int]): The lanes open per lane type.
+        - df (pd.DataFrame): The kpi data of the scenario.
+        - data_version (str): The version of the historical data the
+            scenario was built on.
+
+        Returns:
+        - dict: The catalog entry of the saved scenario.
+        """
+
+        order = np.argsort(df["store_name"].to_numpy(), kind="stable")
+        df = df.take(order).reset_index(drop=True)
+        index = PredicateIndex(df, FILTER_COLUMNS)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        arrays, indexes = index.get_arrays()
+        for column, array in arrays.items():
+            table = table.append_column(column, pa.array(array))
+        if "date" in df.columns:
+            date_index = DateIndex(df["date"])
+            if not date_index.is_sorted:
+                table = table.append_column(
+                    f"{ORDER_PREFIX}date", pa.array(date_index.order)
+                )
+        stores, starts = np.unique(
+            df["store_name"].to_numpy(), return_index=True
+        )
+        stops = np.append(starts[1:], len(df))
+
+        model_id = uuid4().hex
+        entry = {
+            "id": model_id,
+            "name": name,
+            "lane_counts": {
+                lane_type.value: count
+                for lane_type, count in lane_counts.items()
+            },
+            "data_version": data_version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "rows": len(df),
+            "stores": {
+                str(store): [int(start), int(stop)]
+                for store, start, stop in zip(stores.tolist(), starts, stops)
+            },
+            "indexes": indexes,
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._get_path(model_id)
+        feather.write_feather(
+            table,
+            f"{path}.tmp",
+            compression="uncompressed",
+            chunksize=max(len(df), 1),
+        )
+        os.replace(f"{path}.tmp", path)
+        with CacheLock(self.directory):
+            catalog = self._read_catalog()
+            catalog[model_id] = entry
+            self._write_catalog(catalog)
+        logger.info(f"Saved model {model_id} with {len(df)} rows")
+        return entry
+
+    def exists(self, model_id: str) -> bool:
+        """Check whether the file of a saved scenario is still there."""
+        return os.path.exists(self._get_path(model_id))
+
+    def delete(self, model_id: str) -> None:
+        """
+        Delete a saved scenario, the processes that opened it keep their
+        mapping of its file.
+
+        Raises:
+        - EmptyDataError: If the scenario is not found.
+        """
+
+        with CacheLock(self.directory):
+            catalog = self._read_catalog()
+            if catalog.pop(model_id, None) is None:
+                raise EmptyDataError(f"Saved model {model_id} not found")
+            self._write_catalog(catalog)
+            os.remove(self._get_path(model_id))
+        logger.info(f"Deleted saved model {model_id}")
+
+    def open(self, model_id: str) -> SavedModelSnapshot:
+        """
+        Open a saved scenario, attaching its data and index to the
+        memory-mapped file without copies.
+
+        Raises:
+        - EmptyDataError: If the scenario is not found or unreadable.
+        """
+
+        entry = self.get(model_id)
+        try:
+            table = feather.read_table(
+                self._get_path(model_id), memory_map=True
+            )
+        except (OSError, pa.ArrowException) as e:
+            logger.error(f"Error opening saved model {model_id}: {e}")
+            raise EmptyDataError(f"Saved model {model_id} not found")
+
+        is_index = [
+            column.startswith((CODES_PREFIX, ORDER_PREFIX))
+            for column in table.column_names
+        ]
+        frame = table.select(
+            [
+                column
+                for column, index_column in zip(table.column_names, is_index)
+                if not index_column
+            ]
+        ).to_pandas(split_blocks=True)
+        index = PredicateIndex.from_arrays(
+            len(frame),
+            {
+                column: table.column(column).to_numpy()
+                for column, index_column in zip(table.column_names, is_index)
+                if index_column
+            },
+            entry["indexes"],
+        )
+        dates = None
+        if "date" in frame.columns:
+            dates = DateIndex.from_arrays(
+                frame["date"].to_numpy(),
+                (
+                    table.column(f"{ORDER_PREFIX}date").to_numpy()
+                    if f"{ORDER_PREFIX}date" in table.column_names
+                    else None
+                ),
+            )
+        return SavedModelSnapshot(
+            entry,
+            frame,
+            index,
+            dates,
+        )
+
+
+class SavedModelCache:
+    """
+    LRU cache of the saved scenarios opened by the process.
+
+    A scenario may be deleted by another process, so the file of a cached
+    scenario is checked on every hit and the scenario discarded when it
+    is gone.
+    """
+
+    def __init__(self, store: SavedModelStore, max_entries: int):
+        self.store = store
+        self.max_entries = max_entries
+        self._snapshots: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, model_id: str) -> SavedModelSnapshot:
+        """
+        Get a saved scenario, opening it on a miss.
+
+        Raises:
+        - EmptyDataError: If the scenario is not found.
+        """
+
+        with self._lock:
+            snapshot = self._snapshots.get(model_id)
+        if snapshot is not None:
+            if self.store.exists(model_id):
+                with self._lock:
+                    if model_id in self._snapshots:
+                        self._snapshots.move_to_end(model_id)
+                return snapshot
+            logger.info(f"Saved model {model_id} was deleted, discarding it")
+            self.discard(model_id)
+            raise EmptyDataError(f"Saved model {model_id} not found")
+        snapshot = self.store.open(model_id)
+        with self._lock:
+            self._snapshots[model_id] = snapshot
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def discard(self, model_id: str) -> None:
+        with self._lock:
+            self._snapshots.pop(model_id, None)
+
+
+_saved_model_cache: Optional[SavedModelCache] = None
+
+
+def get_saved_model_cache() -> SavedModelCache:
+    global _saved_model_cache
+    if _saved_model_cache is None:
+        _saved_model_cache = SavedModelCache(
+            SavedModelStore(),
+            int(
+                getenv(
+                    "SAVED_MODEL_CACHE_SIZE", DEFAULT_SAVED_MODEL_CACHE_SIZE
+                )
+            ),
+        )
+    return _saved_model_cache
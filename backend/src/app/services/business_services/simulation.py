@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import SimulationParams
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.performance_metrics import (
+    get_history_df,
+    run_compute_timed,
+)
+from backend.src.app.services.business_services.remodel import (
+    LANE_TYPES,
+    QueueModel,
+)
+from backend.src.app.services.business_services.utils import get_enum_values
+from backend.src.app.services.executor import get_max_workers
+from backend.src.app.services.instrumentation import stage
+
+
+logger = logging.getLogger(__name__)
+
+# Lane types served from one shared line: the bullpen kiosks, and the
+# reversible lanes whose customers switch to the first lane to free up
+POOLED_LANE_TYPES = [
+    LaneType.SCO_BULLPEN,
+    LaneType.REVERSIBLE_MCO_TRADITIONAL_EXPRESS,
+]
+# Longest line a customer tells apart when picking the shortest one
+LINE_CAPACITY = 16
+# Share of the first customers of a replication left out as warm-up
+WARM_UP_SHARE = 0.1
+
+
+def simulate_pooled(
+    arrivals: np.ndarray, services: np.ndarray, lanes: np.ndarray
+) -> np.ndarray:
+    """
+    Simulate lanes served from one shared first-come first-served line.
+
+    Every row is a replication, simulated together one customer at a
+    time: the next customer is served by the lane freeing up first.
+
+    Parameters:
+    - arrivals (np.ndarray): The arrival times, one row per replication.
+    - services (np.ndarray): The service times, shaped as the arrivals.
+    - lanes (np.ndarray): The lanes open in every replication.
+
+    Returns:
+    - np.ndarray: The wait time of every customer.
+    """
+
+    num_rows, num_customers = arrivals.shape
+    rows = np.arange(num_rows)
+    free_at = np.where(
+        np.arange(lanes.max())[None, :] < lanes[:, None], 0.0, np.inf
+    )
+    waits = np.empty(arrivals.shape)
+    for customer in range(num_customers):
+        arrival = arrivals[:, customer]
+        lane = free_at.argmin(axis=1)
+        start = np.maximum(arrival, free_at[rows, lane])
+        waits[:, customer] = start - arrival
+        free_at[rows, lane] = start + services[:, customer]
+    return waits
+
+
+def simulate_dedicated(
+    arrivals: np.ndarray, services: np.ndarray, lanes: np.ndarray
+) -> np.ndarray:
+    """
+    Simulate lanes with a line each, customers joining the shortest line
+    on arrival and staying in it.
+
+    The customers in a line are counted from the departure times of the
+    last ``LINE_CAPACITY`` customers of the lane.
+
+    Parameters:
+    - arrivals (np.ndarray): The arrival times, one row per replication.
+    - services (np.ndarray): The service times, shaped as the arrivals.
+    - lanes (np.ndarray): The lanes open in every replication.
+
+    Returns:
+    - np.ndarray: The wait time of every customer.
+    """
+
+    num_rows, num_customers = arrivals.shape
+    max_lanes = lanes.max()
+    rows = np.arange(num_rows)
+    # Closed lanes always look full
+    closed = np.where(
+        np.arange(max_lanes)[None, :] < lanes[:, None], 0, LINE_CAPACITY + 1
+    )
+    departures = np.zeros((num_rows, max_lanes, LINE_CAPACITY))
+    last_departure = np.zeros((num_rows, max_lanes))
+    served = np.zeros((num_rows, max_lanes), dtype=np.int64)
+    waits = np.empty(arrivals.shape)
+    for customer in range(num_customers):
+        arrival = arrivals[:, customer]
+        line_length = (departures > arrival[:, None, None]).sum(axis=2)
+        lane = (line_length + closed).argmin(axis=1)
+        start = np.maximum(arrival, last_departure[rows, lane])
+        waits[:, customer] = start - arrival
+        departure = start + services[:, customer]
+        last_departure[rows, lane] = departure
+        departures[rows, lane, served[rows, lane] % LINE_CAPACITY] = departure
+        served[rows, lane] += 1
+    return waits
+
+
+def draw_customers(
+    arrival_rate: np.ndarray,
+    service_rate: np.ndarray,
+    seeds: List[np.random.SeedSequence],
+    replications: int,
+    customers: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw the exponential inter-arrival and service times of the
+    replications of every queue, from the random stream of the queue.
+
+    Returns:
+    - tuple: The arrival and service times, one row per replication of
+        every queue, grouped by queue.
+    """
+
+    arrivals = np.empty((len(seeds) * replications, customers))
+    services = np.empty(arrivals.shape)
+    for position, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        block = slice(position * replications, (position + 1) * replications)
+        arrivals[block] = np.cumsum(
+            rng.exponential(
+                1 / arrival_rate[position], (replications, customers)
+            ),
+            axis=1,
+        )
+        services[block] = rng.exponential(
+            1 / service_rate[position], (replications, customers)
+        )
+    return arrivals, services
+
+
+def simulate_queues(
+    arrival_rate: np.ndarray,
+    service_rate: np.ndarray,
+    lanes: np.ndarray,
+    pooled: np.ndarray,
+    seeds: List[np.random.SeedSequence],
+    replications: int,
+    customers: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate the replications of several queues and average their wait
+    times after the warm-up.
+
+    Parameters:
+    - arrival_rate (np.ndarray): The arrival rate of every queue, > 0.
+    - service_rate (np.ndarray): The service rate of a lane of every
+        queue.
+    - lanes (np.ndarray): The lanes open in every queue.
+    - pooled (np.ndarray): Whether every queue has one shared line.
+    - seeds (List[np.random.SeedSequence]): The random stream of every
+        queue.
+    - replications (int): The number of replications of every queue.
+    - customers (int): The number of customers of a replication.
+
+    Returns:
+    - tuple: The mean wait time of every queue and its standard error
+        over the replications.
+    """
+
+    arrivals, services = draw_customers(
+        arrival_rate, service_rate, seeds, replications, customers
+    )
+    row_lanes = np.repeat(lanes, replications)
+    row_pooled = np.repeat(pooled, replications)
+    warm_up = int(customers * WARM_UP_SHARE)
+    replication_waits = np.empty(len(row_lanes))
+    for simulate, selected in (
+        (simulate_pooled, row_pooled),
+        (simulate_dedicated, ~row_pooled),
+    ):
+        if selected.any():
+            waits = simulate(
+                arrivals[selected], services[selected], row_lanes[selected]
+            )
+            replication_waits[selected] = waits[:, warm_up:].mean(axis=1)
+
+    replication_waits = replication_waits.reshape(-1, replications)
+    standard_error = (
+        replication_waits.std(axis=1, ddof=1) / np.sqrt(replications)
+        if replications > 1
+        else np.full(len(replication_waits), np.nan)
+    )
+    return replication_waits.mean(axis=1), standard_error
+
+
+def simulate_store_queues(
+    params: SimulationParams, stores: List[int]
+) -> pd.DataFrame:
+    """
+    Simulate the queues of every hour and lane type of some stores.
+
+    This is the CPU bound part of ``simulate``, it runs on the compute
+    executor for a share of the stores. The arrival and service rates are
+    those of the ``QueueModel`` of the stores, and every queue draws from
+    its own random stream, derived from the seed and the queue, so the
+    results do not depend on how the stores are shared out.
+
+    Parameters:
+    - params (SimulationParams): The simulation parameters.
+    - stores (List[int]): The stores to simulate.
+
+    Returns:
+    - pd.DataFrame: The simulated and modeled wait time and number of
+        customers waiting and the lanes and baseline lanes of every store,
+        hour and lane type.
+    """
+
+    kpi_data = get_history_df()
+    predicates = {"store_name": stores}
+    if params.lane_types:
+        predicates["type_of_checkout"] = get_enum_values(params.lane_types)
+    rows = kpi_data.index.select(predicates)
+    frame = kpi_data.frame if rows is None else kpi_data.frame.take(rows)
+    if frame.empty:
+        return pd.DataFrame()
+
+    model = QueueModel(frame)
+    lanes = model.get_lanes(params.lane_counts or {})
+    model_wait_time, _ = model.evaluate(lanes)
+    pooled = np.isin(
+        model.lane_type_codes,
+        [LANE_TYPES.index(lane_type) for lane_type in POOLED_LANE_TYPES],
+    )
+
+    # Queues without observed arrivals have no wait to simulate
+    simulated = model.arrival_rate > 0
+    seeds = [
+        np.random.SeedSequence(
+            params.seed, spawn_key=(int(store), int(hour), int(lane_type))
+        )
+        for store, hour, lane_type in zip(
+            model.queues["store_name"][simulated],
+            model.queues["hour"][simulated],
+            model.lane_type_codes[simulated],
+        )
+    ]
+    wait_time = np.zeros(len(model))
+    standard_error = np.zeros(len(model))
+    wait_time[simulated], standard_error[simulated] = simulate_queues(
+        model.arrival_rate[simulated],
+        model.service_rate[simulated],
+        lanes[simulated],
+        pooled[simulated],
+        seeds,
+        params.replications,
+        params.customers,
+    )
+
+    result = model.queues.copy()
+    result["lanes"] = lanes
+    result["baseline_lanes"] = model.baseline_lanes
+    result["avg_waiting_time_Tq"] = wait_time
+    # Little's law
+    result["avg_num_wait_queue_Nq"] = model.arrival_rate * wait_time
+    result["avg_waiting_time_Tq_stderr"] = standard_error
+    result["model_waiting_time_Tq"] = model_wait_time
+    result["simulated_customers"] = np.where(
+        simulated, params.replications * params.customers, 0
+    )
+    return result
+
+
+async def simulate(
+    params: SimulationParams,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Process a simulation request.
+
+    The stores are independent, they are split into as many shares as
+    compute workers and simulated concurrently on the compute executor.
+
+    Parameters:
+    - params (SimulationParams): The simulation parameters.
+
+    Returns:
+    - dict: The queues frame, with the simulated wait times, and the
+        throughput frame, with the customers simulated per second.
+
+    Raises:
+    - EmptyDataError: If no data is found for the stores.
+    """
+
+    get_history_df()
+    stores = sorted(set(params.store))
+    shares = [
+        share.tolist()
+        for share in np.array_split(
+            stores, min(len(stores), get_max_workers())
+        )
+    ]
+    start = time.perf_counter()
+    with stage("compute"):
+        results = await asyncio.gather(
+            *(
+                run_compute_timed(simulate_store_queues, params, share)
+                for share in shares
+            )
+        )
+    seconds = time.perf_counter() - start
+    results = [result for result in results if not result.empty]
+    if not results:
+        raise EmptyDataError("No data found for the given stores")
+
+    queues = pd.concat(results, ignore_index=True)
+    customers = int(queues["simulated_customers"].sum())
+    logger.info(
+        f"Simulated {customers} customers in {seconds:.3f}s, "
+        f"{customers / seconds:.0f} customers/s"
+    )
+    throughput = pd.DataFrame(
+        {
+            "customers": [customers],
+            "seconds": [seconds],
+            "customers_per_second": [customers / seconds],
+        }
+    )
+    return {"queues": queues, "throughput": throughput}
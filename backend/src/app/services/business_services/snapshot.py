@@ -0,0 +1,365 @@
+from datetime import datetime, timezone
+import logging
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.services.business_services.aggregates import (
+    AggregateCube,
+)
+from backend.src.app.services.business_services.filters import FILTER_COLUMNS
+from backend.src.app.services.business_services.growable import GrowableFrame
+from backend.src.app.services.business_services.indexes import (
+    DateIndex,
+    PredicateIndex,
+    join_index_columns,
+    split_index_columns,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    assign_shoppers_bucket,
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.rollups import TimeRollups
+from backend.src.app.services.business_services.sampling import (
+    STRATA_COLUMNS,
+    StratifiedSample,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Name of the frame of the data among the frames of a saved snapshot
+DATA_FRAME_NAME = "data"
+
+# Low cardinality text columns that are stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "store_name",
+    "type_of_checkout",
+    "weekday_name",
+    "Wait_Time_BKT",
+    "event",
+]
+
+
+def prepare_kpi_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type a raw kpi DataFrame, materialize the derived columns and sort the
+    rows by date.
+
+    The columns are converted in place so that the raw frame read from
+    storage is not held twice while the snapshot is built, only sorting
+    copies the rows. Columns that are already typed or derived and rows
+    already sorted are kept as they are, so a frame attached to the
+    published cache is prepared without copying it.
+
+    Parameters:
+    - df (pd.DataFrame): The raw kpi data as read from storage.
+
+    Returns:
+    - pd.DataFrame: The typed kpi data.
+    """
+
+    if "date" in df.columns:
+        if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+            df["date"] = pd.to_datetime(df["date"])
+        if "month" not in df.columns:
+            month = df["date"].dt.month
+            # Rows without a date have no month
+            df["month"] = month if month.hasnans else month.astype(np.int8)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(
+            df[column].dtype, pd.CategoricalDtype
+        ):
+            df[column] = df[column].astype("category")
+    if (
+        "avg_num_wait_queue_Nq" in df.columns
+        and "Shoppers_BKT" not in df.columns
+    ):
+        df["Shoppers_BKT"] = assign_shoppers_bucket(
+            df["avg_num_wait_queue_Nq"]
+        )
+    if "date" in df.columns and not DateIndex(df["date"]).is_sorted:
+        # The rows without a date sort last
+        order = np.argsort(df["date"].to_numpy(), kind="stable")
+        df = df.take(order).reset_index(drop=True)
+    return df
+
+
+def get_prefixed_frames(
+    frames: Dict[str, pd.DataFrame], prefix: str
+) -> Dict[str, pd.DataFrame]:
+    """Get the frames named ``<prefix>.<name>`` by name."""
+    return {
+        name[len(prefix) + 1 :]: frame
+        for name, frame in frames.items()
+        if name.startswith(f"{prefix}.")
+    }
+
+
+class DataSnapshot:
+    """
+    Read-only, pre-typed kpi data built once at load time.
+
+    Requests work on the snapshot frame directly instead of on a copy of it,
+    so nothing on the request path may modify ``frame`` in place.
+    The filter columns are indexed up front, see ``PredicateIndex``, and
+    the metric means are pre-aggregated, see ``AggregateCube``. The rows
+    are sorted by date, so a range of dates is a slice of the frame, see
+    ``DateIndex``, and the queue columns are rolled up per day, week and
+    month for the trends, see ``TimeRollups``. The approximate metrics are
+    estimated from a sample of the rows, see ``StratifiedSample``.
+    Rows appended later are merged in with the cost of the appended rows,
+    see ``append``. A saved snapshot is attached again with all its
+    structures, without building any of them, see ``from_frames``.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: Optional[str] = None):
+        self._version = version or uuid4().hex
+        self._base_version = self._version
+        self._deltas: Tuple[str, ...] = ()
+        self._columns: Optional[GrowableFrame] = None
+        self._created_at = datetime.now(timezone.utc)
+        self._frame = prepare_kpi_frame(df)
+        self._index = PredicateIndex(self._frame, FILTER_COLUMNS)
+        self._cube = AggregateCube(
+            self._frame, FILTER_COLUMNS, wait_time_metrics.values()
+        )
+        if "date" in self._frame.columns:
+            self._dates = DateIndex(self._frame["date"])
+            self._rollups = TimeRollups(self._frame, FILTER_COLUMNS)
+        else:
+            self._dates = self._rollups = None
+        self._sample = (
+            StratifiedSample(self._frame)
+            if all(column in self._frame.columns for column in STRATA_COLUMNS)
+            else None
+        )
+        memory_usage = self.memory_usage
+        logger.info(
+            f"Data snapshot {self._version} built with "
+            f"{len(self._frame)} rows in "
+            f"{sum(memory_usage.values()) / 2**20:.1f} MiB: "
+            + ", ".join(
+                f"{column} {size / 2**20:.1f} MiB"
+                for column, size in memory_usage.items()
+            )
+        )
+
+    @classmethod
+    def from_frames(
+        cls, frames: Dict[str, pd.DataFrame], meta: Dict
+    ) -> "DataSnapshot":
+        """
+        Attach a snapshot to the frames saved by ``to_frames``, as loaded
+        from a memory-mapped cache.
+
+        The frame, the predicate index, the cells of the cube and the
+        rollups are attached to the saved arrays without copies and no row
+        is sorted, aggregated nor sampled again, so the processes attached
+        to the same cache share all of them. Only the sampled rows are
+        gathered, the sample size depends on the number of strata only.
+
+        Parameters:
+        - frames (Dict[str, pd.DataFrame]): The saved frames by name.
+        - meta (Dict): The description of the snapshot.
+
+        Returns:
+        - DataSnapshot: The snapshot.
+        """
+
+        frame, arrays = split_index_columns(frames[DATA_FRAME_NAME])
+        snapshot = cls.__new__(cls)
+        snapshot._version = meta["version"]
+        snapshot._base_version = meta["base_version"]
+        snapshot._deltas = tuple(meta["deltas"])
+        snapshot._columns = None
+        snapshot._created_at = datetime.now(timezone.utc)
+        snapshot._frame = frame
+        snapshot._index = PredicateIndex.from_arrays(
+            len(frame), arrays, meta["index"]
+        )
+        snapshot._cube = AggregateCube.from_frames(
+            get_prefixed_frames(frames, "cube"), meta["cube"]
+        )
+        snapshot._dates = (
+            DateIndex(frame["date"]) if "date" in frame.columns else None
+        )
+        snapshot._rollups = (
+            TimeRollups.from_frames(
+                get_prefixed_frames(frames, "rollups"), meta["rollups"]
+            )
+            if "rollups" in meta
+            else None
+        )
+        snapshot._sample = (
+            StratifiedSample.from_frame(
+                frame, frames["sample"], meta["sample"]
+            )
+            if "sample" in meta
+            else None
+        )
+        logger.info(
+            f"Data snapshot {snapshot._version} attached with "
+            f"{len(frame)} rows"
+        )
+        return snapshot
+
+    def to_frames(self) -> Tuple[Dict[str, pd.DataFrame], Dict]:
+        """
+        Get the frames to save the snapshot, see ``from_frames``: the
+        frame with the arrays of its predicate index as extra columns, the
+        cells of the cube and the rollups with theirs and the sampled rows,
+        and the description of the snapshot.
+        """
+
+        arrays, index = self._index.get_arrays()
+        frames = {DATA_FRAME_NAME: join_index_columns(self._frame, arrays)}
+        meta = {
+            "version": self._version,
+            "base_version": self._base_version,
+            "deltas": list(self._deltas),
+            "index": index,
+        }
+        cube_frames, meta["cube"] = self._cube.to_frames()
+        frames.update(
+            (f"cube.{name}", cube_frame)
+            for name, cube_frame in cube_frames.items()
+        )
+        if self._rollups is not None:
+            rollup_frames, meta["rollups"] = self._rollups.to_frames()
+            frames.update(
+                (f"rollups.{name}", rollup_frame)
+                for name, rollup_frame in rollup_frames.items()
+            )
+        if self._sample is not None:
+            frames["sample"], meta["sample"] = self._sample.to_frame()
+        return frames, meta
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @property
+    def base_version(self) -> str:
+        """The version of the data the appended rows were merged into."""
+        return self._base_version
+
+    @property
+    def deltas(self) -> Tuple[str, ...]:
+        """The names of the appended deltas, in order."""
+        return self._deltas
+
+    @property
+    def created_at(self) -> datetime:
+        return self._created_at
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._frame
+
+    @property
+    def index(self) -> PredicateIndex:
+        return self._index
+
+    @property
+    def cube(self) -> AggregateCube:
+        return self._cube
+
+    @property
+    def dates(self) -> Optional[DateIndex]:
+        return self._dates
+
+    @property
+    def rollups(self) -> Optional[TimeRollups]:
+        return self._rollups
+
+    @property
+    def sample(self) -> Optional[StratifiedSample]:
+        return self._sample
+
+    @property
+    def memory_usage(self) -> Dict[str, int]:
+        """The bytes held by every column of the frame."""
+        return {
+            column: int(size)
+            for column, size in self._frame.memory_usage(
+                index=False, deep=True
+            ).items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def append(self, df: pd.DataFrame, name: str) -> "DataSnapshot":
+        """
+        Build the snapshot of the data with the rows of a delta appended,
+        keeping this snapshot unchanged for the requests holding it.
+
+        The rows dated on or after the last day of the data are merged
+        from the delta alone: the columns, the predicate and date
+        indexes, the cube, the rollups and the sample grow in place, see
+        ``GrowableFrame``, so the cost is proportional to the delta and
+        not to the history. Other rows break the date order, the
+        snapshot is then rebuilt from all the rows.
+
+        Parameters:
+        - df (pd.DataFrame): The raw rows of the delta.
+        - name (str): The name of the delta.
+
+        Returns:
+        - DataSnapshot: The snapshot with the rows appended.
+        """
+
+        delta = prepare_kpi_frame(df)
+        version = f"{self._base_version}+{len(self._deltas) + 1}"
+        start = len(self._frame)
+        try:
+            if self._dates is not None and self._dates.num_dated < start:
+                raise ValueError("The data has rows without a date")
+            if self._columns is None:
+                self._columns = GrowableFrame.wrap(self._frame)
+            columns = self._columns.append(delta[self._frame.columns])
+            frame = columns.frame
+            dates = (
+                None
+                if self._dates is None
+                else self._dates.extend(frame["date"], start)
+            )
+            index = self._index.extend(frame, start)
+            cube = self._cube.extend(delta)
+            rollups = (
+                None if self._rollups is None else self._rollups.extend(delta)
+            )
+            sample = (
+                None
+                if self._sample is None
+                else self._sample.extend(frame, start)
+            )
+        except (KeyError, ValueError) as e:
+            logger.warning(
+                f"Rebuilding data snapshot {version}, the rows of delta "
+                f"{name} cannot be appended: {e}"
+            )
+            snapshot = DataSnapshot(
+                pd.concat([self._frame, delta], ignore_index=True), version
+            )
+        else:
+            snapshot = DataSnapshot.__new__(DataSnapshot)
+            snapshot._version = version
+            snapshot._created_at = datetime.now(timezone.utc)
+            snapshot._columns = columns
+            snapshot._frame = frame
+            snapshot._index = index
+            snapshot._cube = cube
+            snapshot._dates = dates
+            snapshot._rollups = rollups
+            snapshot._sample = sample
+            logger.info(
+                f"Data snapshot {version} built by appending {len(delta)} "
+                f"rows of delta {name}"
+            )
+        snapshot._base_version = self._base_version
+        snapshot._deltas = self._deltas + (name,)
+        return snapshot
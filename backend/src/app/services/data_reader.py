@@ -1,14 +1,238 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import io
+from os import getenv
+import queue
+from typing import (
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import logging
 
 from backend.src.app.clients.storage.base import StorageClient
+from backend.src.app.services.business_services.columns import (
+    downcast_columns,
+    get_required_columns,
+)
+from backend.src.app.services.business_services.snapshot import (
+    DataSnapshot,
+)
+from backend.src.app.services.snapshot_cache import (
+    CacheLock,
+    load_cached_snapshot,
+    save_cached_delta,
+    save_cached_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
+# Explicit types of the historical data columns, text dimensions are
+# parsed straight into categoricals
+HISTORICAL_DATA_DTYPES = {
+    "new_clusters": "int64",
+    "store_name": "int64",
+    "type_of_checkout": "category",
+    "peak_hour": "int64",
+    "Covid_Effect": "int64",
+    "event": "category",
+    "hour": "int64",
+    "weekday_name": "category",
+    "Wait_Time_BKT": "category",
+    "avg_waiting_time_Tq": "float64",
+    "avg_num_wait_queue_Nq": "float64",
+}
+HISTORICAL_DATA_DATE_COLUMNS = ["date"]
+DEFAULT_CSV_CHUNK_ROWS = 200_000
+DEFAULT_STREAM_BUFFER_CHUNKS = 8
+
+# Marks the end of a byte stream, or its failure, in the stream queue
+_END_OF_STREAM = object()
+_STREAM_FAILED = object()
+
+
+class ColumnarFrameBuilder:
+    """
+    Build a DataFrame from parsed chunks column by column.
+
+    The chunks are kept as per column arrays and every column is
+    concatenated and released in turn, so building the frame needs about
+    the final frame size plus one column.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, List] = defaultdict(list)
+        self.num_rows = 0
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        for column in chunk.columns:
+            self._columns[column].append(chunk[column].array)
+        self.num_rows += len(chunk)
+
+    def build(self) -> pd.DataFrame:
+        df = pd.DataFrame(index=pd.RangeIndex(self.num_rows))
+        for column in list(self._columns):
+            parts = self._columns.pop(column)
+            if isinstance(parts[0], pd.Categorical):
+                values = union_categoricals(parts)
+            else:
+                values = np.concatenate([np.asarray(part) for part in parts])
+            del parts
+            df[column] = values
+        return df
+
+
+class QueueReader(io.RawIOBase):
+    """Blocking file object reading the byte chunks put in a queue."""
+
+    def __init__(self, chunks: queue.Queue):
+        self._chunks = chunks
+        self._buffer = memoryview(b"")
+        self._finished = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buffer and not self._finished:
+            chunk = self._chunks.get()
+            if chunk is _STREAM_FAILED:
+                raise IOError("Byte stream failed")
+            if chunk is _END_OF_STREAM:
+                self._finished = True
+            else:
+                self._buffer = memoryview(chunk)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def get_csv_chunk_rows() -> int:
+    return int(getenv("CSV_CHUNK_ROWS", DEFAULT_CSV_CHUNK_ROWS))
+
+
+def parse_csv_chunks(
+    source: Union[str, io.IOBase],
+    dtype: Optional[Dict[str, str]] = None,
+    parse_dates: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Parse a csv chunk by chunk into a typed DataFrame.
+
+    Only the columns the filters and metrics read are parsed, see
+    ``get_required_columns``, and the numeric columns of every chunk are
+    narrowed to their storage types when their values fit, see
+    ``downcast_columns``. Chunks narrowed to different types are joined
+    in the wider one.
+
+    Parameters:
+    - source (str | io.IOBase): The path or binary file object of the csv.
+    - dtype (Dict[str, str]): The types of the known columns.
+    - parse_dates (List[str]): The date columns.
+    - columns (List[str]): The columns to parse, those missing from the
+        csv are skipped.
+
+    Returns:
+    - pd.DataFrame: The parsed data.
+    """
+
+    dtype = HISTORICAL_DATA_DTYPES if dtype is None else dtype
+    parse_dates = (
+        HISTORICAL_DATA_DATE_COLUMNS if parse_dates is None else parse_dates
+    )
+    columns = set(get_required_columns() if columns is None else columns)
+    builder = ColumnarFrameBuilder()
+    with pd.read_csv(
+        source,
+        encoding="utf-8",
+        chunksize=get_csv_chunk_rows(),
+        usecols=lambda column: column in columns,
+        dtype=dtype,
+        parse_dates=[column for column in parse_dates if column in columns],
+    ) as reader:
+        for chunk in reader:
+            builder.append(downcast_columns(chunk))
+    return builder.build()
+
+
+async def read_csv_stream(
+    chunks: AsyncIterator[bytes],
+    dtype: Optional[Dict[str, str]] = None,
+    parse_dates: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Parse a csv streamed as byte chunks into a typed DataFrame.
+
+    The chunks are parsed in a worker thread while they are downloaded,
+    at most ``STREAM_BUFFER_CHUNKS`` chunks wait in memory for the parser.
+
+    Parameters:
+    - chunks (AsyncIterator[bytes]): The byte chunks of the csv.
+    - dtype (Dict[str, str]): The types of the known columns.
+    - parse_dates (List[str]): The date columns.
+    - columns (List[str]): The columns to parse, see ``parse_csv_chunks``.
+
+    Returns:
+    - pd.DataFrame: The parsed data.
+    """
+
+    stream = queue.Queue(
+        maxsize=int(
+            getenv("STREAM_BUFFER_CHUNKS", DEFAULT_STREAM_BUFFER_CHUNKS)
+        )
+    )
+    loop = asyncio.get_running_loop()
+    parsing = loop.run_in_executor(
+        None,
+        parse_csv_chunks,
+        io.BufferedReader(QueueReader(stream)),
+        dtype,
+        parse_dates,
+        columns,
+    )
+
+    def put(item) -> None:
+        # Wait for room in the queue, unless the parser already stopped
+        while not parsing.done():
+            try:
+                stream.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    async def feed(item) -> None:
+        try:
+            stream.put_nowait(item)
+        except queue.Full:
+            await loop.run_in_executor(None, put, item)
+
+    try:
+        async for chunk in chunks:
+            await feed(chunk)
+            if parsing.done():
+                break
+    except BaseException:
+        await feed(_STREAM_FAILED)
+        raise
+    await feed(_END_OF_STREAM)
+    return await parsing
+
 
 def read_csv(path: str) -> pd.DataFrame:
     try:
-        df = pd.read_csv(path)
+        df = parse_csv_chunks(path)
         logger.info(f"successfully read  data from {path}")
         return df
 
@@ -17,12 +241,139 @@ def read_csv(path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+@asynccontextmanager
+async def hold_cache_lock(shared: bool = False) -> AsyncIterator[None]:
+    """Hold the lock of the cache, waiting for it off the event loop."""
+    lock = CacheLock(shared=shared)
+    await asyncio.to_thread(lock.acquire)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
 async def read_historical_data_from_cloud(
     client: StorageClient,
+    deltas: Sequence[str] = (),
+    current: Optional[DataSnapshot] = None,
+) -> Tuple[Optional[DataSnapshot], Optional[str]]:
+    """
+    Read the historical data snapshot and its version from the storage,
+    with the given deltas appended.
+
+    The snapshot is published to the local cache with its version and its
+    deltas, when they did not change the cache is memory-mapped instead
+    of downloading, parsing and indexing the csv again. The worker
+    processes of a node share the cache: one of them loads the data, or
+    starts from the cached or current snapshot holding the most of the
+    deltas, and appends the deltas missing while the others wait for it.
+    Only the rows of the deltas appended are added to the cache, and
+    every worker appends them to its own copy of the data. Once the
+    cached deltas grow large, the merged snapshot is published again,
+    see ``save_cached_delta``: then all of them attach to the same
+    read-only copy of the data and of its indexes and aggregates, see
+    ``load_cached_snapshot``, and the private copies made by appending
+    are released. The cache is only read and written under its lock, the
+    readers share it and the worker publishing holds it alone, see
+    ``CacheLock``.
+
+    A delta that cannot be read or appended ends the appending, the
+    snapshot holding the deltas before it is published.
+
+    Parameters:
+    - client (StorageClient): The initialized storage client.
+    - deltas (Sequence[str]): The names of the deltas of the data, in
+        order.
+    - current (DataSnapshot): The snapshot held by the process, if any.
+
+    Returns:
+    - tuple: The historical data snapshot and its version, None and None
+        when the data could not be read.
+    """
+
+    try:
+        version = await client.get_historical_data_version()
+        deltas = tuple(deltas)
+        if current is not None and (
+            current.base_version != version
+            or current.deltas != deltas[: len(current.deltas)]
+        ):
+            current = None
+        # Attach to the cache along with the other readers
+        async with hold_cache_lock(shared=True):
+            snapshot = await asyncio.to_thread(
+                load_cached_snapshot, version, deltas=deltas
+            )
+        if snapshot is not None and snapshot.deltas == deltas:
+            return snapshot, version
+
+        async with hold_cache_lock():
+            snapshot = cached = await asyncio.to_thread(
+                load_cached_snapshot, version, deltas=deltas
+            )
+            if snapshot is not None and snapshot.deltas == deltas:
+                return snapshot, version
+            if current is not None and (
+                snapshot is None or len(current.deltas) > len(snapshot.deltas)
+            ):
+                snapshot = current
+
+            if snapshot is None:
+                # Stream the data into the csv parser
+                df = await read_csv_stream(
+                    client.stream_historical_data(version)
+                )
+                logger.info("successfully read historical data from the cloud")
+                if df.empty:
+                    logger.error("The historical data is empty")
+                    return None, None
+                snapshot = await asyncio.to_thread(DataSnapshot, df, version)
+                del df
+            # While the cache holds the snapshot, only the rows of the
+            # deltas appended to it are published
+            published = snapshot is cached
+            try:
+                for name in deltas[len(snapshot.deltas) :]:
+                    df = await read_historical_delta(client, name)
+                    snapshot = await asyncio.to_thread(
+                        snapshot.append, df, name
+                    )
+                    if published:
+                        published = await asyncio.to_thread(
+                            save_cached_delta, snapshot, df
+                        )
+            except Exception as e:
+                logger.error(f"Error appending historical data deltas: {e}")
+            if published:
+                return snapshot, version
+            await asyncio.to_thread(save_cached_snapshot, snapshot)
+
+            # Attach to the published copy and release the built one,
+            # before another worker publishes a newer one
+            cached = await asyncio.to_thread(
+                load_cached_snapshot, version, deltas=snapshot.deltas
+            )
+        if cached is None or cached.deltas != snapshot.deltas:
+            return snapshot, version
+        return cached, version
+    except Exception as e:
+        logger.error(f"Error reading historical data from the cloud: {e}")
+        return None, None
+
+
+async def read_historical_delta(
+    client: StorageClient, name: str
 ) -> pd.DataFrame:
-    # Initialize the client
-    await client.initialize_client()
+    """
+    Read the rows of a delta of the historical data from the storage.
+
+    Parameters:
+    - client (StorageClient): The initialized storage client.
+    - name (str): The name of the delta.
+
+    Returns:
+    - pd.DataFrame: The parsed rows of the delta.
+    """
 
-    # Read data
-    df = await client.read_historical_data()
-    return df
+    data = await client.read_historical_delta(name)
+    return await asyncio.to_thread(parse_csv_chunks, io.BytesIO(data))
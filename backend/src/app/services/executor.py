@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+import logging
+import multiprocessing
+from os import cpu_count, getenv
+from typing import Any, Callable, Optional
+
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.services.business_services.errors import ServiceBusyError
+
+
+logger = logging.getLogger(__name__)
+
+THREAD_EXECUTOR = "thread"
+PROCESS_EXECUTOR = "process"
+DEFAULT_QUEUE_DEPTH = 64
+
+_executor: Optional[Executor] = None
+_pending_tasks = 0
+
+
+def get_max_workers() -> int:
+    return int(getenv("COMPUTE_MAX_WORKERS", cpu_count() or 1))
+
+
+def get_queue_depth() -> int:
+    return int(getenv("COMPUTE_QUEUE_DEPTH", DEFAULT_QUEUE_DEPTH))
+
+
+def get_executor_kind() -> str:
+    return getenv("COMPUTE_EXECUTOR", THREAD_EXECUTOR).lower()
+
+
+def get_executor() -> Executor:
+    """
+    Get the executor running the CPU bound compute work, configured from
+    the environment.
+
+    A process pool is forked lazily, so the workers inherit the data
+    loaded before the first task is submitted.
+
+    Raises:
+    - ImproperlyConfigured: If the executor kind is unknown.
+    """
+
+    global _executor
+    if _executor is None:
+        kind = get_executor_kind()
+        max_workers = get_max_workers()
+        if kind == THREAD_EXECUTOR:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="compute"
+            )
+        elif kind == PROCESS_EXECUTOR:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+        else:
+            raise ImproperlyConfigured(f"Unknown compute executor: {kind}")
+        logger.info(
+            f"Compute executor started: {kind} pool, {max_workers} workers"
+        )
+    return _executor
+
+
+def reset_executor() -> None:
+    """
+    Replace the executor, so that process workers are forked again with
+    the current data. Tasks already submitted finish on the old executor.
+    """
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+async def run_compute(func: Callable, *args: Any) -> Any:
+    """
+    Run a CPU bound function on the compute executor without blocking the
+    event loop.
+
+    Parameters:
+    - func (Callable): The function to run, it must be picklable when the
+        process executor is used.
+    - args: The arguments of the function.
+
+    Returns:
+    - Any: The result of the function.
+
+    Raises:
+    - ServiceBusyError: If the running and queued tasks exceed the
+        configured queue depth.
+    """
+
+    global _pending_tasks
+    if _pending_tasks >= get_max_workers() + get_queue_depth():
+        raise ServiceBusyError("Too many requests in progress, retry later")
+    _pending_tasks += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), func, *args)
+    finally:
+        _pending_tasks -= 1
@@ -0,0 +1,252 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+from os import getenv
+from threading import Lock
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DURATION_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Row count buckets
+ROW_BUCKETS = tuple(10**power for power in range(9))
+
+
+def is_server_timing_enabled() -> bool:
+    return getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+
+def is_metrics_enabled() -> bool:
+    return getenv("METRICS_ENABLED", "false").lower() == "true"
+
+
+class StageTimings:
+    """
+    Durations of the pipeline stages of a request, and the rows they read.
+
+    The timings are recorded by ``stage`` while they are the current
+    timings of the context, see ``record_timings``.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.rows_scanned: Dict[str, int] = {}
+        self.filtered_rows: List[int] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def add_rows(
+        self, source: str, scanned: int, filtered: Optional[int] = None
+    ) -> None:
+        self.rows_scanned[source] = self.rows_scanned.get(source, 0) + scanned
+        if filtered is not None:
+            self.filtered_rows.append(filtered)
+
+    def merge(self, other: "StageTimings") -> None:
+        for name, seconds in other.durations.items():
+            self.add(name, seconds)
+        for source, scanned in other.rows_scanned.items():
+            self.add_rows(source, scanned)
+        self.filtered_rows.extend(other.filtered_rows)
+
+    def get_header(self) -> str:
+        """Get the timings as a Server-Timing header value."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.3f}"
+            for name, seconds in self.durations.items()
+        )
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def get_current_timings() -> Optional[StageTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def record_timings(timings: StageTimings) -> Iterator[StageTimings]:
+    """Make the timings the current timings of the context."""
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage into the current timings, nothing is measured
+    when no timings are recorded.
+    """
+
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_rows(
+    source: str, scanned: int, filtered: Optional[int] = None
+) -> None:
+    """Count the rows read by a pipeline stage into the current timings."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_rows(source, scanned, filtered)
+
+
+def run_timed(
+    func: Callable, *args: Any
+) -> Tuple[Any, Optional[StageTimings]]:
+    """
+    Run a function with its own timings, so that the stages run on the
+    compute executor are sent back with the result.
+    """
+
+    with record_timings(StageTimings()) as timings:
+        return func(*args), timings
+
+
+class Histogram:
+    """Prometheus histogram with one label."""
+
+    def __init__(
+        self, name: str, description: str, label: str, buckets: Tuple
+    ):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = buckets
+        # Label value to bucket counts, sum and count
+        self._series: Dict[str, List] = {}
+        self._lock = Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.setdefault(
+                label_value, [[0] * len(self.buckets), 0.0, 0]
+            )
+            position = bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_value, (counts, total, count) in sorted(
+                self._series.items()
+            ):
+                labels = f'{self.label}="{label_value}"'
+                cumulative = 0
+                for bucket, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'{self.name}_bucket{{{labels},le="{bucket}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="+Inf"}} {count}'
+                )
+                lines.append(f"{self.name}_sum{{{labels}}} {total}")
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with one label."""
+
+    def __init__(self, name: str, description: str, label: str):
+        self.name = name
+        self.description = description
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def inc(self, label_value: str, value: float = 1) -> None:
+        with self._lock:
+            self._values[label_value] = (
+                self._values.get(label_value, 0) + value
+            )
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for label_value, value in sorted(self._values.items()):
+                lines.append(
+                    f'{self.name}{{{self.label}="{label_value}"}} {value}'
+                )
+        return lines
+
+
+stage_duration = Histogram(
+    "ppo_stage_duration_seconds",
+    "Duration of the request pipeline stages.",
+    "stage",
+    DURATION_BUCKETS,
+)
+rows_scanned = Counter(
+    "ppo_rows_scanned_total",
+    "Rows or pre-aggregated cells read to compute the metrics.",
+    "source",
+)
+filtered_rows = Histogram(
+    "ppo_filtered_rows",
+    "Number of rows left by the request filters.",
+    "source",
+    ROW_BUCKETS,
+)
+METRICS = [stage_duration, rows_scanned, filtered_rows]
+
+
+def observe_timings(timings: StageTimings) -> None:
+    """Aggregate the timings of a request into the metrics."""
+    for name, seconds in timings.durations.items():
+        stage_duration.observe(name, seconds)
+    for source, scanned in timings.rows_scanned.items():
+        rows_scanned.inc(source, scanned)
+    for count in timings.filtered_rows:
+        filtered_rows.observe("rows", count)
+
+
+def render_metrics() -> str:
+    """Render the metrics in the Prometheus text format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,287 @@
+import fcntl
+import json
+import logging
+import os
+from os import getenv
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from backend.src.app.services.business_services.snapshot import (
+    DATA_FRAME_NAME,
+    DataSnapshot,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "backend/data/cache"
+DATA_FILE_NAME = "historical_data.arrow"
+META_FILE_NAME = "historical_data.json"
+LOCK_FILE_NAME = "historical_data.lock"
+# Rows of the deltas appended to the cache, as a share of the rows of the
+# saved snapshot, above which the merged snapshot is saved again
+DEFAULT_CACHE_COMPACTION_SHARE = 0.25
+
+
+def get_cache_dir() -> str:
+    return getenv("HISTORICAL_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def get_compaction_share() -> float:
+    return float(
+        getenv(
+            "HISTORICAL_CACHE_COMPACTION_SHARE", DEFAULT_CACHE_COMPACTION_SHARE
+        )
+    )
+
+
+class CacheLock:
+    """
+    Lock of the cache directory.
+
+    The workers of a node share the cache directory, the exclusive lock
+    lets one of them load and publish a version while the others wait to
+    attach to it. The shared lock lets the readers attach to the cache
+    together, while no version is being published.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, shared: bool = False):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.shared = shared
+        self._lock_file = None
+
+    def acquire(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock_file = open(
+            os.path.join(self.cache_dir, LOCK_FILE_NAME), "a"
+        )
+        fcntl.flock(
+            self._lock_file, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        )
+
+    def release(self) -> None:
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def __enter__(self) -> "CacheLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def get_frame_path(cache_dir: str, name: str) -> str:
+    if name == DATA_FRAME_NAME:
+        return os.path.join(cache_dir, DATA_FILE_NAME)
+    return os.path.join(cache_dir, f"historical_data.{name}.arrow")
+
+
+def get_delta_path(cache_dir: str, position: int) -> str:
+    return os.path.join(cache_dir, f"historical_data.delta.{position}.arrow")
+
+
+def read_meta(cache_dir: str) -> Dict:
+    with open(os.path.join(cache_dir, META_FILE_NAME)) as meta_file:
+        return json.load(meta_file)
+
+
+def write_meta(cache_dir: str, meta: Dict) -> None:
+    meta_path = os.path.join(cache_dir, META_FILE_NAME)
+    with open(f"{meta_path}.tmp", "w") as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def load_cached_snapshot(
+    version: str,
+    cache_dir: Optional[str] = None,
+    deltas: Sequence[str] = (),
+) -> Optional[DataSnapshot]:
+    """
+    Load the cached historical data snapshot if it was saved for the given
+    version of the data, holding the first of the given deltas, if any.
+
+    The uncompressed Arrow files are memory-mapped and the snapshot is
+    attached to them without copies, see ``DataSnapshot.from_frames``:
+    the columns, the predicate index, the cube and the rollups are
+    read-only and every worker process of the node shares the same pages
+    of the files. The rows of the deltas cached since the snapshot was
+    saved are then appended to it, see ``save_cached_delta``. The caller
+    holds the ``CacheLock``, so no version is published while the files
+    are opened.
+
+    Parameters:
+    - version (str): The version of the data, without its deltas.
+    - cache_dir (str): The cache directory, HISTORICAL_CACHE_DIR by default.
+    - deltas (Sequence[str]): The names of the deltas of the version, in
+        order, the cached snapshot may hold any number of the first ones.
+
+    Returns:
+    - DataSnapshot: The cached snapshot, or None when there is no cached
+        snapshot for this version and these deltas.
+    """
+
+    cache_dir = cache_dir or get_cache_dir()
+    try:
+        meta = read_meta(cache_dir)
+        saved_deltas = meta["snapshot"]["deltas"]
+        appended = meta.get("appended", [])
+        cached_deltas = tuple(saved_deltas) + tuple(
+            delta["name"] for delta in appended
+        )
+        expected_deltas = tuple(deltas[: len(cached_deltas)])
+        if (
+            meta["snapshot"]["base_version"] != version
+            or cached_deltas != expected_deltas
+        ):
+            logger.info("Cached historical data is outdated")
+            return None
+        frames = {
+            name: feather.read_table(
+                get_frame_path(cache_dir, name), memory_map=True
+            ).to_pandas(split_blocks=True)
+            for name in meta["frames"]
+        }
+        snapshot = DataSnapshot.from_frames(frames, meta["snapshot"])
+        for position, delta in enumerate(appended, len(saved_deltas)):
+            df = feather.read_feather(get_delta_path(cache_dir, position))
+            snapshot = snapshot.append(df, delta["name"])
+        logger.info(
+            f"Loaded cached historical data for version {snapshot.version}"
+        )
+        return snapshot
+    except FileNotFoundError:
+        return None
+    except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+        logger.error(f"Error loading cached historical data: {e}")
+        return None
+
+
+def save_cached_snapshot(
+    snapshot: DataSnapshot, cache_dir: Optional[str] = None
+) -> None:
+    """
+    Save a historical data snapshot as uncompressed Arrow files tagged
+    with its version, see ``DataSnapshot.to_frames``. The files are
+    written aside and moved into place, so a reader never sees a partial
+    cache, and readers of a previous version keep their mapping of the
+    replaced files.
+
+    Every column is written as a single chunk, as chunked columns would be
+    concatenated into a copy when loaded.
+
+    Parameters:
+    - snapshot (DataSnapshot): The snapshot.
+    - cache_dir (str): The cache directory, HISTORICAL_CACHE_DIR by default.
+    """
+
+    cache_dir = cache_dir or get_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, META_FILE_NAME)
+        # Drop the previous version first, a crash must not leave new
+        # data files behind an old version tag
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        frames, snapshot_meta = snapshot.to_frames()
+        for name, frame in frames.items():
+            path = get_frame_path(cache_dir, name)
+            feather.write_feather(
+                frame,
+                f"{path}.tmp",
+                compression="uncompressed",
+                chunksize=max(len(frame), 1),
+            )
+            os.replace(f"{path}.tmp", path)
+        write_meta(
+            cache_dir,
+            {
+                "version": snapshot.version,
+                "frames": list(frames),
+                "snapshot": snapshot_meta,
+                "rows": len(snapshot),
+                "appended": [],
+            },
+        )
+        # Drop the frames of the previous version the new one has not
+        # replaced
+        paths = {get_frame_path(cache_dir, name) for name in frames}
+        for file_name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, file_name)
+            if (
+                file_name.startswith("historical_data.")
+                and file_name.endswith(".arrow")
+                and path not in paths
+            ):
+                os.remove(path)
+        logger.info(f"Cached historical data for version {snapshot.version}")
+    except (OSError, ValueError, pa.ArrowException) as e:
+        logger.error(f"Error caching historical data: {e}")
+
+
+def save_cached_delta(
+    snapshot: DataSnapshot,
+    df: pd.DataFrame,
+    cache_dir: Optional[str] = None,
+) -> bool:
+    """
+    Add the rows of the last delta of a snapshot to the cache holding the
+    snapshot without it, see ``load_cached_snapshot``.
+
+    Only the rows of the delta are written, the saved snapshot is left
+    as it is. Once the rows of the deltas cached since the snapshot was
+    saved reach ``HISTORICAL_CACHE_COMPACTION_SHARE`` of its rows, the
+    delta is not added and the merged snapshot is to be saved again, see
+    ``save_cached_snapshot``, so the cost of publishing a delta is
+    proportional to the delta, amortized.
+
+    Parameters:
+    - snapshot (DataSnapshot): The snapshot with the delta appended.
+    - df (pd.DataFrame): The raw rows of the delta.
+    - cache_dir (str): The cache directory, HISTORICAL_CACHE_DIR by default.
+
+    Returns:
+    - bool: Whether the delta was added, False when the cache holds
+        other deltas or the snapshot is to be saved again.
+    """
+
+    cache_dir = cache_dir or get_cache_dir()
+    try:
+        meta = read_meta(cache_dir)
+        saved_deltas = meta["snapshot"]["deltas"]
+        appended = meta.get("appended", [])
+        cached_deltas = tuple(saved_deltas) + tuple(
+            delta["name"] for delta in appended
+        )
+        if (
+            meta["snapshot"]["base_version"] != snapshot.base_version
+            or cached_deltas != snapshot.deltas[:-1]
+        ):
+            return False
+        rows = sum(delta["rows"] for delta in appended) + len(df)
+        if rows >= meta["rows"] * get_compaction_share():
+            return False
+        path = get_delta_path(cache_dir, len(cached_deltas))
+        feather.write_feather(df, f"{path}.tmp", compression="uncompressed")
+        os.replace(f"{path}.tmp", path)
+        meta["appended"] = appended + [
+            {"name": snapshot.deltas[-1], "rows": len(df)}
+        ]
+        meta["version"] = snapshot.version
+        write_meta(cache_dir, meta)
+        logger.info(
+            f"Cached delta {snapshot.deltas[-1]} of historical data for "
+            f"version {snapshot.version}"
+        )
+        return True
+    except FileNotFoundError:
+        return False
+    except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+        logger.error(f"Error caching historical data delta: {e}")
+        return False
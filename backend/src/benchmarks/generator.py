@@ -0,0 +1,163 @@
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import EVENTS, LaneType
+from backend.src.app.services.business_services.metrics.wait_time import (
+    WEEK_DAYS,
+    assign_wait_time_bucket,
+)
+
+
+# The stores of the four clusters
+STORE_CLUSTERS = {
+    16: 1,
+    29: 1,
+    45: 1,
+    49: 2,
+    60: 2,
+    63: 2,
+    121: 2,
+    171: 3,
+    180: 3,
+    201: 3,
+    305: 4,
+    306: 4,
+    338: 4,
+}
+LANE_TYPES = [lane_type.value for lane_type in LaneType]
+NO_EVENT = "No Event"
+# Days of the events, as (month, day)
+EVENT_DAYS = {
+    "Halloween": (10, 31),
+    "Thanksgiving": (11, 23),
+    "Christmas": (12, 25),
+    "New Year": (1, 1),
+    "Valentine's Day": (2, 14),
+}
+START_DATE = "2019-01-01"
+END_DATE = "2023-12-31"
+COVID_START_DATE = "2020-03-15"
+COVID_END_DATE = "2021-06-30"
+PEAK_HOURS = range(11, 14), range(16, 19)
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def generate_history_chunk(
+    rows: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Generate a chunk of synthetic historical data.
+
+    The columns follow the historical csv and are consistent with each
+    other: the clusters follow the stores, the weekday, events and covid
+    effect follow the date, the peak hours follow the hour and the wait
+    time bucket follows the wait time.
+
+    Parameters:
+    - rows (int): The number of rows.
+    - rng (np.random.Generator): The random generator.
+
+    Returns:
+    - pd.DataFrame: The typed data, text columns as categoricals.
+    """
+
+    stores = np.array(list(STORE_CLUSTERS))
+    clusters = np.array(list(STORE_CLUSTERS.values()))
+    store_codes = rng.integers(0, len(stores), rows)
+
+    days = pd.date_range(START_DATE, END_DATE, freq="D")
+    dates = days[rng.integers(0, len(days), rows)]
+    event_names = np.array([NO_EVENT] + EVENTS)
+    event_codes = np.zeros(len(days), dtype=np.int8)
+    for code, event in enumerate(EVENTS, start=1):
+        month, day = EVENT_DAYS[event]
+        event_codes[(days.month == month) & (days.day == day)] = code
+    covid = (dates >= COVID_START_DATE) & (dates <= COVID_END_DATE)
+
+    hours = rng.integers(6, 23, rows)
+    peak_hour = np.isin(hours, [hour for span in PEAK_HOURS for hour in span])
+    # Busier lanes at peak hours and during covid
+    queue_length = rng.gamma(2.0, 1.5 + 1.5 * peak_hour + covid, rows)
+    wait_time = queue_length * rng.gamma(4.0, 5.0, rows)
+
+    return pd.DataFrame(
+        {
+            "new_clusters": clusters[store_codes],
+            "store_name": stores[store_codes],
+            "type_of_checkout": pd.Categorical.from_codes(
+                rng.integers(0, len(LANE_TYPES), rows), categories=LANE_TYPES
+            ),
+            "peak_hour": peak_hour.astype(np.int64),
+            "Covid_Effect": covid.astype(np.int64),
+            "event": pd.Categorical(
+                event_names[event_codes[days.get_indexer(dates)]],
+                categories=event_names,
+            ),
+            "date": dates.to_numpy(),
+            "hour": hours,
+            "weekday_name": pd.Categorical.from_codes(
+                dates.dayofweek, categories=WEEK_DAYS
+            ),
+            "Wait_Time_BKT": assign_wait_time_bucket(wait_time),
+            "avg_waiting_time_Tq": wait_time,
+            "avg_num_wait_queue_Nq": queue_length,
+        }
+    )
+
+
+def iter_history_chunks(
+    rows: int, seed: int = 0, chunk_rows: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate synthetic historical data chunk by chunk.
+
+    Every chunk has its own random generator spawned from the seed, so
+    the data only depends on the seed, the number of rows and the chunk
+    size.
+    """
+
+    chunk_rows = chunk_rows or DEFAULT_CHUNK_ROWS
+    num_chunks = -(-rows // chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(num_chunks)
+    for chunk, chunk_seed in enumerate(seeds):
+        yield generate_history_chunk(
+            min(chunk_rows, rows - chunk * chunk_rows),
+            np.random.default_rng(chunk_seed),
+        )
+
+
+def generate_history(
+    rows: int, seed: int = 0, chunk_rows: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Generate synthetic historical data, typed as parsed from the csv.
+
+    Parameters:
+    - rows (int): The number of rows.
+    - seed (int): The random seed.
+    - chunk_rows (int): The number of rows generated at once.
+
+    Returns:
+    - pd.DataFrame: The generated data.
+    """
+
+    chunks = list(iter_history_chunks(rows, seed, chunk_rows))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_history_csv(
+    path: str, rows: int, seed: int = 0, chunk_rows: Optional[int] = None
+) -> None:
+    """Write synthetic historical data as csv, chunk by chunk."""
+    for chunk, df in enumerate(iter_history_chunks(rows, seed, chunk_rows)):
+        df.to_csv(
+            path,
+            mode="w" if chunk == 0 else "a",
+            header=chunk == 0,
+            index=False,
+            date_format="%Y-%m-%d",
+        )
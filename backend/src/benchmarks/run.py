@@ -0,0 +1,462 @@
+"""
+Benchmarks of the historical data pipeline on synthetic data.
+
+Every stage is timed over several runs, then run once more under
+``tracemalloc`` for its peak memory. The results are written as JSON so
+that runs can be compared, e.g.:
+
+    python -m backend.src.benchmarks.run --rows 100k 1M --output bench.json
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.clients.storage.local_file import LocalFileClient
+from backend.src.app.configs.constants import LaneType, TimeResolution
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.schemas.performance_metrics import (
+    MAX_LANES,
+    Params,
+    TrendParams,
+)
+from backend.src.app.services.business_services.cache import (
+    get_result_cache,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    calculate_and_format_metrics,
+    compute_metrics,
+    evaluate_metrics,
+    evaluate_trend,
+    filter_df,
+    stream_metrics,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.filters import (
+    get_date_window,
+    get_filter_predicates,
+)
+from backend.src.app.services.business_services.query_backends import (
+    DuckDBBackend,
+    PandasBackend,
+)
+from backend.src.app.services.business_services.remodel import QueueModel
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.app.services.data_reader import (
+    parse_csv_chunks,
+    read_csv_stream,
+)
+from backend.src.app.services.executor import shutdown_executor
+from backend.src.benchmarks.generator import (
+    generate_history,
+    write_history_csv,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROWS = ["100k", "1M", "10M", "50M"]
+DEFAULT_REPEAT = 3
+# The filters timed with filter_df
+FILTER_SCENARIOS = {
+    "default": Params(),
+    "single_store": Params(
+        cluster=2,
+        store=[60],
+        peak_hour=[1],
+        lane_types=[LaneType.SCO_BULLPEN],
+    ),
+    "total_year": Params(total_year_flag=True),
+    "last_90_days": Params(time_period=90),
+}
+ROW_SUFFIXES = {"k": 10**3, "m": 10**6}
+# Lane configurations evaluated at once by the queueing model
+REMODEL_CONFIGURATIONS = 1000
+
+
+def parse_rows(value: str) -> int:
+    """Parse a number of rows such as 100000, 100k or 10M."""
+    suffix = value[-1].lower()
+    if suffix in ROW_SUFFIXES:
+        return int(float(value[:-1]) * ROW_SUFFIXES[suffix])
+    return int(value)
+
+
+def measure(
+    func: Callable[[], Any],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Time a function and measure the peak memory it allocates.
+
+    Parameters:
+    - func (Callable): The function to measure.
+    - repeat (int): The number of timed runs.
+    - setup (Callable): Called before every run, outside of the
+        measurements.
+
+    Returns:
+    - dict: The min, median and mean run time in seconds and the peak
+        memory allocated by the run in bytes.
+    """
+
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    # The memory is measured apart, tracemalloc slows the run down
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "mean_seconds": statistics.fmean(times),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def benchmark_csv_ingestion(
+    rows: int, seed: int, repeat: int
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "historical_data.csv")
+        write_history_csv(path, rows, seed)
+        result = measure(lambda: parse_csv_chunks(path), repeat)
+        result["csv_bytes"] = os.path.getsize(path)
+    return result
+
+
+def benchmark_storage_load(
+    rows: int, seed: int, repeat: int
+) -> Dict[str, Any]:
+    """
+    Time the load of the csv through the ranged downloads of the storage
+    client, from a local file.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "historical_data.csv")
+        write_history_csv(path, rows, seed)
+        client = LocalFileClient(path)
+        result = measure(
+            lambda: asyncio.run(
+                read_csv_stream(client.stream_historical_data())
+            ),
+            repeat,
+        )
+        result["csv_bytes"] = os.path.getsize(path)
+    return result
+
+
+def benchmark_compute_metrics(
+    snapshot: DataSnapshot, params: Params, repeat: int, cached: bool
+) -> Dict[str, Any]:
+    # One event loop for all the runs, starting a loop per run costs
+    # more than a cached request
+    loop = asyncio.new_event_loop()
+    result_cache = get_result_cache()
+    try:
+        with patch.dict(
+            "backend.src.app.configs.constants.CONFIGS",
+            {"HISTORICAL_SNAPSHOT": snapshot},
+        ):
+            if cached:
+                loop.run_until_complete(compute_metrics(params))
+            return measure(
+                lambda: loop.run_until_complete(compute_metrics(params)),
+                repeat,
+                setup=None if cached else result_cache.clear,
+            )
+    finally:
+        loop.close()
+
+
+def benchmark_stream_metrics(
+    snapshot: DataSnapshot, params: Params, repeat: int, first: bool
+) -> Dict[str, Any]:
+    """Time the uncached stream of metrics, to its first or last frame."""
+
+    async def read_stream() -> None:
+        frames = stream_metrics(params)
+        async for _ in frames:
+            if first:
+                await frames.aclose()
+                return
+
+    loop = asyncio.new_event_loop()
+    result_cache = get_result_cache()
+    try:
+        with patch.dict(
+            "backend.src.app.configs.constants.CONFIGS",
+            {"HISTORICAL_SNAPSHOT": snapshot},
+        ):
+            return measure(
+                lambda: loop.run_until_complete(read_stream()),
+                repeat,
+                setup=result_cache.clear,
+            )
+    finally:
+        loop.close()
+
+
+def run_benchmarks(
+    rows: int, seed: int = 0, repeat: int = DEFAULT_REPEAT, csv: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Run the benchmarks on synthetic data of the given size.
+
+    Parameters:
+    - rows (int): The number of rows of the synthetic data.
+    - seed (int): The random seed of the synthetic data.
+    - repeat (int): The number of timed runs of every stage.
+    - csv (bool): Whether to benchmark the csv ingestion and load.
+
+    Returns:
+    - list: The result of every stage.
+    """
+
+    results = []
+
+    def record(stage: str, result: Dict[str, Any]) -> None:
+        result.update(stage=stage, rows=rows)
+        results.append(result)
+        logger.info(
+            f"{rows} rows, {stage}: {result['median_seconds']:.4f}s, "
+            f"{result['peak_memory_bytes'] / 2**20:.1f}MiB"
+        )
+
+    if csv:
+        record("csv_ingestion", benchmark_csv_ingestion(rows, seed, repeat))
+        record("storage_load", benchmark_storage_load(rows, seed, repeat))
+
+    raw_df = generate_history(rows, seed)
+    frames = []
+    record(
+        "snapshot_build",
+        measure(
+            lambda: DataSnapshot(frames.pop()),
+            repeat,
+            setup=lambda: frames.append(raw_df.copy()),
+        ),
+    )
+    snapshot = DataSnapshot(raw_df)
+    del raw_df
+
+    for name, params in FILTER_SCENARIOS.items():
+        record(
+            f"filter_df[{name}]",
+            measure(lambda: filter_df(params, snapshot), repeat),
+        )
+
+    filtered_df = filter_df(FILTER_SCENARIOS["default"], snapshot)
+    for metric_name, metric in wait_time_metrics.items():
+        record(
+            f"metric[{metric_name}]",
+            measure(lambda: metric(filtered_df), repeat),
+        )
+    record(
+        "calculate_and_format_metrics",
+        measure(
+            lambda: calculate_and_format_metrics(
+                filtered_df, wait_time_metrics
+            ),
+            repeat,
+        ),
+    )
+    del filtered_df
+
+    for cached in (False, True):
+        record(
+            f"compute_metrics[{'cached' if cached else 'uncached'}]",
+            benchmark_compute_metrics(
+                snapshot, FILTER_SCENARIOS["default"], repeat, cached
+            ),
+        )
+
+    backends = [PandasBackend()]
+    try:
+        backends.append(DuckDBBackend())
+    except ImproperlyConfigured:
+        logger.info("duckdb is not installed, its backend is not timed")
+    for backend in backends:
+        for name, params in FILTER_SCENARIOS.items():
+            predicates = get_filter_predicates(params)
+            date_window = get_date_window(params, snapshot.dates)
+            record(
+                f"query_backend[{backend.name}:{name}]",
+                measure(
+                    lambda: backend.calculate_means(
+                        snapshot, predicates, date_window, wait_time_metrics
+                    ),
+                    repeat,
+                ),
+            )
+
+    # Date windows are answered from the rows, the cube answers the others
+    for first in (True, False):
+        record(
+            f"stream_metrics[{'first' if first else 'all'}]",
+            benchmark_stream_metrics(
+                snapshot, FILTER_SCENARIOS["last_90_days"], repeat, first
+            ),
+        )
+
+    with patch.dict(
+        "backend.src.app.configs.constants.CONFIGS",
+        {"HISTORICAL_SNAPSHOT": snapshot},
+    ):
+        for resolution in TimeResolution:
+            params = TrendParams(resolution=resolution)
+            record(
+                f"trend[{resolution.value}]",
+                measure(lambda: evaluate_trend(params), repeat),
+            )
+        for name, params in FILTER_SCENARIOS.items():
+            params = params.model_copy(update={"approximate": True})
+            record(
+                f"approximate_metrics[{name}]",
+                measure(lambda: evaluate_metrics(params), repeat),
+            )
+
+    # A day of rows appended after the history, again and again
+    delta = generate_history(max(rows // 365, 1), seed + 1)
+    delta["date"] = snapshot.dates.last + pd.Timedelta(days=1)
+    snapshots = [snapshot.append(delta.copy(), "delta")]
+    record(
+        "append_delta",
+        measure(
+            lambda: snapshots.append(
+                snapshots[-1].append(delta.copy(), "delta")
+            ),
+            repeat,
+        ),
+    )
+    del snapshots
+
+    model = QueueModel(snapshot.frame)
+    configurations = np.random.default_rng(seed).integers(
+        1, MAX_LANES + 1, (REMODEL_CONFIGURATIONS, len(LaneType))
+    )
+    record(
+        f"remodel_grid[{REMODEL_CONFIGURATIONS}]",
+        measure(
+            lambda: model.evaluate(
+                model.get_configuration_lanes(configurations)
+            ),
+            repeat,
+        ),
+    )
+    shutdown_executor()
+    return results
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment() -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        default=DEFAULT_ROWS,
+        help="Sizes of the synthetic data, e.g. 100k 1M",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-csv",
+        action="store_true",
+        help="Do not benchmark the csv ingestion and load",
+    )
+    parser.add_argument(
+        "--output", help="Path of the JSON report, stdout by default"
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        results.extend(
+            run_benchmarks(
+                parse_rows(rows),
+                seed=args.seed,
+                repeat=args.repeat,
+                csv=not args.skip_csv,
+            )
+        )
+    report = {
+        "environment": get_environment(),
+        "seed": args.seed,
+        "results": results,
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        * 1024,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    main()
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import pytest
+
+from backend.src.app.configs.constants import CONFIGS
+from backend.src.app.main import app
+from backend.src.app.services.business_services.cache import ResultCache
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+@pytest.fixture
+def client():
+    with patch.dict(
+        CONFIGS, {"HISTORICAL_SNAPSHOT": DataSnapshot(make_kpi_frame())}
+    ), patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=ResultCache(max_entries=10, max_bytes=10**7),
+    ):
+        yield TestClient(app)
+
+
+def test_no_timings_when_disabled(client, monkeypatch):
+    monkeypatch.delenv("SERVER_TIMING_ENABLED", raising=False)
+    monkeypatch.delenv("METRICS_ENABLED", raising=False)
+    response = client.get("/v1/performance/metrics")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert client.get("/metrics").status_code == 404
+
+
+def test_server_timing_and_metrics(client, monkeypatch):
+    monkeypatch.setenv("SERVER_TIMING_ENABLED", "true")
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    response = client.get(
+        "/v1/performance/metrics", params={"total_year_flag": True}
+    )
+    stages = [
+        timing.split(";")[0]
+        for timing in response.headers["server-timing"].split(", ")
+    ]
+    assert {
+        "get_history_df",
+        "filter_df",
+        "metric.avg_wait_time_by_hour",
+        "compute",
+        "serialize",
+        "total",
+    } <= set(stages)
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'ppo_stage_duration_seconds_count{stage="filter_df"}' in (
+        metrics.text
+    )
+    assert 'ppo_rows_scanned_total{source="rows"}' in metrics.text
+
+
+def get_stages(response):
+    return {
+        timing.split(";")[0]
+        for timing in response.headers["server-timing"].split(", ")
+    }
+
+
+def test_stages_run_on_the_executor_are_timed(client, monkeypatch):
+    monkeypatch.setenv("SERVER_TIMING_ENABLED", "true")
+    monkeypatch.setenv("METRICS_ENABLED", "true")
+    trend = client.get("/v1/performance/trend", params={"resolution": "week"})
+    assert {"compute", "select_cells"} <= get_stages(trend)
+    assert 'ppo_rows_scanned_total{source="cells"}' in (
+        client.get("/metrics").text
+    )
+
+    batch = client.post(
+        "/v1/performance/metrics/batch",
+        json={"scenarios": {"all": {}, "store": {"store": [16]}}},
+    )
+    assert batch.status_code == 200
+    assert "compute" in get_stages(batch)
@@ -0,0 +1,136 @@
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import pyarrow as pa
+import pytest
+
+from backend.src.app.api.responses import (
+    ARROW_STREAM_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+)
+from backend.src.app.configs.constants import CONFIGS
+from backend.src.app.main import app
+from backend.src.app.services.business_services.cache import ResultCache
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+@pytest.fixture
+def client():
+    with patch.dict(
+        CONFIGS, {"HISTORICAL_SNAPSHOT": DataSnapshot(make_kpi_frame())}
+    ), patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=ResultCache(max_entries=10, max_bytes=10**7),
+    ):
+        yield TestClient(app)
+
+
+def test_stream_matches_metrics(client):
+    params = {"store": [16, 29], "total_year_flag": True}
+    response = client.get("/v1/performance/metrics/stream", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["metric"] for line in lines) == sorted(
+        wait_time_metrics
+    )
+
+    data = client.get("/v1/performance/metrics", params=params).json()["data"]
+    for line in lines:
+        assert line["data"] == data[line["metric"]]
+
+
+def test_stream_no_data(client):
+    response = client.get(
+        "/v1/performance/metrics/stream", params={"store": [1]}
+    )
+    assert response.status_code == 404
+
+
+def test_stream_checks_lane_counts(client):
+    response = client.get(
+        "/v1/performance/metrics/stream",
+        params={"data_form": "remodel", "lane_counts": [1]},
+    )
+    assert response.status_code == 400
+
+
+def test_stream_ends_with_unexpected_errors(client):
+    async def failing_metrics(params):
+        yield "first", make_kpi_frame(1)
+        raise RuntimeError("boom")
+
+    with patch(
+        "backend.src.app.api.v1.performance_metrics.stream_metrics",
+        failing_metrics,
+    ):
+        response = client.get("/v1/performance/metrics/stream")
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["metric"] == "first"
+    assert lines[-1] == {"success": False, "message": "Unexpected error: boom"}
+
+
+def test_trend_reads_the_metrics_params(client):
+    params = {"store": [16, 29], "resolution": "week"}
+    historical = client.get("/v1/performance/trend", params=params)
+    assert historical.status_code == 200
+
+    remodel = client.get(
+        "/v1/performance/trend",
+        params={
+            **params,
+            "data_form": "remodel",
+            "lane_types": ["SCO Bullpen"],
+            "lane_counts": [12],
+        },
+    )
+    assert remodel.status_code == 200
+    assert remodel.json()["data"] != historical.json()["data"]
+
+    response = client.get(
+        "/v1/performance/trend",
+        params={**params, "data_form": "remodel", "lane_counts": [1]},
+    )
+    assert response.status_code == 400
+
+
+def test_remodel_results_state_the_baseline_assumption(client):
+    historical = client.get("/v1/performance/metrics")
+    assert "assumptions" not in historical.json()
+
+    remodel = client.get(
+        "/v1/performance/metrics", params={"data_form": "remodel"}
+    )
+    assumptions = remodel.json()["assumptions"]
+    assert len(assumptions) == 1 and "baseline lanes" in assumptions[0]
+
+    response = client.get(
+        "/v1/performance/metrics",
+        params={"data_form": "remodel"},
+        headers={"accept": ARROW_STREAM_MEDIA_TYPE},
+    )
+    metadata = pa.ipc.open_stream(response.content).schema.metadata
+    assert json.loads(metadata[b"assumptions"]) == assumptions
+
+
+def test_queue_models_state_the_baseline_assumption(client):
+    body = {"store": [16], "lane_types": ["SCO Bullpen"]}
+    optimization = client.post("/v1/performance/lane-optimization", json=body)
+    simulation = client.post(
+        "/v1/performance/simulation",
+        json={**body, "replications": 2, "customers": 50},
+    )
+    for response in (optimization, simulation):
+        assert response.status_code == 200
+        assert "baseline lanes" in response.json()["assumptions"][0]
+    queues = simulation.json()["data"]["queues"]
+    assert "baseline_lanes" in queues["columns"]
@@ -0,0 +1,71 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from backend.src.app.api.responses import (
+    ARROW_STREAM_MEDIA_TYPE,
+    frame_to_split,
+    metric_line,
+    metrics_response,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    snapshot = DataSnapshot(make_kpi_frame())
+    return {
+        metric_name: metric(snapshot.frame)
+        for metric_name, metric in wait_time_metrics.items()
+    }
+
+
+def test_json_matches_split_orientation(frames):
+    response = metrics_response(frames)
+    body = json.loads(response.body)
+    assert body["status_code"] == 200 and body["success"]
+    for metric_name, df in frames.items():
+        expected = json.loads(json.dumps(df.to_dict(orient="split")))
+        assert body["data"][metric_name] == expected
+
+
+def test_mixed_frame_keeps_integers():
+    df = pd.DataFrame({"hour": [6, 7], "wait": [1.5, float("nan")]})
+    body = json.loads(metrics_response({"metric": df}).body)
+    assert body["data"]["metric"] == {
+        "index": [0, 1],
+        "columns": ["hour", "wait"],
+        "data": [[6, 1.5], [7, None]],
+    }
+
+
+def test_arrow_ipc_round_trip(frames):
+    response = metrics_response(frames, accept=ARROW_STREAM_MEDIA_TYPE)
+    assert response.media_type == ARROW_STREAM_MEDIA_TYPE
+    table = pa.ipc.open_stream(response.body).read_all()
+    assert table.column("metric").to_pylist() == list(frames)
+    for metric_name, encoded in zip(
+        table.column("metric").to_pylist(), table.column("frame").to_pylist()
+    ):
+        df = pa.ipc.open_stream(encoded).read_all().to_pandas()
+        pd.testing.assert_frame_equal(df, frames[metric_name])
+
+
+def test_metric_line(frames):
+    line = metric_line(
+        "avg_wait_time_by_hour", frames["avg_wait_time_by_hour"]
+    )
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    body = json.loads(line)
+    assert body["metric"] == "avg_wait_time_by_hour"
+    assert body["data"] == json.loads(
+        json.dumps(frames["avg_wait_time_by_hour"].to_dict(orient="split"))
+    )
@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+
+from backend.src.app.services.data_reader import (
+    HISTORICAL_DATA_DTYPES,
+    parse_csv_chunks,
+)
+from backend.src.benchmarks.generator import (
+    generate_history,
+    write_history_csv,
+)
+from backend.src.benchmarks.run import main, parse_rows
+
+
+def test_generator_is_deterministic():
+    df = generate_history(5000, seed=3, chunk_rows=2000)
+    pd.testing.assert_frame_equal(
+        df, generate_history(5000, seed=3, chunk_rows=2000)
+    )
+    assert not df.equals(generate_history(5000, seed=4, chunk_rows=2000))
+    assert len(df) == 5000
+
+
+def test_generated_csv_matches_schema(tmp_path):
+    path = tmp_path / "historical_data.csv"
+    write_history_csv(str(path), 3000, chunk_rows=1000)
+    df = parse_csv_chunks(str(path))
+    assert set(df.columns) == set(HISTORICAL_DATA_DTYPES) | {"date"}
+    pd.testing.assert_frame_equal(
+        df,
+        generate_history(3000, chunk_rows=1000),
+        check_categorical=False,
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize(
+    "value, rows", [("100k", 100_000), ("10M", 10_000_000), ("2500", 2500)]
+)
+def test_parse_rows(value, rows):
+    assert parse_rows(value) == rows
+
+
+def test_report_is_machine_readable(tmp_path):
+    output = tmp_path / "bench.json"
+    main(["--rows", "3000", "--repeat", "1", "--output", str(output)])
+    report = json.loads(output.read_text())
+    stages = {result["stage"] for result in report["results"]}
+    assert {
+        "csv_ingestion",
+        "storage_load",
+        "filter_df[default]",
+        "metric[avg_wait_time_by_hour]",
+        "calculate_and_format_metrics",
+        "compute_metrics[uncached]",
+    } <= stages
+    for result in report["results"]:
+        assert result["rows"] == 3000
+        assert result["median_seconds"] >= 0
+        assert result["peak_memory_bytes"] >= 0
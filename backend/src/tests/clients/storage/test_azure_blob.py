@@ -0,0 +1,30 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.src.app.clients.storage.azure_blob import BlobClientHandler
+
+
+def test_blob_client_closes_replaced_service_clients():
+    service_clients = []
+
+    def connect(connection_string):
+        service_client = MagicMock()
+        service_client.close = AsyncMock()
+        service_clients.append(service_client)
+        return service_client
+
+    async def run(client):
+        await client.initialize_client()
+        await client.initialize_client()
+        await client.close()
+
+    with patch(
+        "backend.src.app.clients.storage.azure_blob.BlobServiceClient"
+    ) as service_client_class:
+        service_client_class.from_connection_string.side_effect = connect
+        client = BlobClientHandler()
+        asyncio.run(run(client))
+    assert len(service_clients) == 2
+    for service_client in service_clients:
+        service_client.close.assert_awaited_once()
+    assert client.blob_client is None
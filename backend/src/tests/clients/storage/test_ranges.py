@@ -0,0 +1,147 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.src.app.clients.storage.local_file import LocalFileClient
+from backend.src.app.clients.storage.ranges import (
+    DataVersionChangedError,
+    download_ranges,
+    split_ranges,
+)
+
+
+DATA = bytes(range(256)) * 41
+
+
+def collect(chunks):
+    async def run():
+        return [chunk async for chunk in chunks]
+
+    return asyncio.run(run())
+
+
+def test_split_ranges_covers_the_object():
+    assert split_ranges(10, 4) == [(0, 4), (4, 4), (8, 2)]
+    assert split_ranges(8, 4) == [(0, 4), (4, 4)]
+    assert split_ranges(0, 4) == []
+
+
+def test_ranges_are_yielded_in_order_and_bounded():
+    in_flight, max_in_flight = 0, 0
+
+    async def read_range(offset, length):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # The first ranges complete last
+        await asyncio.sleep((len(DATA) - offset) / len(DATA) / 100)
+        in_flight -= 1
+        return DATA[offset : offset + length]
+
+    chunks = collect(
+        download_ranges(read_range, len(DATA), range_size=1000, concurrency=4)
+    )
+    assert b"".join(chunks) == DATA
+    assert [len(chunk) for chunk in chunks[:-1]] == [1000] * 10
+    assert max_in_flight == 4
+
+
+def test_failed_ranges_are_retried():
+    attempts = {}
+
+    async def read_range(offset, length):
+        attempts[offset] = attempts.get(offset, 0) + 1
+        if attempts[offset] == 1:
+            raise ConnectionError("connection reset")
+        if attempts[offset] == 2:
+            return DATA[offset : offset + length - 1]
+        return DATA[offset : offset + length]
+
+    chunks = collect(
+        download_ranges(
+            read_range, len(DATA), range_size=4096, retries=2, retry_delay=0
+        )
+    )
+    assert b"".join(chunks) == DATA
+    assert set(attempts.values()) == {3}
+
+
+def test_download_fails_when_retries_are_exhausted():
+    async def read_range(offset, length):
+        if offset:
+            raise ConnectionError("connection reset")
+        return DATA[offset : offset + length]
+
+    with pytest.raises(ConnectionError):
+        collect(
+            download_ranges(
+                read_range,
+                len(DATA),
+                range_size=4096,
+                retries=1,
+                retry_delay=0,
+            )
+        )
+
+
+def test_version_change_is_not_retried():
+    attempts = []
+
+    async def read_range(offset, length):
+        attempts.append(offset)
+        raise DataVersionChangedError("changed")
+
+    with pytest.raises(DataVersionChangedError):
+        collect(
+            download_ranges(
+                read_range, len(DATA), range_size=len(DATA), retry_delay=0
+            )
+        )
+    assert attempts == [0]
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "historical_data.csv"
+    path.write_bytes(DATA)
+    return path
+
+
+def test_local_file_client_reads_ranges(data_path):
+    client = LocalFileClient(str(data_path), range_size=1000)
+
+    async def run():
+        await client.initialize_client()
+        version = await client.get_historical_data_version()
+        chunk = await client.read_historical_data_range(100, 50, version)
+        chunks = [
+            chunk async for chunk in client.stream_historical_data(version)
+        ]
+        return await client.get_historical_data_size(), chunk, chunks
+
+    size, chunk, chunks = asyncio.run(run())
+    assert size == len(DATA)
+    assert chunk == DATA[100:150]
+    assert b"".join(chunks) == DATA
+    assert len(chunks) == 11
+
+
+def test_local_file_client_detects_version_change(data_path):
+    client = LocalFileClient(str(data_path))
+    version = asyncio.run(client.get_historical_data_version())
+    data_path.write_bytes(DATA * 2)
+    os.utime(data_path, ns=(0, 0))
+
+    with pytest.raises(DataVersionChangedError):
+        asyncio.run(client.read_historical_data_range(0, 10, version))
+
+
+def test_local_file_client_requires_the_file(tmp_path, monkeypatch):
+    monkeypatch.delenv("HISTORICAL_DATA_PATH", raising=False)
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path))
+    client = LocalFileClient()
+    assert client.path == str(tmp_path / "historical_data.csv")
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(client.initialize_client())
@@ -0,0 +1,204 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pandas as pd
+import pytest
+
+from backend.src.app.clients.storage.local_file import LocalFileClient
+from backend.src.app.configs.constants import CONFIGS
+from backend.src.app.configs.startup import (
+    initialize_historical_data_from_cloud,
+    poll_historical_data,
+    refresh_historical_data,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    get_data_version,
+)
+from backend.src.app.services.snapshot_cache import DATA_FILE_NAME
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+@pytest.fixture
+def local_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORICAL_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "historical_data.csv"
+    make_kpi_frame(400).to_csv(path, index=False)
+    with patch.dict(CONFIGS, clear=True):
+        yield LocalFileClient(str(path))
+
+
+def test_refresh_swaps_in_new_versions_only(local_client):
+    assert asyncio.run(refresh_historical_data(local_client))
+    old_snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    assert not asyncio.run(refresh_historical_data(local_client))
+    assert CONFIGS["HISTORICAL_SNAPSHOT"] is old_snapshot
+
+    make_kpi_frame(300, seed=5).to_csv(local_client.path, index=False)
+    os.utime(local_client.path, ns=(0, 10**9))
+    assert asyncio.run(refresh_historical_data(local_client))
+    new_snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    assert new_snapshot is not old_snapshot
+    assert new_snapshot.version != old_snapshot.version
+    # Requests holding the old snapshot keep a consistent view of it
+    assert len(old_snapshot) == 400
+    assert get_data_version()["version"] == new_snapshot.version
+    assert get_data_version()["rows"] == 300
+
+
+def test_refresh_appends_new_deltas(local_client):
+    assert asyncio.run(refresh_historical_data(local_client))
+    base_snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    os.makedirs(local_client.delta_dir)
+    delta = make_kpi_frame(50, seed=3)
+    delta["date"] = "2024-01-02"
+    delta.to_csv(
+        os.path.join(local_client.delta_dir, "2024-01-02.csv"), index=False
+    )
+    assert asyncio.run(refresh_historical_data(local_client))
+    snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    assert snapshot.base_version == base_snapshot.version
+    assert snapshot.deltas == ("2024-01-02.csv",)
+    assert len(snapshot) == 450
+    assert len(base_snapshot) == 400
+    assert not asyncio.run(refresh_historical_data(local_client))
+
+    delta["date"] = "2024-01-03"
+    delta.to_csv(
+        os.path.join(local_client.delta_dir, "2024-01-03.csv"), index=False
+    )
+    assert asyncio.run(refresh_historical_data(local_client))
+    assert CONFIGS["HISTORICAL_SNAPSHOT"].deltas == (
+        "2024-01-02.csv",
+        "2024-01-03.csv",
+    )
+    assert get_data_version()["rows"] == 500
+
+
+def write_delta(client, day, seed=3):
+    delta = make_kpi_frame(50, seed=seed)
+    delta["date"] = day
+    delta.to_csv(os.path.join(client.delta_dir, f"{day}.csv"), index=False)
+
+
+def test_appended_deltas_are_shared_through_the_cache(
+    local_client, monkeypatch
+):
+    # Every delta publishes the merged snapshot again
+    monkeypatch.setenv("HISTORICAL_CACHE_COMPACTION_SHARE", "0")
+    assert asyncio.run(refresh_historical_data(local_client))
+    base_snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    os.makedirs(local_client.delta_dir)
+    delta = make_kpi_frame(50, seed=3)
+    delta["date"] = "2024-01-02"
+    delta.to_csv(
+        os.path.join(local_client.delta_dir, "2024-01-02.csv"), index=False
+    )
+    assert asyncio.run(refresh_historical_data(local_client))
+    snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    # The merged snapshot is attached to the published cache, the copy
+    # made by appending is released
+    values = snapshot.frame["avg_waiting_time_Tq"].to_numpy()
+    assert not values.flags.writeable
+    for column_index in snapshot.index.columns.values():
+        assert not column_index.codes.flags.writeable
+    for table in snapshot.cube.tables.values():
+        assert not table.cells.iloc[:, -1].to_numpy().flags.writeable
+
+    reader = "backend.src.app.services.data_reader"
+    with patch(
+        f"{reader}.read_historical_delta",
+        side_effect=AssertionError("delta read again"),
+    ), patch(
+        f"{reader}.read_csv_stream",
+        side_effect=AssertionError("csv parsed again"),
+    ):
+        # Another worker, still on the base snapshot, attaches to it
+        with patch.dict(CONFIGS, {"HISTORICAL_SNAPSHOT": base_snapshot}):
+            assert asyncio.run(refresh_historical_data(local_client))
+            refreshed = CONFIGS["HISTORICAL_SNAPSHOT"]
+        # A new worker starts from it
+        with patch.dict(CONFIGS, clear=True), patch(
+            "backend.src.app.configs.startup.get_storage_client",
+            return_value=local_client,
+        ):
+            asyncio.run(initialize_historical_data_from_cloud())
+            started = CONFIGS["HISTORICAL_SNAPSHOT"]
+    for other in (refreshed, started):
+        assert other.version == snapshot.version
+        assert other.deltas == ("2024-01-02.csv",)
+        pd.testing.assert_frame_equal(other.frame, snapshot.frame)
+
+
+def test_only_the_rows_of_the_deltas_are_published(local_client):
+    assert asyncio.run(refresh_historical_data(local_client))
+    base_snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    data_path = os.path.join(
+        os.environ["HISTORICAL_CACHE_DIR"], DATA_FILE_NAME
+    )
+    saved = os.stat(data_path)
+    os.makedirs(local_client.delta_dir)
+    write_delta(local_client, "2024-01-02")
+    assert asyncio.run(refresh_historical_data(local_client))
+    snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    # 50 rows of 400 stay under the compaction share, the saved snapshot
+    # is left as it is
+    assert os.stat(data_path).st_ino == saved.st_ino
+    assert snapshot.deltas == ("2024-01-02.csv",)
+
+    reader = "backend.src.app.services.data_reader"
+    with patch(
+        f"{reader}.read_historical_delta",
+        side_effect=AssertionError("delta read again"),
+    ), patch.dict(CONFIGS, {"HISTORICAL_SNAPSHOT": base_snapshot}):
+        # Another worker appends the cached rows of the delta
+        assert asyncio.run(refresh_historical_data(local_client))
+        other = CONFIGS["HISTORICAL_SNAPSHOT"]
+    assert other.version == snapshot.version
+    pd.testing.assert_frame_equal(other.frame, snapshot.frame)
+
+    write_delta(local_client, "2024-01-03", seed=4)
+    assert asyncio.run(refresh_historical_data(local_client))
+    # 100 rows reach the compaction share, the merged snapshot is saved
+    assert os.stat(data_path).st_ino != saved.st_ino
+    snapshot = CONFIGS["HISTORICAL_SNAPSHOT"]
+    assert len(snapshot) == 500
+    assert not snapshot.frame["hour"].to_numpy().flags.writeable
+
+
+def test_poll_initializes_the_client_once(local_client):
+    calls = []
+
+    class TrackedClient(LocalFileClient):
+        async def initialize_client(self):
+            calls.append("initialize")
+            await super().initialize_client()
+
+        async def close(self):
+            calls.append("close")
+
+    async def run():
+        polled = asyncio.Event()
+
+        async def refresh(client):
+            calls.append("refresh")
+            if calls.count("refresh") == 3:
+                polled.set()
+
+        with patch(
+            "backend.src.app.configs.startup.get_storage_client",
+            return_value=TrackedClient(local_client.path),
+        ), patch(
+            "backend.src.app.configs.startup.refresh_historical_data",
+            AsyncMock(side_effect=refresh),
+        ):
+            task = asyncio.create_task(poll_historical_data(0.001))
+            await polled.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(run())
+    assert calls == ["initialize", "refresh", "refresh", "refresh", "close"]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import EVENTS, LaneType
+
+
+WAIT_TIME_BUCKETS = [
+    " 0 - 30 sec",
+    "30 sec - 1 min",
+    "1min - 1min 30 sec",
+    "1min 30 sec - 2min",
+    "2min - 2min 30sec",
+    "2min 30sec - 3min",
+    "> 3min",
+]
+STORES = [16, 29, 45, 49, 60, 63, 121, 171, 180, 201, 305, 306, 338]
+
+
+def make_kpi_frame(rows: int = 2000, seed: int = 7) -> pd.DataFrame:
+    """Build a raw kpi frame shaped like the historical csv."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, rows), unit="D"
+    )
+    stores = rng.choice(STORES, rows)
+    return pd.DataFrame(
+        {
+            "new_clusters": stores % 4 + 1,
+            "store_name": stores,
+            "type_of_checkout": rng.choice(
+                [lane_type.value for lane_type in LaneType], rows
+            ),
+            "peak_hour": rng.integers(0, 2, rows),
+            "Covid_Effect": rng.integers(0, 2, rows),
+            "event": rng.choice(EVENTS + ["No Event"], rows),
+            "date": dates.strftime("%Y-%m-%d"),
+            "hour": rng.integers(6, 23, rows),
+            "weekday_name": dates.day_name(),
+            "Wait_Time_BKT": rng.choice(WAIT_TIME_BUCKETS, rows),
+            "avg_waiting_time_Tq": rng.gamma(2.0, 30.0, rows),
+            "avg_num_wait_queue_Nq": rng.gamma(2.0, 3.0, rows),
+        }
+    )
+
+
+@pytest.fixture
+def kpi_frame() -> pd.DataFrame:
+    return make_kpi_frame()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    calculate_and_format_metrics,
+    calculate_and_format_metrics_from_cube,
+    filter_df,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+def assert_frames_equal(result: dict, expected: dict):
+    assert result.keys() == expected.keys()
+    for metric_name in expected:
+        pd.testing.assert_frame_equal(
+            result[metric_name], expected[metric_name]
+        )
+
+
+@pytest.fixture
+def snapshot(kpi_frame):
+    kpi_frame.loc[::11, "avg_waiting_time_Tq"] = np.nan
+    kpi_frame.loc[::13, "event"] = np.nan
+    return DataSnapshot(kpi_frame)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        Params(),
+        Params(cluster=2, store=[29, 45, 49], peak_hour=[1]),
+        Params(
+            cluster=3,
+            lane_types=[LaneType.SCO_BULLPEN, LaneType.MANNED_EXPRESS],
+            covid_flag=True,
+        ),
+        Params(cluster=4, events_flag=True, october_flag=True),
+    ],
+)
+def test_cube_matches_filtered_data(snapshot, params):
+    filtered_df = filter_df(params=params, kpi_data=snapshot)
+    expected = calculate_and_format_metrics(
+        data=filtered_df, metric_functions=wait_time_metrics
+    )
+    result = calculate_and_format_metrics_from_cube(
+        params=params,
+        cube=snapshot.cube,
+        metric_functions=wait_time_metrics,
+    )
+    assert_frames_equal(result, expected)
+
+
+def test_cube_no_matching_cells(snapshot):
+    with pytest.raises(
+        EmptyDataError, match="No data found for the given filters"
+    ):
+        calculate_and_format_metrics_from_cube(
+            params=Params(store=[999]),
+            cube=snapshot.cube,
+            metric_functions=wait_time_metrics,
+        )
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.batch import (
+    ScenarioSelector,
+)
+from backend.src.app.services.business_services.cache import ResultCache
+from backend.src.app.services.business_services.filters import (
+    get_filter_predicates,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    compute_batch_metrics,
+    compute_metrics,
+    evaluate_batch_metrics,
+    evaluate_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+SCENARIOS = {
+    "default": Params(),
+    "cluster_2": Params(cluster=2, store=[29, 45, 49], peak_hour=[1]),
+    "bullpen": Params(
+        cluster=3,
+        lane_types=[LaneType.SCO_BULLPEN, LaneType.MANNED_EXPRESS],
+        covid_flag=True,
+    ),
+    "events": Params(cluster=4, events_flag=True, october_flag=True),
+    "total_year": Params(cluster=2, total_year_flag=True),
+    "total_year_stores": Params(store=[16, 60], total_year_flag=True),
+    "unknown_store": Params(store=[999]),
+}
+
+
+@pytest.fixture
+def snapshot(kpi_frame):
+    kpi_frame.loc[::11, "avg_waiting_time_Tq"] = np.nan
+    kpi_frame.loc[::13, "event"] = np.nan
+    kpi_frame.loc[::7, "date"] = None
+    snapshot = DataSnapshot(kpi_frame)
+    with patch.dict(
+        "backend.src.app.configs.constants.CONFIGS",
+        {"HISTORICAL_SNAPSHOT": snapshot},
+    ):
+        yield snapshot
+
+
+def test_batch_matches_single_requests(snapshot):
+    results, errors = evaluate_batch_metrics(SCENARIOS)
+    assert errors == {"unknown_store": "No data found for the given filters"}
+    for name, params in SCENARIOS.items():
+        if name in errors:
+            continue
+        version, expected = evaluate_metrics(params)
+        assert results[name][0] == version
+        for metric_name, df in expected.items():
+            pd.testing.assert_frame_equal(results[name][1][metric_name], df)
+
+
+def test_selector_shares_predicate_masks(snapshot):
+    selector = ScenarioSelector(snapshot.index)
+    predicates = get_filter_predicates(Params(store=[16, 29]))
+    rows = selector.select(predicates)
+    assert selector.select(dict(predicates)) is rows
+    other_rows = selector.select(
+        get_filter_predicates(Params(store=[29, 16], peak_hour=[1]))
+    )
+    assert selector.get_mask("store_name", [29, 16]) is selector.get_mask(
+        "store_name", [16, 29]
+    )
+    assert np.isin(other_rows, rows).all()
+
+
+def test_compute_batch_metrics_uses_cache(snapshot):
+    cache = ResultCache(max_entries=10, max_bytes=10**7)
+    scenarios = {
+        "a": Params(store=[16, 60]),
+        "b": Params(store=[60, 16]),
+        "c": Params(store=[999]),
+    }
+    with patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=cache,
+    ):
+        results, errors = asyncio.run(compute_batch_metrics(scenarios))
+        cached_results, _ = asyncio.run(compute_batch_metrics(scenarios))
+    assert results["a"] is results["b"]
+    assert cached_results["a"] is results["a"]
+    assert errors == {"c": "No data found for the given filters"}
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("batch_first", [True, False])
+def test_batch_and_approximate_results_are_cached_apart(snapshot, batch_first):
+    cache = ResultCache(max_entries=10, max_bytes=10**7)
+    params = Params(store=[16, 60], approximate=True)
+    with patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=cache,
+    ):
+        if batch_first:
+            results, _ = asyncio.run(compute_batch_metrics({"a": params}))
+            approximate = asyncio.run(compute_metrics(params))
+        else:
+            approximate = asyncio.run(compute_metrics(params))
+            results, _ = asyncio.run(compute_batch_metrics({"a": params}))
+        exact = asyncio.run(compute_metrics(Params(store=[16, 60])))
+    # The batch is exact and shares the exact results
+    assert "approximation" in approximate
+    assert "approximation" not in results["a"]
+    assert results["a"] is exact
@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import patch
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.cache import (
+    ResultCache,
+    get_params_key,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    compute_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+def test_params_key_is_normalized():
+    params = Params(
+        store=[29, 16, 29],
+        lane_types=[LaneType.SCO_BULLPEN, LaneType.MANNED_EXPRESS],
+    )
+    same_params = Params(
+        store=[16, 29],
+        lane_types=[LaneType.MANNED_EXPRESS, LaneType.SCO_BULLPEN],
+    )
+    assert get_params_key(params) == get_params_key(same_params)
+    assert get_params_key(params) != get_params_key(Params(store=[16]))
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2, max_bytes=10**6)
+    cache.put("v1", "a", {"value": 1})
+    cache.put("v1", "b", {"value": 2})
+    assert cache.get("v1", "a") == {"value": 1}
+    cache.put("v1", "c", {"value": 3})
+    assert cache.get("v1", "b") is None
+    assert cache.get("v1", "a") == {"value": 1}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = ResultCache(max_entries=10, max_bytes=2000)
+    for key in range(5):
+        cache.put("v1", key, list(range(50)))
+    assert cache.stats()["bytes"] <= 2000
+    assert cache.get("v1", 0) is None
+    assert cache.get("v1", 4) is not None
+
+
+def test_cache_keys_results_by_version():
+    cache = ResultCache(max_entries=10, max_bytes=10**6)
+    cache.put("v1", "a", {"value": 1})
+    assert cache.get("v2", "a") is None
+    cache.put("v2", "a", {"value": 2})
+    # Reading another version keeps the results of the previous one
+    assert cache.get("v1", "a") == {"value": 1}
+    assert cache.get("v2", "a") == {"value": 2}
+    assert cache.stats()["entries"] == 2
+
+
+def test_compute_metrics_uses_cache(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    cache = ResultCache(max_entries=10, max_bytes=10**7)
+    with patch.dict(
+        "backend.src.app.configs.constants.CONFIGS",
+        {"HISTORICAL_SNAPSHOT": snapshot},
+    ), patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=cache,
+    ):
+        result = asyncio.run(compute_metrics(Params(store=[16, 60, 180])))
+        cached = asyncio.run(compute_metrics(Params(store=[180, 60, 16])))
+    assert cached is result
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,94 @@
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import DataForm, TimeResolution
+from backend.src.app.schemas.performance_metrics import Params, TrendParams
+from backend.src.app.services.business_services.columns import (
+    downcast_columns,
+    get_column_requirements,
+    get_required_columns,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    evaluate_metrics,
+    evaluate_trend,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+def test_required_columns():
+    assert set(get_required_columns()) == set(make_kpi_frame(1).columns)
+
+
+def test_queue_models_columns_are_required():
+    requirements = get_column_requirements()
+    assert "weekday_name" in requirements["optimizer"]
+    for consumer in ("remodel", "optimizer", "simulation"):
+        assert {"store_name", "hour", "type_of_checkout"} <= set(
+            requirements[consumer]
+        )
+
+
+def test_downcast_columns():
+    df = pd.DataFrame(
+        {
+            "hour": np.array([6, 22], dtype=np.int64),
+            "new_clusters": np.array([1, 300], dtype=np.int64),
+            "avg_waiting_time_Tq": [12.5, float("nan")],
+            "avg_num_wait_queue_Nq": [1.0, 1e9 + 0.5],
+            "store_name": np.array([16, 29], dtype=np.int64),
+        }
+    )
+    df = downcast_columns(df, float_tolerance=1e-3)
+    assert df.dtypes.astype(str).to_dict() == {
+        "hour": "int8",
+        "new_clusters": "int64",
+        "avg_waiting_time_Tq": "float32",
+        "avg_num_wait_queue_Nq": "float64",
+        "store_name": "int64",
+    }
+
+
+@pytest.mark.parametrize(
+    "evaluate, params",
+    [
+        (evaluate_metrics, Params()),
+        (
+            evaluate_metrics,
+            Params(store=[16, 29], start_date=date(2023, 3, 8)),
+        ),
+        (
+            evaluate_metrics,
+            Params(data_form=DataForm.REMODEL, time_period=90),
+        ),
+        (evaluate_metrics, Params(approximate=True)),
+        (evaluate_trend, TrendParams(resolution=TimeResolution.WEEK)),
+        (evaluate_trend, TrendParams(resolution=TimeResolution.HOUR)),
+    ],
+)
+def test_downcast_metrics_match(evaluate, params):
+    raw = make_kpi_frame(5000)
+    expected_snapshot = DataSnapshot(raw.copy())
+    snapshot = DataSnapshot(downcast_columns(raw.copy()))
+    assert snapshot.frame["hour"].dtype == np.int8
+    assert sum(snapshot.memory_usage.values()) < sum(
+        expected_snapshot.memory_usage.values()
+    )
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": expected_snapshot}):
+        _, expected = evaluate(params)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        _, result = evaluate(params)
+    assert list(result) == list(expected)
+    for metric_name, frame in result.items():
+        pd.testing.assert_frame_equal(
+            frame, expected[metric_name], check_dtype=False, rtol=1e-5
+        )
@@ -0,0 +1,119 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import EVENTS, LaneType
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.indexes import DateIndex
+from backend.src.app.services.business_services.performance_metrics import (
+    filter_df,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+def filter_with_mask(params: Params, df: pd.DataFrame) -> pd.DataFrame:
+    mask = (df["new_clusters"] == params.cluster) & df["store_name"].isin(
+        params.store
+    )
+    mask &= df["type_of_checkout"].isin(
+        [lane_type.value for lane_type in params.lane_types]
+    )
+    mask &= df["peak_hour"].isin(params.peak_hour)
+    if params.covid_flag:
+        mask &= df["Covid_Effect"] == 1
+    if params.events_flag:
+        mask &= df["event"].isin(EVENTS)
+    if params.october_flag:
+        mask &= df["date"].dt.month == 10
+    if params.total_year_flag or params.time_period or params.end_date:
+        mask &= df["date"].notna()
+    if params.start_date:
+        mask &= df["date"] >= pd.Timestamp(params.start_date)
+    if params.end_date:
+        mask &= df["date"] <= pd.Timestamp(params.end_date)
+    return df[mask]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        Params(),
+        Params(cluster=2, store=[16, 29, 45, 45], peak_hour=[1]),
+        Params(
+            cluster=3,
+            lane_types=[LaneType.SCO_BULLPEN, LaneType.MANNED_EXPRESS],
+            covid_flag=True,
+        ),
+        Params(cluster=4, events_flag=True, october_flag=True),
+        Params(cluster=2, total_year_flag=True),
+        Params(cluster=2, start_date=date(2023, 3, 15)),
+        Params(
+            cluster=3,
+            start_date=date(2023, 2, 1),
+            end_date=date(2023, 2, 28),
+        ),
+        Params(peak_hour=[1], end_date=date(2023, 6, 30)),
+    ],
+)
+def test_filter_df_matches_mask(kpi_frame, params):
+    snapshot = DataSnapshot(kpi_frame)
+    result = filter_df(params=params, kpi_data=snapshot)
+    expected = filter_with_mask(params, snapshot.frame)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_filter_df_unknown_value(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    result = filter_df(params=Params(store=[999]), kpi_data=snapshot)
+    assert result.empty
+
+
+def test_filter_df_empty_snapshot(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame.iloc[:0].copy())
+    with pytest.raises(EmptyDataError, match="No data found"):
+        filter_df(params=Params(), kpi_data=snapshot)
+
+
+@pytest.mark.parametrize("store", [[16, 29], [16, 60, 180]])
+def test_filter_df_time_period(kpi_frame, store):
+    kpi_frame.loc[[0, 5], "date"] = None
+    snapshot = DataSnapshot(kpi_frame)
+    result = filter_df(
+        params=Params(time_period=30, store=store), kpi_data=snapshot
+    )
+    # The last 30 days up to the latest date
+    expected = filter_with_mask(
+        Params(
+            start_date=date(2023, 12, 2),
+            end_date=date(2023, 12, 31),
+            store=store,
+        ),
+        snapshot.frame,
+    )
+    assert not expected.empty
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_date_index_unsorted_dates():
+    rng = np.random.default_rng(3)
+    dates = pd.Series(
+        pd.Timestamp("2023-01-01")
+        + pd.to_timedelta(rng.integers(0, 60, 500), unit="D")
+    )
+    dates[rng.choice(500, 20, replace=False)] = pd.NaT
+    date_index = DateIndex(dates)
+    assert not date_index.is_sorted
+    assert date_index.num_dated == 480
+    assert date_index.first == dates.min()
+    assert date_index.last == dates.max()
+
+    start, end = pd.Timestamp("2023-01-10"), pd.Timestamp("2023-02-01")
+    rows = date_index.select(start, end)
+    np.testing.assert_array_equal(
+        rows, np.flatnonzero((dates >= start) & (dates < end))
+    )
+    rebuilt = DateIndex.from_arrays(dates.to_numpy(), date_index.order)
+    np.testing.assert_array_equal(rebuilt.select(start, end), rows)
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.services.business_services.metrics.fused import (
+    calculate_fused_means,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+@pytest.mark.parametrize("use_snapshot", [False, True])
+def test_fused_means_match_metric_functions(kpi_frame, use_snapshot):
+    kpi_frame.loc[::9, "avg_waiting_time_Tq"] = np.nan
+    kpi_frame.loc[::17, "Wait_Time_BKT"] = np.nan
+    data = DataSnapshot(kpi_frame).frame if use_snapshot else kpi_frame
+    metric_means = calculate_fused_means(data, wait_time_metrics)
+    for metric_name, metric in wait_time_metrics.items():
+        pd.testing.assert_frame_equal(
+            metric.shape(metric_means[metric_name]), metric(data)
+        )
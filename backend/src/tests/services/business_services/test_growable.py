@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.services.business_services.growable import (
+    GrowableArray,
+    GrowableFrame,
+)
+
+
+def test_growable_array_keeps_older_views():
+    array = GrowableArray.wrap(np.arange(4))
+    grown = array.append(np.arange(4, 6))
+    assert grown.view.tolist() == [0, 1, 2, 3, 4, 5]
+    # The first append copies into a buffer with spare capacity, the next
+    # ones write in place
+    longer = grown.append([6])
+    assert np.shares_memory(longer.view, grown.view)
+    assert grown.view.tolist() == [0, 1, 2, 3, 4, 5]
+
+    # Appending to an older version does not overwrite the newer one
+    branch = grown.append([9])
+    assert branch.view.tolist() == [0, 1, 2, 3, 4, 5, 9]
+    assert longer.view.tolist() == [0, 1, 2, 3, 4, 5, 6]
+    assert array.view.tolist() == [0, 1, 2, 3]
+
+    with pytest.raises(ValueError):
+        array.append(np.array([0.5]))
+
+
+def test_growable_array_checks_narrow_ranges():
+    array = GrowableArray.wrap(np.arange(4, dtype=np.int8))
+    assert array.append(np.array([100])).view.dtype == np.int8
+    with pytest.raises(ValueError):
+        array.append(np.array([1000]))
+
+
+def test_growable_frame_extends_categories():
+    df = pd.DataFrame(
+        {
+            "lane": pd.Categorical(["a", "b", "a"]),
+            "wait": [1.0, 2.0, 3.0],
+        }
+    )
+    frame = GrowableFrame.wrap(df)
+    grown = frame.append(
+        pd.DataFrame({"lane": ["c", None, "b"], "wait": [4.0, 5.0, 6.0]})
+    )
+    assert grown.frame["lane"].tolist() == ["a", "b", "a", "c", np.nan, "b"]
+    assert grown.frame["lane"].cat.categories.tolist() == ["a", "b", "c"]
+    assert grown.frame["wait"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert frame.frame is df
+
+    with pytest.raises(ValueError):
+        frame.append(pd.DataFrame({"lane": ["a"]}))
+
+
+def test_growable_frame_merges_categories_in_order():
+    df = pd.DataFrame({"lane": pd.Categorical(["b", "d", None, "b"])})
+    frame = GrowableFrame.wrap(df)
+    grown = frame.append(pd.DataFrame({"lane": ["e", "a", "c"]}))
+    lanes = grown.frame["lane"]
+    assert lanes.cat.categories.tolist() == ["a", "b", "c", "d", "e"]
+    assert lanes.tolist() == ["b", "d", np.nan, "b", "e", "a", "c"]
+    assert df["lane"].cat.codes.tolist() == [0, 1, -1, 0]
+
+    # Values sorting after the categories keep the codes of the rows
+    lanes = frame.append(pd.DataFrame({"lane": ["e"]})).frame["lane"]
+    assert lanes.cat.categories.tolist() == ["b", "d", "e"]
+    assert lanes.cat.codes.tolist() == [0, 1, -1, 0, 2]
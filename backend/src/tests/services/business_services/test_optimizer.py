@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import (
+    MAX_LANES,
+    LaneOptimizationParams,
+)
+from backend.src.app.services.business_services.cache import (
+    get_result_cache,
+)
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.optimizer import (
+    OPTIMIZATION_QUEUE_COLUMNS,
+    optimize_lanes,
+    search_min_lanes,
+)
+from backend.src.app.services.business_services.remodel import QueueModel
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+@pytest.fixture
+def snapshot(kpi_frame):
+    get_result_cache().clear()
+    snapshot = DataSnapshot(kpi_frame)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        yield snapshot
+
+
+def test_search_finds_the_fewest_lanes(snapshot):
+    model = QueueModel(snapshot.frame, OPTIMIZATION_QUEUE_COLUMNS)
+    target = 30.0
+    lanes = search_min_lanes(model, target)
+
+    # Exhaustive search over every lane count
+    wait_times = np.stack(
+        [
+            model.evaluate(np.full(len(model), count))[0]
+            for count in range(1, MAX_LANES + 1)
+        ]
+    )
+    within = wait_times <= target
+    expected = np.where(
+        within.any(axis=0), within.argmax(axis=0) + 1, MAX_LANES
+    )
+    np.testing.assert_array_equal(lanes, expected)
+
+
+def test_optimize_lanes(snapshot):
+    params = LaneOptimizationParams(
+        store=[60, 16, 29], lane_types=[LaneType.SCO_BULLPEN]
+    )
+    with patch.dict("os.environ", {"COMPUTE_MAX_WORKERS": "2"}):
+        result = asyncio.run(optimize_lanes(params))
+
+    assert sorted(result["store_name"].unique()) == [16, 29, 60]
+    assert set(result["type_of_checkout"]) == {LaneType.SCO_BULLPEN.value}
+    assert result["meets_target"].all()
+    assert (result["avg_waiting_time_Tq"] <= params.target_wait_time).all()
+    assert len(result) == len(
+        result.drop_duplicates(OPTIMIZATION_QUEUE_COLUMNS)
+    )
+    # Queues above the target before need more lanes than the baseline
+    above = result["baseline_waiting_time_Tq"] > params.target_wait_time
+    assert (
+        result.loc[above, "lanes"] > result.loc[above, "baseline_lanes"]
+    ).all()
+
+
+def test_optimize_unknown_stores(snapshot):
+    with pytest.raises(EmptyDataError):
+        asyncio.run(optimize_lanes(LaneOptimizationParams(store=[1, 2])))
@@ -0,0 +1,192 @@
+import asyncio
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.cache import ResultCache
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.metrics.wait_time import (
+    calculate_average_people_in_line_by_bucket,
+    calculate_average_wait_time_by_bucket,
+    calculate_average_wait_time_by_hour,
+    calculate_average_wait_time_by_weekday,
+    calculate_wait_time_vs_queue_length,
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    calculate_and_format_metrics,
+    evaluate_metrics,
+    get_history_df,
+    get_metric_parts,
+    stream_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.app.services.business_services.utils import (
+    extract_unique_values,
+    get_enum_values,
+)
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+def test_calculate_average_wait_time_by_bucket():
+    data = pd.DataFrame(
+        {
+            "Wait_Time_BKT": [" 0 - 30 sec", "30 sec - 1 min"],
+            "type_of_checkout": ["self", "self"],
+            "avg_waiting_time_Tq": [10, 20],
+        }
+    )
+    result = calculate_average_wait_time_by_bucket(data)
+    assert "self" in result.columns
+    assert result["self"].tolist() == [10, 20, 0, 0, 0, 0, 0]
+
+
+def test_calculate_average_wait_time_by_weekday():
+    data = pd.DataFrame(
+        {
+            "weekday_name": ["Monday", "Tuesday"],
+            "type_of_checkout": ["self", "self"],
+            "avg_waiting_time_Tq": [15, 25],
+        }
+    )
+    result = calculate_average_wait_time_by_weekday(data)
+    assert "self" in result.columns
+    assert result["self"].tolist() == [15, 25, 0, 0, 0, 0, 0]
+
+
+def test_calculate_average_people_in_line_by_bucket():
+    data = pd.DataFrame(
+        {
+            "avg_num_wait_queue_Nq": [2, 4, 6, 8, 10, 12],
+            "type_of_checkout": ["self"] * 6,
+        }
+    )
+    result = calculate_average_people_in_line_by_bucket(data)
+    assert "self" in result.columns
+    assert result["self"].tolist() == [0, 2, 4, 6, 8, 10, 12]
+
+
+def test_calculate_average_wait_time_by_hour():
+    data = pd.DataFrame(
+        {
+            "hour": [9, 10],
+            "type_of_checkout": ["self", "self"],
+            "avg_waiting_time_Tq": [5, 15],
+        }
+    )
+    result = calculate_average_wait_time_by_hour(data)
+    assert "self" in result.columns
+    assert result["self"].tolist() == [5, 15]
+
+
+def test_calculate_wait_time_vs_queue_length():
+    data = pd.DataFrame(
+        {
+            "hour": [9, 10],
+            "type_of_checkout": ["self", "self"],
+            "avg_waiting_time_Tq": [5, 15],
+            "avg_num_wait_queue_Nq": [10, 20],
+        }
+    )
+    result = calculate_wait_time_vs_queue_length(data)
+    assert result["avg_wait_time"]["self"].tolist() == [5, 15]
+    assert result["avg_queue_length"]["self"].tolist() == [10, 20]
+
+
+def test_extract_unique_values():
+    series = pd.Series(["self", "manned", "self", "manned"])
+    assert set(extract_unique_values(series)) == {"self", "manned"}
+
+
+def test_get_enum_values():
+    lane_types = [
+        LaneType.MANNED_TRADITIONAL,
+        LaneType.REVERSIBLE_MCO_TRADITIONAL_EXPRESS,
+    ]
+    assert get_enum_values(lane_types) == [
+        LaneType.MANNED_TRADITIONAL.value,
+        LaneType.REVERSIBLE_MCO_TRADITIONAL_EXPRESS.value,
+    ]
+
+
+@patch.dict(CONFIGS_PATH, {}, clear=True)
+def test_get_history_df_no_data():
+    with pytest.raises(EmptyDataError, match="No data found"):
+        get_history_df()
+
+
+@patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": pd.DataFrame()})
+def test_get_history_df_invalid_data():
+    with pytest.raises(EmptyDataError, match="Invalid data format"):
+        get_history_df()
+
+
+def test_calculate_and_format_metrics_empty_df():
+    with pytest.raises(
+        EmptyDataError, match="No data found for the given filters"
+    ):
+        calculate_and_format_metrics(pd.DataFrame(), wait_time_metrics)
+
+
+@pytest.mark.parametrize(
+    "params", [Params(store=[16, 29]), Params(total_year_flag=True)]
+)
+def test_evaluate_metrics(kpi_frame, params):
+    snapshot = DataSnapshot(kpi_frame)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        version, result = evaluate_metrics(params)
+    assert version == snapshot.version
+    assert list(result) == list(wait_time_metrics)
+    assert all(not df.empty for df in result.values())
+
+
+def collect_stream(params: Params) -> list:
+    async def collect():
+        return [item async for item in stream_metrics(params)]
+
+    return asyncio.run(collect())
+
+
+def test_get_metric_parts():
+    assert get_metric_parts(wait_time_metrics) == [
+        ["avg_wait_time_by_bucket"],
+        ["avg_wait_time_by_weekday", "avg_people_in_line_by_weekday"],
+        ["avg_people_in_line_by_bucket"],
+        ["avg_wait_time_by_hour", "wait_time_vs_queue_length"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "params", [Params(store=[16, 29]), Params(approximate=True)]
+)
+def test_stream_metrics(kpi_frame, params):
+    snapshot = DataSnapshot(kpi_frame)
+    result_cache = ResultCache(max_entries=10, max_bytes=10**7)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}), patch(
+        "backend.src.app.services.business_services.performance_metrics"
+        ".get_result_cache",
+        return_value=result_cache,
+    ):
+        _, expected = evaluate_metrics(params)
+        streamed = collect_stream(params)
+        assert sorted(name for name, _ in streamed) == sorted(expected)
+        for metric_name, frame in streamed:
+            pd.testing.assert_frame_equal(frame, expected[metric_name])
+
+        # The second stream is read from the cache
+        cached = collect_stream(params)
+    assert result_cache.hits == 1
+    assert sorted(name for name, _ in cached) == sorted(expected)
+
+
+def test_stream_metrics_no_data(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    params = Params(store=[1])
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        with pytest.raises(EmptyDataError):
+            collect_stream(params)
@@ -0,0 +1,112 @@
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import DataForm, LaneType
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.filters import (
+    get_date_window,
+    get_filter_predicates,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    evaluate_metrics,
+)
+from backend.src.app.services.business_services.query_backends import (
+    DuckDBBackend,
+    PandasBackend,
+    QueryBackend,
+    get_query_backend,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+SCENARIOS = [
+    Params(),
+    Params(store=[16, 29], peak_hour=[1]),
+    Params(
+        cluster=2,
+        lane_types=[LaneType.SCO_BULLPEN, LaneType.MANNED_TRADITIONAL],
+    ),
+    Params(covid_flag=True, events_flag=True),
+    Params(october_flag=True),
+    Params(start_date=date(2023, 3, 8), end_date=date(2023, 6, 7)),
+    Params(time_period=45, store=[60]),
+]
+
+
+@pytest.fixture(scope="module")
+def duckdb_backend():
+    pytest.importorskip("duckdb")
+    return DuckDBBackend(threads=2)
+
+
+def calculate_means(backend, snapshot: DataSnapshot, params: Params) -> dict:
+    return backend.calculate_means(
+        snapshot,
+        get_filter_predicates(params),
+        get_date_window(params, snapshot.dates),
+        wait_time_metrics,
+    )
+
+
+@pytest.mark.parametrize("params", SCENARIOS)
+def test_backends_match(kpi_frame, duckdb_backend, params):
+    snapshot = DataSnapshot(kpi_frame)
+    expected = calculate_means(PandasBackend(), snapshot, params)
+    result = calculate_means(duckdb_backend, snapshot, params)
+    assert list(result) == list(expected)
+    for metric_name, means in result.items():
+        pd.testing.assert_frame_equal(means, expected[metric_name])
+
+
+def test_backends_match_missing_values(kpi_frame, duckdb_backend):
+    kpi_frame = kpi_frame.copy()
+    kpi_frame.loc[::7, "avg_waiting_time_Tq"] = float("nan")
+    kpi_frame.loc[::11, "type_of_checkout"] = None
+    snapshot = DataSnapshot(kpi_frame)
+    expected = calculate_means(PandasBackend(), snapshot, Params())
+    result = calculate_means(duckdb_backend, snapshot, Params())
+    for metric_name, means in result.items():
+        pd.testing.assert_frame_equal(means, expected[metric_name])
+
+
+def test_duckdb_no_data(kpi_frame, duckdb_backend):
+    snapshot = DataSnapshot(kpi_frame)
+    with pytest.raises(EmptyDataError):
+        calculate_means(duckdb_backend, snapshot, Params(store=[1]))
+
+
+@pytest.mark.parametrize("data_form", [DataForm.HISTORICAL, DataForm.REMODEL])
+def test_evaluate_metrics_on_duckdb(kpi_frame, monkeypatch, data_form):
+    pytest.importorskip("duckdb")
+    snapshot = DataSnapshot(kpi_frame)
+    params = Params(data_form=data_form, time_period=90)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        _, expected = evaluate_metrics(params)
+        monkeypatch.setenv("QUERY_BACKEND", "duckdb")
+        assert isinstance(get_query_backend(), DuckDBBackend)
+        _, result = evaluate_metrics(params)
+    for metric_name, frame in result.items():
+        pd.testing.assert_frame_equal(frame, expected[metric_name])
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv("QUERY_BACKEND", "spark")
+    with pytest.raises(ImproperlyConfigured):
+        get_query_backend()
+
+
+def test_backends_implement_calculate_means():
+    class PartialBackend(QueryBackend):
+        name = "partial"
+
+    with pytest.raises(TypeError):
+        PartialBackend()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from backend.src.app.services.business_services.queueing import (
+    calculate_erlang_c,
+    calculate_queue_length,
+    calculate_wait,
+    solve_utilization,
+)
+
+
+def test_erlang_c_matches_closed_forms():
+    # M/M/1 waits with probability ρ, M/M/2 with 2ρ² / (1 + ρ)
+    utilization = np.array([0.1, 0.5, 0.9])
+    np.testing.assert_allclose(calculate_erlang_c(1, utilization), utilization)
+    np.testing.assert_allclose(
+        calculate_erlang_c(2, 2 * utilization),
+        2 * utilization**2 / (1 + utilization),
+    )
+
+
+def test_wait_of_mixed_server_counts():
+    servers = np.array([1, 2, 3, 2])
+    arrival_rate = np.array([0.5, 1.0, 0.0, 3.0])
+    wait_time, queue_length = calculate_wait(arrival_rate, 1.0, servers)
+
+    # M/M/1: Wq = ρ / (μ - λ), M/M/2 at ρ = 0.5: Lq = 1/3
+    np.testing.assert_allclose(wait_time[:3], [1.0, 1 / 3, 0.0])
+    np.testing.assert_allclose(queue_length[:3], [0.5, 1 / 3, 0.0])
+    assert np.isinf(wait_time[3]) and np.isinf(queue_length[3])
+
+
+def test_solve_utilization_inverts_queue_length():
+    servers = np.array([1, 4, 8, 8])
+    utilization = np.array([0.3, 0.7, 0.95, 0.0])
+    queue_length = calculate_queue_length(servers, utilization)
+
+    np.testing.assert_allclose(
+        solve_utilization(servers, queue_length), utilization, atol=1e-9
+    )
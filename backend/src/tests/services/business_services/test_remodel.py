@@ -0,0 +1,189 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import (
+    BASELINE_LANE_COUNTS,
+    DataForm,
+    LaneType,
+)
+from backend.src.app.errors import ImproperlyConfigured
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.cache import (
+    get_result_cache,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    assign_wait_time_bucket,
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    calculate_and_format_metrics,
+    compute_metrics,
+)
+from backend.src.app.services.business_services.remodel import (
+    LANE_TYPES,
+    BaselineLaneCounts,
+    UNSTABLE_WAIT_TIME,
+    QueueModel,
+    RemodelSnapshot,
+    remodel_frame,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+@pytest.fixture
+def snapshot(kpi_frame):
+    # The wait time buckets follow the wait times, as in the history
+    kpi_frame["Wait_Time_BKT"] = assign_wait_time_bucket(
+        kpi_frame["avg_waiting_time_Tq"]
+    )
+    return DataSnapshot(kpi_frame)
+
+
+@pytest.fixture
+def model(snapshot):
+    return QueueModel(snapshot.frame)
+
+
+def test_model_reproduces_the_history(snapshot, model):
+    means = snapshot.frame.groupby(
+        ["store_name", "hour", "type_of_checkout"], observed=True
+    )["avg_waiting_time_Tq"].mean()
+    np.testing.assert_allclose(model.baseline_wait_time, means.to_numpy())
+
+    remodeled = remodel_frame(snapshot.frame, model, {})
+    np.testing.assert_allclose(
+        remodeled["avg_waiting_time_Tq"], snapshot.frame["avg_waiting_time_Tq"]
+    )
+    assert (
+        remodeled["Wait_Time_BKT"] == snapshot.frame["Wait_Time_BKT"]
+    ).all()
+
+
+def test_more_lanes_wait_less(model):
+    configurations = np.array(
+        [
+            [
+                BASELINE_LANE_COUNTS[lane_type] + extra
+                for lane_type in LANE_TYPES
+            ]
+            for extra in range(4)
+        ]
+    )
+    wait_time, queue_length = model.evaluate(
+        model.get_configuration_lanes(configurations)
+    )
+    assert wait_time.shape == (4, len(model))
+    assert (np.diff(wait_time, axis=0) <= 0).all()
+    assert (np.diff(queue_length, axis=0) <= 0).all()
+
+
+def test_unstable_queues_are_capped(snapshot, model):
+    remodeled = remodel_frame(
+        snapshot.frame, model, {lane_type: 1 for lane_type in LaneType}
+    )
+    wait_time = remodeled["avg_waiting_time_Tq"]
+    assert np.isfinite(wait_time).all()
+    assert (wait_time == UNSTABLE_WAIT_TIME).any()
+    assert (
+        remodeled.loc[wait_time == UNSTABLE_WAIT_TIME, "Wait_Time_BKT"]
+        == "> 3min"
+    ).all()
+    # The snapshot frame is shared and left as is
+    assert (snapshot.frame["avg_waiting_time_Tq"] < UNSTABLE_WAIT_TIME).all()
+
+
+def test_remodel_data_form(snapshot):
+    get_result_cache().clear()
+    lane_counts = {LaneType.SCO_BULLPEN: 12}
+    params = Params(data_form=DataForm.REMODEL, lane_counts=lane_counts)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        frames = asyncio.run(compute_metrics(params))
+        baseline = asyncio.run(
+            compute_metrics(Params(data_form=DataForm.REMODEL))
+        )
+        historical = asyncio.run(compute_metrics(Params()))
+
+    remodeled = RemodelSnapshot(snapshot, lane_counts)
+    assert remodeled.version == snapshot.version
+    expected = calculate_and_format_metrics(
+        remodeled.frame.take(snapshot.index.select({"new_clusters": [1]})),
+        wait_time_metrics,
+    )
+    for metric_name in wait_time_metrics:
+        pd.testing.assert_frame_equal(
+            frames[metric_name], expected[metric_name]
+        )
+        pd.testing.assert_frame_equal(
+            baseline[metric_name], historical[metric_name]
+        )
+    by_hour = frames["avg_wait_time_by_hour"].set_index("hour")
+    historical_by_hour = historical["avg_wait_time_by_hour"].set_index("hour")
+    assert (
+        by_hour[LaneType.SCO_BULLPEN.value]
+        < historical_by_hour[LaneType.SCO_BULLPEN.value]
+    ).all()
+
+
+def test_lane_counts_are_validated():
+    with pytest.raises(ValueError):
+        Params(lane_counts={LaneType.SCO_BULLPEN: 0})
+
+
+def test_baseline_lane_counts_per_store(snapshot):
+    baseline = BaselineLaneCounts(
+        stores={16: {LaneType.SCO_BULLPEN: 12}},
+        default={LaneType.MANNED_EXPRESS: 3},
+    )
+    model = QueueModel(snapshot.frame, baseline=baseline)
+    queues = model.queues
+    bullpen = queues["type_of_checkout"] == LaneType.SCO_BULLPEN.value
+    express = queues["type_of_checkout"] == LaneType.MANNED_EXPRESS.value
+    store = queues["store_name"] == 16
+    assert (model.baseline_lanes[bullpen & store] == 12).all()
+    assert (model.baseline_lanes[bullpen & ~store] == 8).all()
+    assert (model.baseline_lanes[express] == 3).all()
+    # The lane types missing from a request keep the baseline of the store
+    lanes = model.get_lanes({LaneType.MANNED_EXPRESS: 5})
+    assert (lanes[express] == 5).all()
+    np.testing.assert_array_equal(
+        lanes[~express], model.baseline_lanes[~express]
+    )
+
+    means = snapshot.frame.groupby(
+        ["store_name", "hour", "type_of_checkout"], observed=True
+    )["avg_waiting_time_Tq"].mean()
+    np.testing.assert_allclose(model.baseline_wait_time, means.to_numpy())
+
+
+def test_baseline_lane_counts_from_file(tmp_path):
+    path = tmp_path / "lanes.json"
+    path.write_text(
+        '{"default": {"SCO Bullpen": 10}, "16": {"Manned Express": 3}}'
+    )
+    baseline = BaselineLaneCounts.from_file(str(path))
+    assert baseline.get(16)[LaneType.MANNED_EXPRESS] == 3
+    assert baseline.get(16)[LaneType.SCO_BULLPEN] == 10
+    assert baseline.get(29) == {
+        **BASELINE_LANE_COUNTS,
+        LaneType.SCO_BULLPEN: 10,
+    }
+    assert str(path) in baseline.assumption
+
+    for content in [
+        '{"16": {"Drive Through": 3}}',
+        '{"16": {"SCO Bullpen": 0}}',
+        '{"store": {"SCO Bullpen": 2}}',
+        "[]",
+    ]:
+        path.write_text(content)
+        with pytest.raises(ImproperlyConfigured):
+            BaselineLaneCounts.from_file(str(path))
+    with pytest.raises(ImproperlyConfigured):
+        BaselineLaneCounts.from_file(str(tmp_path / "missing.json"))
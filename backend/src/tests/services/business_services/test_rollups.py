@@ -0,0 +1,140 @@
+import asyncio
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import TimeResolution
+from backend.src.app.schemas.performance_metrics import Params, TrendParams
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.metrics.trend import (
+    get_trend_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    compute_trend,
+    evaluate_trend,
+    filter_df,
+)
+from backend.src.app.services.business_services.rollups import (
+    ceil_date,
+    floor_period,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+def trend_from_rows(params: TrendParams, snapshot: DataSnapshot) -> dict:
+    filtered_df = filter_df(params=Params(**dict(params)), kpi_data=snapshot)
+    filtered_df = filtered_df[filtered_df["date"].notna()]
+    return {
+        name: metric(filtered_df)
+        for name, metric in get_trend_metrics(params.resolution).items()
+    }
+
+
+def test_floor_period():
+    dates = pd.to_datetime(
+        [
+            "2023-01-01 13:30",
+            "2023-01-02 00:00",
+            "2023-02-28 00:00",
+            "2023-03-05 00:00",
+        ]
+    ).to_numpy()
+    assert list(floor_period(dates, TimeResolution.WEEK)) == list(
+        pd.to_datetime(
+            ["2022-12-26", "2023-01-02", "2023-02-27", "2023-02-27"]
+        ).to_numpy()
+    )
+    assert list(floor_period(dates, TimeResolution.MONTH)) == list(
+        pd.to_datetime(
+            ["2023-01-01", "2023-01-01", "2023-02-01", "2023-03-01"]
+        ).to_numpy()
+    )
+    assert pd.Timestamp(
+        floor_period(dates, TimeResolution.HOUR)[0]
+    ) == pd.Timestamp("2023-01-01 13:00")
+    assert ceil_date(
+        pd.Timestamp("2023-01-15"), TimeResolution.MONTH
+    ) == pd.Timestamp("2023-02-01")
+    assert ceil_date(
+        pd.Timestamp("2023-01-02"), TimeResolution.WEEK
+    ) == pd.Timestamp("2023-01-02")
+
+
+def test_rollups_roll_up_days(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    rollups = snapshot.rollups
+    totals = [
+        rollups.cells[resolution][rollups.total_columns].sum()
+        for resolution in rollups.cells
+    ]
+    for total in totals[1:]:
+        pd.testing.assert_series_equal(total, totals[0])
+    assert totals[0]["avg_waiting_time_Tq__count"] == len(kpi_frame)
+    assert (
+        len(rollups.cells[TimeResolution.MONTH])
+        < len(rollups.cells[TimeResolution.WEEK])
+        < len(rollups.cells[TimeResolution.DAY])
+    )
+
+
+@pytest.mark.parametrize(
+    "resolution",
+    [TimeResolution.DAY, TimeResolution.WEEK, TimeResolution.MONTH],
+)
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"store": [16, 29, 60], "peak_hour": [1]},
+        # Ranges cutting weeks and months on both sides
+        {"start_date": date(2023, 2, 15), "end_date": date(2023, 6, 7)},
+        {"start_date": date(2023, 3, 8), "end_date": date(2023, 3, 10)},
+        {"time_period": 45, "covid_flag": True},
+    ],
+)
+def test_trend_from_rollups_matches_rows(kpi_frame, resolution, params):
+    snapshot = DataSnapshot(kpi_frame)
+    params = TrendParams(resolution=resolution, **params)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        version, result = evaluate_trend(params)
+    assert version == snapshot.version
+    expected = trend_from_rows(params, snapshot)
+    assert list(result) == list(expected)
+    for name, frame in result.items():
+        pd.testing.assert_frame_equal(frame, expected[name])
+
+
+def test_hourly_trend(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    params = TrendParams(
+        resolution=TimeResolution.HOUR, start_date=date(2023, 5, 1)
+    )
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        _, result = evaluate_trend(params)
+    periods = result["avg_wait_time_trend"]["period"]
+    assert periods.is_monotonic_increasing
+    assert periods.iloc[0] >= "2023-05-01 06:00"
+    assert periods.str.endswith(":00").all()
+
+
+def test_trend_is_cached(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    params = TrendParams(resolution=TimeResolution.MONTH)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        first = asyncio.run(compute_trend(params))
+        second = asyncio.run(compute_trend(params))
+    assert second is first
+    assert len(first["avg_wait_time_trend"]) == 12
+
+
+def test_trend_no_data(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    params = TrendParams(start_date=date(2030, 1, 1))
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        with pytest.raises(EmptyDataError):
+            evaluate_trend(params)
@@ -0,0 +1,175 @@
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import DataForm
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services.business_services.metrics.fused import (
+    calculate_fused_means,
+)
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    evaluate_metrics,
+    filter_df,
+    filter_sample,
+)
+from backend.src.app.services.business_services.sampling import (
+    STRATA_COLUMNS,
+    estimate_fused_means,
+    get_t_quantile,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+def evaluate(snapshot: DataSnapshot, params: Params) -> dict:
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        return evaluate_metrics(params)[1]
+
+
+def get_stratum_sizes(frame: pd.DataFrame) -> pd.Series:
+    return frame.groupby(STRATA_COLUMNS, observed=True).size()
+
+
+def test_t_quantile():
+    z_score = 1.959963984540054
+    np.testing.assert_allclose(
+        get_t_quantile(z_score, [2, 5, 30]),
+        [4.303, 2.571, 2.042],
+        rtol=0.01,
+    )
+
+
+def test_sample_holds_every_stratum(monkeypatch):
+    monkeypatch.setenv("SAMPLE_STRATUM_SIZE", "3")
+    snapshot = DataSnapshot(make_kpi_frame(5000))
+    sample = snapshot.sample
+    stratum_sizes = get_stratum_sizes(snapshot.frame)
+    sampled_sizes = get_stratum_sizes(sample.frame)
+    pd.testing.assert_series_equal(sampled_sizes, stratum_sizes.clip(upper=3))
+    populations = sample.frame.groupby(STRATA_COLUMNS, observed=True)[
+        "__population"
+    ].first()
+    pd.testing.assert_series_equal(
+        populations, stratum_sizes, check_names=False
+    )
+    assert sample.dates.is_sorted
+
+
+def test_full_sample_is_exact(kpi_frame, monkeypatch):
+    # Every stratum is sampled whole, the estimates are the exact means
+    monkeypatch.setenv("SAMPLE_STRATUM_SIZE", str(len(kpi_frame)))
+    snapshot = DataSnapshot(kpi_frame)
+    params = Params(store=[16, 29, 45], start_date=date(2023, 3, 1))
+    approximate = evaluate(
+        snapshot, params.model_copy(update={"approximate": True})
+    )
+    exact = evaluate(snapshot, params)
+    for metric_name, frame in exact.items():
+        pd.testing.assert_frame_equal(approximate[metric_name], frame)
+        # The margins of the groups with a single row are unknown
+        margins = approximate[f"{metric_name}_margin"]
+        margins = margins.iloc[:, 1:].to_numpy(dtype=float)
+        assert ((margins == 0) | np.isnan(margins)).all()
+    assert approximate["approximation"]["sampled_rows"].iloc[0] == len(
+        filter_df(params, snapshot)
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        Params(),
+        Params(cluster=2, peak_hour=[1]),
+        Params(start_date=date(2023, 4, 1), end_date=date(2023, 9, 30)),
+    ],
+)
+def test_intervals_cover_exact_means(params, monkeypatch):
+    monkeypatch.setenv("SAMPLE_STRATUM_SIZE", "4")
+    snapshot = DataSnapshot(make_kpi_frame(30000))
+    estimates = estimate_fused_means(
+        filter_sample(params, snapshot), wait_time_metrics
+    )
+    exact = calculate_fused_means(
+        filter_df(params, snapshot), wait_time_metrics
+    )
+    covered = known = 0
+    for metric_name, (means, margins) in estimates.items():
+        expected = exact[metric_name].reindex(means.index)
+        is_known = margins.notna().to_numpy()
+        covered += (
+            ((expected - means).abs() <= margins).to_numpy() & is_known
+        ).sum()
+        known += is_known.sum()
+    assert known > 0
+    # Intervals at 95% from strata of 4 rows cover a bit less than 95%
+    assert covered / known > 0.85
+
+
+def test_unknown_margins_are_left_missing(monkeypatch):
+    monkeypatch.setenv("SAMPLE_STRATUM_SIZE", "2")
+    snapshot = DataSnapshot(make_kpi_frame(3000))
+    params = Params(store=[16])
+    approximate = evaluate(
+        snapshot, params.model_copy(update={"approximate": True})
+    )
+    estimates = estimate_fused_means(
+        filter_sample(params, snapshot), wait_time_metrics
+    )
+    unknown = 0
+    for metric_name, (means, margins) in estimates.items():
+        metric = wait_time_metrics[metric_name]
+        shaped = approximate[f"{metric_name}_margin"]
+        pd.testing.assert_frame_equal(shaped, metric.shape_margins(margins))
+        # Every unknown margin of a group is missing once shaped, and not
+        # reported as an exact mean
+        values = shaped.select_dtypes("number")
+        assert np.isnan(values.to_numpy(dtype=float)).sum() >= (
+            margins.isna().sum().sum()
+        )
+        unknown += margins.isna().sum().sum()
+    assert unknown > 0
+
+
+def test_approximate_needs_a_sample(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    params = Params(data_form=DataForm.REMODEL, approximate=True)
+    assert set(evaluate(snapshot, params)) == set(wait_time_metrics)
+
+
+def test_sample_grows_with_appended_rows(kpi_frame, monkeypatch):
+    monkeypatch.setenv("SAMPLE_STRATUM_SIZE", "2")
+    dates = pd.to_datetime(kpi_frame["date"])
+    snapshot = DataSnapshot(
+        kpi_frame[dates < "2023-07-01"].reset_index(drop=True)
+    )
+    snapshot = snapshot.append(
+        kpi_frame[dates >= "2023-07-01"].reset_index(drop=True), "delta"
+    )
+    sample = snapshot.sample
+    stratum_sizes = get_stratum_sizes(snapshot.frame)
+    pd.testing.assert_series_equal(
+        get_stratum_sizes(sample.frame), stratum_sizes.clip(upper=2)
+    )
+    populations = sample.frame.groupby(STRATA_COLUMNS, observed=True)[
+        "__population"
+    ].first()
+    pd.testing.assert_series_equal(
+        populations, stratum_sizes, check_names=False
+    )
+    # The sampled rows are rows of the data
+    pd.testing.assert_frame_equal(
+        sample.frame[snapshot.frame.columns],
+        snapshot.frame.take(sample.rows).reset_index(drop=True),
+    )
+    assert sample.dates.is_sorted
@@ -0,0 +1,187 @@
+import asyncio
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import DataForm, LaneType
+from backend.src.app.schemas.performance_metrics import (
+    Params,
+    SavedModelParams,
+)
+from backend.src.app.services.business_services import saved_models
+from backend.src.app.services.business_services.cache import (
+    get_result_cache,
+)
+from backend.src.app.services.business_services.errors import EmptyDataError
+from backend.src.app.services.business_services.performance_metrics import (
+    compute_metrics,
+    create_saved_model,
+    delete_saved_model,
+    list_saved_models,
+)
+from backend.src.app.services.business_services.remodel import (
+    RemodelSnapshot,
+)
+from backend.src.app.services.business_services.saved_models import (
+    SavedModelCache,
+    SavedModelStore,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+LANE_COUNTS = {LaneType.SCO_BULLPEN: 12, LaneType.MANNED_EXPRESS: 3}
+
+
+@pytest.fixture
+def snapshot(kpi_frame, tmp_path, monkeypatch):
+    monkeypatch.setenv("SAVED_MODELS_DIR", str(tmp_path / "saved_models"))
+    monkeypatch.setattr(saved_models, "_saved_model_cache", None)
+    get_result_cache().clear()
+    snapshot = DataSnapshot(kpi_frame)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        yield snapshot
+
+
+def test_saved_model_matches_remodel(snapshot):
+    saved = asyncio.run(
+        create_saved_model(
+            SavedModelParams(name="more lanes", lane_counts=LANE_COUNTS)
+        )
+    )
+    assert saved["rows"] == len(snapshot)
+    assert saved["data_version"] == snapshot.version
+
+    for params in [
+        {},
+        {"store": [60], "peak_hour": [1]},
+        {"cluster": 2, "covid_flag": True, "lane_types": ["SCO Bullpen"]},
+        {"start_date": date(2023, 4, 1), "end_date": date(2023, 5, 15)},
+        {"store": [16, 29], "time_period": 60},
+    ]:
+        saved_frames = asyncio.run(
+            compute_metrics(
+                Params(
+                    data_form=DataForm.SAVED_MODEL,
+                    saved_model_id=saved["id"],
+                    **params,
+                )
+            )
+        )
+        remodel_frames = asyncio.run(
+            compute_metrics(
+                Params(
+                    data_form=DataForm.REMODEL,
+                    lane_counts=LANE_COUNTS,
+                    **params,
+                )
+            )
+        )
+        for metric_name, frame in remodel_frames.items():
+            pd.testing.assert_frame_equal(
+                saved_frames[metric_name], frame, check_dtype=False
+            )
+
+
+def test_saved_model_and_historical_results_share_the_cache(snapshot):
+    saved = asyncio.run(
+        create_saved_model(SavedModelParams(name="cached", store=[16]))
+    )
+    requests = [
+        Params(store=[16]),
+        Params(
+            data_form=DataForm.SAVED_MODEL,
+            saved_model_id=saved["id"],
+            store=[16],
+        ),
+    ]
+    # The historical data moved on since the scenario was saved, the
+    # results of both versions are kept
+    refreshed = DataSnapshot(snapshot.frame)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": refreshed}):
+        results = [asyncio.run(compute_metrics(params)) for params in requests]
+        hits = get_result_cache().stats()["hits"]
+        for params, result in zip(requests, results):
+            assert asyncio.run(compute_metrics(params)) is result
+    assert get_result_cache().stats()["hits"] == hits + 2
+
+
+def test_open_attaches_data_and_index(snapshot):
+    store = SavedModelStore()
+    frame = RemodelSnapshot(snapshot, LANE_COUNTS).frame
+    entry = store.save("scenario", LANE_COUNTS, frame, snapshot.version)
+    opened = store.open(entry["id"])
+
+    # The rows are sorted by store, the catalog holds their ranges
+    stores = opened.frame["store_name"].to_numpy()
+    assert (np.diff(stores) >= 0).all()
+    for store_name, (start, stop) in entry["stores"].items():
+        assert (stores[start:stop] == int(store_name)).all()
+
+    predicates = {"store_name": [16, 60], "type_of_checkout": ["SCO Bullpen"]}
+    rows = opened.index.select(predicates)
+    expected = frame.take(snapshot.index.select(predicates))
+    np.testing.assert_allclose(
+        np.sort(opened.frame["avg_waiting_time_Tq"].to_numpy()[rows]),
+        np.sort(expected["avg_waiting_time_Tq"].to_numpy()),
+    )
+    # The saved order by date selects the same rows as the date column
+    start, end = pd.Timestamp("2023-03-01"), pd.Timestamp("2023-04-01")
+    dates = opened.frame["date"]
+    assert not opened.dates.is_sorted
+    np.testing.assert_array_equal(
+        opened.dates.select(start, end),
+        np.flatnonzero((dates >= start) & (dates < end)),
+    )
+    # Columns are attached to the memory-mapped file
+    assert not opened.frame["avg_waiting_time_Tq"].to_numpy().flags.writeable
+    assert not opened.index.columns["store_name"].order.flags.writeable
+
+
+def test_list_and_delete(snapshot):
+    saved = asyncio.run(
+        create_saved_model(SavedModelParams(name="two stores", store=[16, 60]))
+    )
+    assert saved["name"] == "two stores"
+    assert saved["stores"] == [16, 60]
+    assert [entry["id"] for entry in asyncio.run(list_saved_models(60))] == [
+        saved["id"]
+    ]
+    assert asyncio.run(list_saved_models(29)) == []
+    assert asyncio.run(list_saved_models())[0]["name"] == "two stores"
+
+    asyncio.run(delete_saved_model(saved["id"]))
+    assert asyncio.run(list_saved_models()) == []
+    with pytest.raises(EmptyDataError):
+        asyncio.run(
+            compute_metrics(
+                Params(
+                    data_form=DataForm.SAVED_MODEL,
+                    saved_model_id=saved["id"],
+                )
+            )
+        )
+
+
+def test_cache_discards_models_deleted_by_other_processes(snapshot):
+    frame = RemodelSnapshot(snapshot, LANE_COUNTS).frame
+    entry = SavedModelStore().save(
+        "scenario", LANE_COUNTS, frame, snapshot.version
+    )
+    cache = SavedModelCache(SavedModelStore(), max_entries=2)
+    assert cache.get(entry["id"]) is cache.get(entry["id"])
+
+    # Deleted through another store, as another worker would
+    SavedModelStore().delete(entry["id"])
+    with pytest.raises(EmptyDataError):
+        cache.get(entry["id"])
+    with pytest.raises(EmptyDataError):
+        cache.get(entry["id"])
+
+
+def test_saved_model_requires_id():
+    with pytest.raises(ValueError):
+        Params(data_form=DataForm.SAVED_MODEL)
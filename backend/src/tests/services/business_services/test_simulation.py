@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.configs.constants import LaneType
+from backend.src.app.schemas.performance_metrics import SimulationParams
+from backend.src.app.services.business_services.queueing import (
+    calculate_wait,
+)
+from backend.src.app.services.business_services.simulation import (
+    simulate,
+    simulate_dedicated,
+    simulate_pooled,
+    simulate_queues,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+
+
+CONFIGS_PATH = "backend.src.app.configs.constants.CONFIGS"
+
+
+def test_pooled_lanes_match_erlang_c():
+    arrival_rate = np.array([0.05, 0.2])
+    service_rate = np.array([0.015, 0.05])
+    lanes = np.array([4, 6])
+    seeds = [np.random.SeedSequence(1, spawn_key=(i,)) for i in range(2)]
+
+    wait_time, standard_error = simulate_queues(
+        arrival_rate,
+        service_rate,
+        lanes,
+        np.array([True, True]),
+        seeds,
+        replications=64,
+        customers=4000,
+    )
+    expected, _ = calculate_wait(arrival_rate, service_rate, lanes)
+    assert (np.abs(wait_time - expected) < 4 * standard_error).all()
+
+
+def test_single_lane_disciplines_agree():
+    rng = np.random.default_rng(0)
+    arrivals = np.cumsum(rng.exponential(1.0, (8, 200)), axis=1)
+    services = rng.exponential(0.8, (8, 200))
+    lanes = np.ones(8, dtype=np.int64)
+
+    np.testing.assert_allclose(
+        simulate_pooled(arrivals, services, lanes),
+        simulate_dedicated(arrivals, services, lanes),
+    )
+
+
+def test_dedicated_lines_wait_longer():
+    rng = np.random.default_rng(0)
+    arrivals = np.cumsum(rng.exponential(1.0, (32, 2000)), axis=1)
+    services = rng.exponential(3.2, (32, 2000))
+    lanes = np.full(32, 4)
+
+    pooled = simulate_pooled(arrivals, services, lanes)
+    dedicated = simulate_dedicated(arrivals, services, lanes)
+    assert (pooled >= 0).all()
+    assert dedicated.mean() > pooled.mean()
+
+
+@pytest.fixture
+def snapshot(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame)
+    with patch.dict(CONFIGS_PATH, {"HISTORICAL_SNAPSHOT": snapshot}):
+        yield snapshot
+
+
+def test_simulation_is_reproducible(snapshot):
+    params = SimulationParams(
+        store=[16, 29, 60],
+        lane_counts={LaneType.SCO_BULLPEN: 10},
+        replications=4,
+        customers=100,
+        seed=3,
+    )
+    results = []
+    for workers in ("1", "3"):
+        with patch.dict("os.environ", {"COMPUTE_MAX_WORKERS": workers}):
+            results.append(asyncio.run(simulate(params)))
+
+    queues = results[0]["queues"]
+    pd.testing.assert_frame_equal(queues, results[1]["queues"])
+    assert sorted(queues["store_name"].unique()) == [16, 29, 60]
+    bullpen = queues["type_of_checkout"] == LaneType.SCO_BULLPEN.value
+    assert (queues.loc[bullpen, "lanes"] == 10).all()
+    assert (queues["avg_waiting_time_Tq"] >= 0).all()
+
+    throughput = results[0]["throughput"].iloc[0]
+    assert throughput["customers"] == queues["simulated_customers"].sum()
+    assert throughput["customers_per_second"] > 0
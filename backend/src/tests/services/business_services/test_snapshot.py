@@ -0,0 +1,184 @@
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from backend.src.app.configs.constants import TimeResolution
+from backend.src.app.schemas.performance_metrics import Params, TrendParams
+from backend.src.app.services.business_services.metrics.wait_time import (
+    wait_time_metrics,
+)
+from backend.src.app.services.business_services.performance_metrics import (
+    evaluate_metrics,
+    evaluate_trend,
+    get_history_df,
+)
+from backend.src.app.services.business_services.snapshot import (
+    DataSnapshot,
+    prepare_kpi_frame,
+)
+
+
+def test_snapshot_types_columns(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame.copy())
+    frame = snapshot.frame
+    assert pd.api.types.is_datetime64_any_dtype(frame["date"])
+    for column in ["store_name", "type_of_checkout", "Wait_Time_BKT"]:
+        assert isinstance(frame[column].dtype, pd.CategoricalDtype)
+    assert "Shoppers_BKT" in frame.columns
+    assert "month" in frame.columns
+
+
+def test_get_history_df_does_not_copy(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame.copy())
+    with patch.dict(
+        "backend.src.app.configs.constants.CONFIGS",
+        {"HISTORICAL_SNAPSHOT": snapshot},
+    ):
+        assert get_history_df() is snapshot
+
+
+def test_metrics_match_raw_frame(kpi_frame):
+    snapshot = DataSnapshot(kpi_frame.copy())
+    columns = list(snapshot.frame.columns)
+    for func in wait_time_metrics.values():
+        # The snapshot rows are sorted by date, the means are summed in
+        # another order
+        pd.testing.assert_frame_equal(
+            func(snapshot.frame), func(kpi_frame.copy())
+        )
+    assert list(snapshot.frame.columns) == columns
+
+
+def test_snapshot_sorts_rows_by_date(kpi_frame):
+    kpi_frame.loc[[3, 8], "date"] = None
+    snapshot = DataSnapshot(kpi_frame.copy())
+    dates = snapshot.frame["date"]
+    assert dates.iloc[:-2].is_monotonic_increasing
+    assert dates.iloc[-2:].isna().all()
+    assert snapshot.dates.is_sorted
+    assert snapshot.dates.num_dated == len(kpi_frame) - 2
+
+    # A sorted frame is prepared as it is
+    frame = snapshot.frame
+    assert prepare_kpi_frame(frame) is frame
+
+
+def split_by_date(kpi_frame: pd.DataFrame, *days: str) -> list:
+    """Split the raw rows into the history and deltas of later days."""
+    dates = pd.to_datetime(kpi_frame["date"])
+    bounds = [None] + [pd.Timestamp(day) for day in days] + [None]
+    return [
+        kpi_frame[
+            (True if start is None else dates >= start)
+            & (True if end is None else dates < end)
+        ].reset_index(drop=True)
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def assert_results_equal(snapshot: DataSnapshot, expected: DataSnapshot):
+    params_list = [
+        Params(),
+        Params(cluster=2, store=[29, 45, 49], peak_hour=[1]),
+        Params(start_date=date(2023, 12, 1), event=["No Event"]),
+        Params(time_period=10, store=[16, 29]),
+    ]
+    trend_params_list = [
+        TrendParams(resolution=resolution, store=[16, 60])
+        for resolution in TimeResolution
+    ]
+    for evaluate, params_group in (
+        (evaluate_metrics, params_list),
+        (evaluate_trend, trend_params_list),
+    ):
+        for params in params_group:
+            results = []
+            for kpi_data in (snapshot, expected):
+                with patch.dict(
+                    "backend.src.app.configs.constants.CONFIGS",
+                    {"HISTORICAL_SNAPSHOT": kpi_data},
+                ):
+                    results.append(evaluate(params)[1])
+            assert results[0].keys() == results[1].keys()
+            for name, frame in results[0].items():
+                pd.testing.assert_frame_equal(frame, results[1][name])
+
+
+def test_append_matches_rebuild(kpi_frame, caplog):
+    history, *deltas = split_by_date(
+        kpi_frame, "2023-12-01", "2023-12-10", "2023-12-20"
+    )
+    # A new store shows up in the last delta
+    deltas[-1].loc[:10, "store_name"] = 999
+    snapshot = DataSnapshot(history.copy(), version="base")
+    for position, delta in enumerate(deltas):
+        old_frame = snapshot.frame
+        snapshot = snapshot.append(delta.copy(), f"delta-{position}")
+        # The older snapshot is left as it was
+        assert len(old_frame) == len(history) + sum(
+            len(delta) for delta in deltas[:position]
+        )
+    assert "Rebuilding" not in caplog.text
+    assert snapshot.version == "base+3"
+    assert snapshot.base_version == "base"
+    assert snapshot.deltas == ("delta-0", "delta-1", "delta-2")
+
+    expected = DataSnapshot(pd.concat([history] + deltas, ignore_index=True))
+    pd.testing.assert_frame_equal(snapshot.frame, expected.frame)
+    assert snapshot.dates.is_sorted
+    assert len(snapshot.index.select({"store_name": [999]})) == 11
+    for column, column_index in expected.index.columns.items():
+        grown_index = snapshot.index.columns[column]
+        for value, code in column_index.code_map.items():
+            np.testing.assert_array_equal(
+                grown_index.postings[grown_index.code_map[value]],
+                column_index.postings[code],
+            )
+    assert_results_equal(snapshot, expected)
+
+
+def test_append_merges_categories_in_order(kpi_frame, caplog):
+    history, *deltas = split_by_date(kpi_frame, "2023-12-01", "2023-12-10")
+    # New values sorting before the others show up in the deltas
+    deltas[0].loc[:10, "store_name"] = 1
+    deltas[0].loc[:10, "event"] = "A Event"
+    deltas[1].loc[:5, "type_of_checkout"] = "A Lane"
+    snapshot = DataSnapshot(history.copy())
+    for position, delta in enumerate(deltas):
+        snapshot = snapshot.append(delta.copy(), str(position))
+    assert "Rebuilding" not in caplog.text
+
+    expected = DataSnapshot(pd.concat([history] + deltas, ignore_index=True))
+    pd.testing.assert_frame_equal(snapshot.frame, expected.frame)
+    for column, column_index in expected.index.columns.items():
+        grown_index = snapshot.index.columns[column]
+        assert grown_index.values == column_index.values
+        for code, posting in enumerate(column_index.postings):
+            np.testing.assert_array_equal(grown_index.postings[code], posting)
+        np.testing.assert_array_equal(grown_index.counts, column_index.counts)
+    assert len(snapshot.index.select({"store_name": [1]})) == 11
+    assert_results_equal(snapshot, expected)
+
+
+def test_append_compacts_cells(kpi_frame):
+    history, *deltas = split_by_date(
+        kpi_frame, *[f"2023-{month:02d}-01" for month in range(2, 13)]
+    )
+    snapshot = DataSnapshot(history.copy())
+    for position, delta in enumerate(deltas):
+        snapshot = snapshot.append(delta.copy(), str(position))
+    expected = DataSnapshot(kpi_frame.copy())
+    for group_by_cols, table in snapshot.cube.tables.items():
+        assert len(table) < 2 * len(expected.cube.tables[group_by_cols])
+    assert_results_equal(snapshot, expected)
+
+
+def test_append_earlier_rows_rebuilds(kpi_frame, caplog):
+    history, delta = split_by_date(kpi_frame, "2023-12-01")
+    snapshot = DataSnapshot(delta.copy()).append(history.copy(), "earlier")
+    assert "Rebuilding" in caplog.text
+    assert snapshot.deltas == ("earlier",)
+    assert snapshot.dates.is_sorted
+    assert_results_equal(snapshot, DataSnapshot(kpi_frame.copy()))
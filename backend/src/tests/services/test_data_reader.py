@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pandas as pd
+import pytest
+
+from backend.src.app.services.data_reader import (
+    parse_csv_chunks,
+    read_csv_stream,
+)
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+async def stream_bytes(content: bytes, chunk_size: int = 4096):
+    for start in range(0, len(content), chunk_size):
+        yield content[start : start + chunk_size]
+
+
+@pytest.fixture
+def csv_content() -> bytes:
+    return make_kpi_frame(3000).to_csv(index=False).encode("utf-8")
+
+
+def test_read_csv_stream_matches_read_csv(monkeypatch, csv_content):
+    monkeypatch.setenv("CSV_CHUNK_ROWS", "700")
+    monkeypatch.setenv("STREAM_BUFFER_CHUNKS", "2")
+    df = asyncio.run(read_csv_stream(stream_bytes(csv_content)))
+    expected = pd.read_csv(io.BytesIO(csv_content), parse_dates=["date"])
+    assert isinstance(df["type_of_checkout"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(
+        df, expected, check_dtype=False, check_categorical=False
+    )
+
+
+def test_parse_csv_chunks_from_path(tmp_path, monkeypatch, csv_content):
+    monkeypatch.setenv("CSV_CHUNK_ROWS", "1000")
+    path = tmp_path / "historical_data.csv"
+    path.write_bytes(csv_content)
+    df = parse_csv_chunks(str(path))
+    assert len(df) == 3000
+    assert df["store_name"].dtype == "int64"
+
+
+def test_parse_csv_chunks_projects_and_downcasts(monkeypatch):
+    monkeypatch.setenv("CSV_CHUNK_ROWS", "1000")
+    raw = make_kpi_frame(3000)
+    raw["unused"] = 1.0
+    # Only the last chunk holds hours out of the range of int8
+    raw.loc[2500:, "hour"] = 1000
+    df = parse_csv_chunks(io.BytesIO(raw.to_csv(index=False).encode()))
+    assert "unused" not in df.columns
+    assert df["peak_hour"].dtype == "int8"
+    assert df["avg_waiting_time_Tq"].dtype == "float32"
+    assert df["hour"].dtype == "int64"
+    assert df["hour"].iloc[-1] == 1000
+
+
+def test_read_csv_stream_propagates_stream_errors(csv_content):
+    async def failing_stream():
+        yield csv_content[:5000]
+        raise ConnectionError("download interrupted")
+
+    with pytest.raises(ConnectionError, match="download interrupted"):
+        asyncio.run(read_csv_stream(failing_stream()))
+
+
+def test_read_csv_stream_propagates_parser_errors(monkeypatch):
+    monkeypatch.setenv("STREAM_BUFFER_CHUNKS", "1")
+    content = b"store_name,hour\n" + b"not a number,1\n" * 10000
+    with pytest.raises(ValueError):
+        asyncio.run(read_csv_stream(stream_bytes(content, 1024)))
@@ -0,0 +1,56 @@
+import asyncio
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from backend.src.app.schemas.performance_metrics import Params
+from backend.src.app.services import executor
+from backend.src.app.services.business_services.errors import ServiceBusyError
+from backend.src.app.services.business_services.performance_metrics import (
+    evaluate_metrics,
+)
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+
+
+@pytest.fixture
+def compute_executor(monkeypatch, request):
+    monkeypatch.setenv("COMPUTE_EXECUTOR", request.param)
+    monkeypatch.setenv("COMPUTE_MAX_WORKERS", "2")
+    executor.shutdown_executor()
+    yield request.param
+    executor.shutdown_executor()
+
+
+@pytest.mark.parametrize(
+    "compute_executor",
+    [executor.THREAD_EXECUTOR, executor.PROCESS_EXECUTOR],
+    indirect=True,
+)
+def test_run_compute_matches_direct_call(compute_executor):
+    snapshot = DataSnapshot(make_kpi_frame())
+    with patch.dict(
+        "backend.src.app.configs.constants.CONFIGS",
+        {"HISTORICAL_SNAPSHOT": snapshot},
+    ):
+        version, result = asyncio.run(
+            executor.run_compute(evaluate_metrics, Params())
+        )
+        assert version == snapshot.version
+        expected = evaluate_metrics(Params())[1]
+    assert result.keys() == expected.keys()
+    for metric_name in expected:
+        pd.testing.assert_frame_equal(
+            result[metric_name], expected[metric_name]
+        )
+
+
+def test_run_compute_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setenv("COMPUTE_MAX_WORKERS", "1")
+    monkeypatch.setenv("COMPUTE_QUEUE_DEPTH", "0")
+    monkeypatch.setattr(executor, "_pending_tasks", 1)
+    with pytest.raises(ServiceBusyError):
+        asyncio.run(executor.run_compute(sum, [1, 2]))
@@ -0,0 +1,59 @@
+from backend.src.app.services.instrumentation import (
+    DURATION_BUCKETS,
+    Histogram,
+    StageTimings,
+    get_current_timings,
+    record_rows,
+    record_timings,
+    render_metrics,
+    run_timed,
+    stage,
+)
+
+
+def test_stage_is_not_timed_without_timings():
+    assert get_current_timings() is None
+    with stage("filter_df"):
+        record_rows("rows", 10)
+    assert get_current_timings() is None
+
+
+def test_stages_are_recorded_in_order():
+    with record_timings(StageTimings()) as timings:
+        with stage("filter_df"):
+            record_rows("rows", 10, filtered=10)
+        with stage("metric.a"):
+            pass
+        with stage("metric.a"):
+            pass
+    assert list(timings.durations) == ["filter_df", "metric.a"]
+    assert timings.rows_scanned == {"rows": 10}
+    assert timings.filtered_rows == [10]
+    header = timings.get_header()
+    assert header.startswith("filter_df;dur=")
+    assert ", metric.a;dur=" in header
+
+
+def test_run_timed_returns_the_stages_of_the_call():
+    def compute(value):
+        with stage("compute"):
+            return value * 2
+
+    result, timings = run_timed(compute, 21)
+    assert result == 42
+    assert list(timings.durations) == ["compute"]
+    assert get_current_timings() is None
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency", "Latency.", "stage", DURATION_BUCKETS)
+    histogram.observe("total", 0.003)
+    histogram.observe("total", 0.3)
+    histogram.observe("total", 30.0)
+    lines = histogram.render()
+    assert 'latency_bucket{stage="total",le="0.0025"} 0' in lines
+    assert 'latency_bucket{stage="total",le="0.005"} 1' in lines
+    assert 'latency_bucket{stage="total",le="0.5"} 2' in lines
+    assert 'latency_bucket{stage="total",le="+Inf"} 3' in lines
+    assert 'latency_count{stage="total"} 3' in lines
+    assert render_metrics().endswith("\n")
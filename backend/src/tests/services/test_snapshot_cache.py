@@ -0,0 +1,149 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import fcntl
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.src.app.clients.storage.local_file import LocalFileClient
+from backend.src.app.services.business_services.snapshot import DataSnapshot
+from backend.src.app.services.data_reader import (
+    parse_csv_chunks,
+    read_csv_stream,
+    read_historical_data_from_cloud,
+)
+from backend.src.app.services.snapshot_cache import (
+    LOCK_FILE_NAME,
+    CacheLock,
+    load_cached_snapshot,
+)
+from backend.src.tests.services.business_services.conftest import (
+    make_kpi_frame,
+)
+from backend.src.tests.services.business_services.test_snapshot import (
+    assert_results_equal,
+)
+
+
+@pytest.fixture
+def local_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORICAL_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "historical_data.csv"
+    make_kpi_frame(500).to_csv(path, index=False)
+    return LocalFileClient(str(path), range_size=1024)
+
+
+def read(client):
+    return asyncio.run(read_historical_data_from_cloud(client))
+
+
+def test_cache_is_used_while_version_is_unchanged(local_client):
+    snapshot, version = read(local_client)
+    with patch(
+        "backend.src.app.services.data_reader.read_csv_stream",
+        side_effect=AssertionError("csv parsed again"),
+    ), patch(
+        "backend.src.app.services.data_reader.DataSnapshot",
+        side_effect=AssertionError("snapshot built again"),
+    ):
+        cached, cached_version = read(local_client)
+    assert cached_version == version
+    assert cached.version == version
+    pd.testing.assert_frame_equal(cached.frame, snapshot.frame)
+
+
+def test_cache_is_refreshed_when_version_changes(local_client):
+    snapshot, version = read(local_client)
+    make_kpi_frame(300, seed=3).to_csv(local_client.path, index=False)
+    os.utime(local_client.path, ns=(0, 10**9))
+    with patch(
+        "backend.src.app.services.data_reader.read_csv_stream",
+        wraps=read_csv_stream,
+    ) as parse:
+        new_snapshot, new_version = read(local_client)
+    parse.assert_called_once()
+    assert new_version != version
+    assert len(new_snapshot) == 300
+
+
+def test_cached_snapshot_is_attached_without_copies(local_client):
+    snapshot, _ = read(local_client)
+    df = snapshot.frame
+    assert "Shoppers_BKT" in df.columns
+    for column in ["avg_waiting_time_Tq", "hour"]:
+        values = df[column].to_numpy()
+        assert not values.flags.owndata
+        assert not values.flags.writeable
+    assert not df["store_name"].cat.codes.to_numpy().flags.writeable
+    # The indexes and aggregates are attached to the cache too
+    for column_index in snapshot.index.columns.values():
+        assert not column_index.codes.flags.writeable
+        assert not column_index.order.flags.writeable
+    for table in list(snapshot.cube.tables.values()) + list(
+        snapshot.rollups.tables.values()
+    ):
+        assert not table.cells.iloc[:, -1].to_numpy().flags.writeable
+        for column_index in table.index.columns.values():
+            assert not column_index.order.flags.writeable
+
+
+def test_cached_snapshot_matches_built_one(local_client):
+    snapshot, version = read(local_client)
+    expected = DataSnapshot(parse_csv_chunks(local_client.path), version)
+    pd.testing.assert_frame_equal(snapshot.frame, expected.frame)
+    np.testing.assert_array_equal(snapshot.sample.rows, expected.sample.rows)
+    pd.testing.assert_frame_equal(snapshot.sample.frame, expected.sample.frame)
+    assert_results_equal(snapshot, expected)
+
+
+def test_concurrent_workers_load_the_data_once(local_client):
+    with patch(
+        "backend.src.app.services.data_reader.read_csv_stream",
+        wraps=read_csv_stream,
+    ) as parse:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(read, [local_client] * 4))
+    parse.assert_called_once()
+    assert len({version for _, version in results}) == 1
+    for snapshot, _ in results[1:]:
+        pd.testing.assert_frame_equal(snapshot.frame, results[0][0].frame)
+
+
+def is_locked(cache_dir):
+    with open(os.path.join(cache_dir, LOCK_FILE_NAME), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+
+def test_shared_locks_are_held_together(tmp_path):
+    with CacheLock(str(tmp_path), shared=True):
+        with CacheLock(str(tmp_path), shared=True):
+            assert is_locked(str(tmp_path))
+    assert not is_locked(str(tmp_path))
+
+
+def test_cache_is_attached_under_the_lock(local_client):
+    cache_dir = os.environ["HISTORICAL_CACHE_DIR"]
+    locked = []
+
+    def load(*args, **kwargs):
+        locked.append(is_locked(cache_dir))
+        return load_cached_snapshot(*args, **kwargs)
+
+    with patch(
+        "backend.src.app.services.data_reader.load_cached_snapshot",
+        side_effect=load,
+    ):
+        read(local_client)
+        read(local_client)
+    # The first read builds and publishes the snapshot then attaches to
+    # it, the second attaches to the cache at once
+    assert len(locked) == 4
+    assert all(locked)